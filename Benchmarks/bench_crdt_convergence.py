@@ -0,0 +1,27 @@
+#Benchmark and convergence check for the board CRDT
+#Runs crdt_simulator with more clients and longer sessions: random edits, operations delivered late, out of order
+#and sometimes twice. Reports whether every replica ended with the same board, how long applying a remote operation
+#takes as the board grows, and how much state (tombstones included) a replica holds.
+#Run from the repository root: python -m Benchmarks.bench_crdt_convergence
+import json
+
+from WhiteboardApplication.crdt_simulator import ConvergenceSimulator
+
+RUNS = ((2, 2000), (4, 2000), (4, 8000), (8, 2000), (8, 8000))    # (clients, steps)
+
+
+def main():
+    print(f"{'clients':>7} {'steps':>6} {'ops applied':>11} {'us/op':>6} {'items':>6} {'state KB':>8} converged")
+    for replicas, steps in RUNS:
+        simulator = ConvergenceSimulator(replicas=replicas, seed=1)
+        converged = simulator.run(steps)
+
+        state = simulator.states[0]
+        items = len(state.digest()[0])
+        size = len(json.dumps(state.dump())) / 1024
+        print(f"{replicas:7d} {steps:6d} {simulator.applied:11d} {simulator.apply_time / simulator.applied * 1e6:6.1f} "
+              f"{items:6d} {size:8.0f} {converged}")
+
+
+if __name__ == '__main__':
+    main()
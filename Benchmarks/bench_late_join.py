@@ -0,0 +1,92 @@
+#Benchmark for late joining a meeting
+#A host draws a board and then keeps working on it (moving a text box around), so the meeting log gets much
+#longer than the board. Measures how long a late joiner takes to catch up by replaying the whole log
+#against loading the host's snapshot and replaying only what came after it.
+#Run from the repository root: python -m Benchmarks.bench_late_join
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtGui import QPen, QColor
+from PySide6.QtWidgets import QApplication
+
+from WhiteboardApplication.board_scene import BoardScene
+from WhiteboardApplication.board_sync import WhiteboardSync, DrawingAction
+from WhiteboardApplication.Collab_Functionality.client import Client
+from WhiteboardApplication.Collab_Functionality.relay_server import RelayServerThread
+from WhiteboardApplication.stroke_item import StrokeItem
+from WhiteboardApplication.text_box import TextBox
+
+STROKES = 1000
+POINTS_PER_STROKE = 24
+EDITS = (0, 5000, 20000)
+
+
+def wait_for(app, condition, timeout=120):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise TimeoutError
+        app.processEvents()
+
+
+def host_session(app, port, meeting, edits):
+    scene = BoardScene()
+    host = WhiteboardSync(scene, meeting, "host", Client("127.0.0.1", port, meeting))
+    wait_for(app, host.transport.connected.is_set)
+    for i in range(STROKES):
+        stroke = StrokeItem([(i % 800 + j * 2.0, i // 800 * 40 + j) for j in range(POINTS_PER_STROKE)],
+                            QPen(QColor("#000000"), 1))
+        scene.addItem(stroke)
+        host.sync_drawing(stroke)
+    text_box = TextBox()
+    scene.addItem(text_box)
+    host.sync_textbox_create(text_box)
+    # Queued without a coalesce key so every move ends up in the log, like a long session would
+    text_id = scene.item_id(text_box)
+    for i in range(edits):
+        host.queue_action(DrawingAction(action_type='textbox_move', user_id="host",
+                                        text_position={'x': i % 500, 'y': 0}, text_id=text_id))
+    total = STROKES + 1 + edits
+    wait_for(app, lambda: host.last_seq == total and not host.unechoed)
+    return host, total
+
+
+def join_time(app, port, meeting, items):
+    scene = BoardScene()
+    start = time.perf_counter()
+    joiner = WhiteboardSync(scene, meeting, "joiner", Client("127.0.0.1", port, meeting))
+    wait_for(app, lambda: len([item for item in scene.items() if item.parentItem() is None]) == items)
+    elapsed = time.perf_counter() - start
+    joiner.close()
+    return elapsed
+
+
+def main():
+    app = QApplication.instance() or QApplication(sys.argv)
+    server = RelayServerThread()
+    # The whole log is what's being measured, so the relay mustn't compact it
+    server.relay.compact_every = 0
+    port = server.start()
+
+    for edits in EDITS:
+        meeting = f"bench-{edits}"
+        host, total = host_session(app, port, meeting, edits)
+        replay = join_time(app, port, meeting, STROKES + 1)
+
+        host.SNAPSHOT_MIN_ACTIONS = 0
+        host.publish_snapshot()
+        wait_for(app, lambda: server.relay.meetings[meeting].snapshot is not None)
+        snapshot = join_time(app, port, meeting, STROKES + 1)
+        host.close()
+
+        print(f"{STROKES} strokes, {total:6d} actions in the log: replay all {replay * 1000:8.1f} ms, "
+              f"snapshot + deltas {snapshot * 1000:8.1f} ms")
+
+    server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+#Benchmark for lazy notebook loading
+#Compares the time until the first screen of a notebook is on the canvas when every item is decoded up front
+#against the memory-mapped reader that decodes the visible items first
+#Run from the repository root: python -m Benchmarks.bench_lazy_load
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtWidgets import QApplication
+
+from WhiteboardApplication.board_scene import BoardScene
+from WhiteboardApplication.board_view import BoardView
+from WhiteboardApplication.notebook_format import save_notebook, load_notebook, NotebookReader
+from Benchmarks.bench_notebook_format import build_board, STROKE_COUNT
+
+
+def main():
+    app = QApplication.instance() or QApplication(sys.argv)
+    scene = BoardScene()
+    build_board(scene)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "notebook.bnote")
+        save_notebook(path, scene)
+
+        view = BoardView()
+        view.resize(1000, 700)
+
+        eager_scene = BoardScene()
+        view.setScene(eager_scene)
+        start = time.perf_counter()
+        for item in load_notebook(path):
+            eager_scene.addItem(item)
+        eager_time = time.perf_counter() - start
+
+        lazy_scene = BoardScene()
+        view.setScene(lazy_scene)
+        start = time.perf_counter()
+        lazy_scene.start_lazy_load(NotebookReader(path), view)
+        first_screen_time = time.perf_counter() - start
+        first_screen_items = len(lazy_scene.items())
+
+        start = time.perf_counter()
+        while lazy_scene.loader is not None:
+            app.processEvents()
+        background_time = time.perf_counter() - start
+
+        print(f"{STROKE_COUNT} strokes, {os.path.getsize(path) / 1e6:.2f} MB")
+        print(f"eager: {eager_time * 1000:8.1f} ms until anything is shown")
+        print(f"lazy:  {first_screen_time * 1000:8.1f} ms for the first screen ({first_screen_items} items), "
+              f"{background_time * 1000:8.1f} ms streaming the rest")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+#Benchmark for compacting a meeting's action log
+#Builds the log of a long meeting: strokes, a good share of them erased again, pixel eraser cuts, text typed one
+#keystroke per action and dragged around, and undo/redo. Compares the stored size, the number of actions and how
+#long a late joiner takes to replay the log before and after compaction.
+#Run from the repository root: python -m Benchmarks.bench_log_compaction
+import json
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtWidgets import QApplication
+
+from WhiteboardApplication.board_scene import BoardScene
+from WhiteboardApplication.board_sync import WhiteboardSync
+from WhiteboardApplication.sync_compaction import compact_actions
+from WhiteboardApplication.sync_transport import SyncTransport
+
+ROUNDS = 200
+STROKES_PER_ROUND = 10
+POINTS_PER_STROKE = 24
+
+
+def meeting_log(seed=1):
+    rng = random.Random(seed)
+    actions = []
+
+    def stroke(x, y):
+        points = [{'x': x + j * 3.0, 'y': y + rng.uniform(-2, 2)} for j in range(POINTS_PER_STROKE)]
+        return {'action_type': 'pen', 'user_id': rng.choice("ab"), 'points': points, 'color': "#000000", 'size': 2}
+
+    for round_number in range(ROUNDS):
+        y = round_number * 30.0
+        strokes = [stroke(rng.uniform(0, 800), y) for _ in range(STROKES_PER_ROUND)]
+        actions.extend(strokes)
+
+        # About a third of what gets drawn is wiped again, some of it undone instead
+        if rng.random() < 0.3:
+            actions.append({'action_type': 'eraser', 'user_id': "a",
+                            'points': [{'x': x, 'y': y} for x in range(0, 900, 10)]})
+        elif rng.random() < 0.3:
+            actions.append({'action_type': 'pixel_eraser', 'user_id': "b",
+                            'points': [{'x': 400, 'y': y - 5}, {'x': 400, 'y': y + 5}]})
+        undone = strokes[-1]
+        actions.append(dict(undone, action_type='undo'))
+        if rng.random() < 0.5:
+            actions.append(dict(undone, action_type='redo'))
+
+        text_id = f"text-{round_number}"
+        actions.append({'action_type': 'textbox_create', 'user_id': "a", 'text_content': "", 'text_id': text_id,
+                        'text_position': {'x': 900, 'y': y}})
+        words = "notes for round %d" % round_number
+        actions.extend({'action_type': 'textbox_content', 'user_id': "a", 'text_id': text_id,
+                        'text_content': words[:i]} for i in range(1, len(words) + 1))
+        actions.extend({'action_type': 'textbox_move', 'user_id': "a", 'text_id': text_id,
+                        'text_position': {'x': 900 + i, 'y': y}} for i in range(20))
+
+    for seq, action in enumerate(actions, 1):
+        action['seq'] = seq
+        action['timestamp'] = float(seq)
+    return actions
+
+
+def replay_time(actions):
+    scene = BoardScene()
+    sync = WhiteboardSync(scene, "bench", "joiner", SyncTransport())
+    start = time.perf_counter()
+    for action in actions:
+        sync.handle_remote_action(action)
+    elapsed = time.perf_counter() - start
+    sync.close()
+    return elapsed
+
+
+def main():
+    app = QApplication.instance() or QApplication(sys.argv)
+    log = meeting_log()
+
+    start = time.perf_counter()
+    compacted = compact_actions(log)
+    fold = time.perf_counter() - start
+
+    before = len(json.dumps(log))
+    after = len(json.dumps(compacted))
+    print(f"Compaction took {fold * 1000:.1f} ms")
+    print(f"Actions:  {len(log):7d} -> {len(compacted):7d}")
+    print(f"JSON:     {before / 1024:7.0f} KB -> {after / 1024:7.0f} KB ({after / before:.0%})")
+
+    full = replay_time(log)
+    short = replay_time(compacted)
+    print(f"Replay:   {full * 1000:7.0f} ms -> {short * 1000:7.0f} ms")
+    app.processEvents()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+#Benchmark for the binary notebook format
+#Saves and loads a 50k stroke notebook with the binary format and with the pickle layout
+#MainWindow.save used before (a dict per item and a dict per path element)
+#Run from the repository root: python -m Benchmarks.bench_notebook_format
+import os
+import pickle
+import random
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QPen, QColor, QPainterPath, QTransform
+from PySide6.QtWidgets import QApplication, QGraphicsPathItem
+
+from WhiteboardApplication.board_scene import BoardScene
+from WhiteboardApplication.notebook_format import save_notebook, load_notebook
+from WhiteboardApplication.notebook_saver import NotebookSaver, SnapshotJob
+from WhiteboardApplication.stroke_item import StrokeItem
+
+STROKE_COUNT = 50000
+POINTS_PER_STROKE = 24
+
+
+def build_board(scene):
+    random.seed(5)
+    for _ in range(STROKE_COUNT):
+        x = random.uniform(0, 800)
+        y = random.uniform(0, 20000)
+        points = [(x + i * 2.5, y + random.uniform(-8, 8)) for i in range(POINTS_PER_STROKE)]
+        pen = QPen(QColor("#000000"), random.choice([1, 5]))
+        pen.setCapStyle(Qt.PenCapStyle.RoundCap)
+        scene.addItem(StrokeItem(points, pen))
+
+
+#The layout the old MainWindow.serialize_items produced for path items
+def legacy_serialize(scene):
+    items_data = []
+    for item in scene.items():
+        if isinstance(item, QGraphicsPathItem):
+            pen = item.pen()
+            color = pen.color()
+            transform = item.transform()
+            path = item.path()
+            elements = []
+            for i in range(path.elementCount()):
+                element = path.elementAt(i)
+                elements.append({'type': 'moveTo' if element.isMoveTo() else 'lineTo', 'x': element.x, 'y': element.y})
+            items_data.append({
+                'type': 'QGraphicsPathItem',
+                'pen': {'width': pen.width(),
+                        'color': {'red': color.red(), 'green': color.green(), 'blue': color.blue(), 'alpha': color.alpha()},
+                        'style': pen.style(), 'capstyle': pen.capStyle(), 'joinstyle': pen.joinStyle()},
+                'brush': {'color': {'red': 0, 'green': 0, 'blue': 0, 'alpha': 255}, 'style': item.brush().style()},
+                'rotation': item.rotation(),
+                'transform': {'m11': transform.m11(), 'm12': transform.m12(), 'm13': transform.m13(),
+                              'm21': transform.m21(), 'm22': transform.m22(), 'm23': transform.m23(),
+                              'm31': transform.m31(), 'm32': transform.m32(), 'm33': transform.m33()},
+                'x': item.pos().x(),
+                'y': item.pos().y(),
+                'name': item.toolTip(),
+                'elements': elements,
+            })
+    return items_data
+
+
+#The old MainWindow.deserialize_path_item
+def legacy_deserialize(items_data):
+    items = []
+    for data in items_data:
+        path = QPainterPath()
+        for element in data['elements']:
+            if element['type'] == 'moveTo':
+                path.moveTo(element['x'], element['y'])
+            else:
+                path.lineTo(element['x'], element['y'])
+        item = QGraphicsPathItem(path)
+        pen = QPen()
+        pen.setWidth(data['pen']['width'])
+        color = data['pen']['color']
+        pen.setColor(QColor(color['red'], color['green'], color['blue'], color['alpha']))
+        pen.setStyle(data['pen']['style'])
+        pen.setCapStyle(data['pen']['capstyle'])
+        pen.setJoinStyle(data['pen']['joinstyle'])
+        item.setPen(pen)
+        item.setRotation(data['rotation'])
+        t = data['transform']
+        item.setTransform(QTransform(t['m11'], t['m12'], t['m13'], t['m21'], t['m22'], t['m23'],
+                                     t['m31'], t['m32'], t['m33']))
+        item.setPos(data['x'], data['y'])
+        items.append(item)
+    return items
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+#Runs a background save's snapshot the way NotebookSaver's timer does, returns the longest single
+#stretch on the GUI thread and the total
+def snapshot_slices(path, scene):
+    slices = []
+    job, elapsed = timed(SnapshotJob, path, scene)
+    slices.append(elapsed)
+    while True:
+        done, elapsed = timed(job.advance, time.perf_counter() + NotebookSaver.FRAME_BUDGET)
+        slices.append(elapsed)
+        if done:
+            break
+    _, elapsed = timed(job.result)
+    slices.append(elapsed)
+    return max(slices), sum(slices)
+
+
+def main():
+    app = QApplication.instance() or QApplication(sys.argv)
+    scene = BoardScene()
+    build_board(scene)
+
+    with tempfile.TemporaryDirectory() as directory:
+        pickle_path = os.path.join(directory, "notebook.pkl")
+        binary_path = os.path.join(directory, "notebook.bnote")
+
+        def pickle_save():
+            with open(pickle_path, 'wb') as file:
+                pickle.dump(legacy_serialize(scene), file, protocol=pickle.HIGHEST_PROTOCOL)
+
+        def pickle_load():
+            with open(pickle_path, 'rb') as file:
+                return legacy_deserialize(pickle.load(file))
+
+        _, pickle_save_time = timed(pickle_save)
+        pickle_items, pickle_load_time = timed(pickle_load)
+        _, binary_save_time = timed(save_notebook, binary_path, scene)
+        binary_items, binary_load_time = timed(load_notebook, binary_path)
+        longest_slice, snapshot_time = snapshot_slices(binary_path, scene)
+
+        print(f"{STROKE_COUNT} strokes x {POINTS_PER_STROKE} points")
+        print(f"pickle: save {pickle_save_time:6.2f} s, load {pickle_load_time:6.2f} s, "
+              f"{os.path.getsize(pickle_path) / 1e6:7.2f} MB, {len(pickle_items)} items")
+        print(f"binary: save {binary_save_time:6.2f} s, load {binary_load_time:6.2f} s, "
+              f"{os.path.getsize(binary_path) / 1e6:7.2f} MB, {len(binary_items)} items")
+        print(f"background save: {snapshot_time:6.2f} s of snapshotting on the GUI thread, "
+              f"the longest stretch without an event loop pass {longest_slice * 1000:6.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
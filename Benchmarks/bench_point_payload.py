@@ -0,0 +1,72 @@
+#Benchmark for the size of synced stroke payloads
+#Captures handwriting-like strokes the way BoardScene does (mouse samples through the default stroke filters),
+#then compares the JSON size of a pen action carrying the points as {'x', 'y'} dicts with one carrying them
+#packed by point_codec, and the time to turn each back into points on the receiving side.
+#Run from the repository root: python -m Benchmarks.bench_point_payload
+import json
+import math
+import random
+import time
+
+from WhiteboardApplication.point_codec import pack_points, read_points
+from WhiteboardApplication.stroke_filters import StrokeFilterPipeline
+
+STROKES = 500
+SAMPLES_PER_STROKE = 300     # Mouse move events per stroke
+REPEATS = 20
+
+
+def capture_strokes(seed=1):
+    rng = random.Random(seed)
+    strokes = []
+    for i in range(STROKES):
+        origin_x, origin_y = rng.uniform(0, 2000), rng.uniform(0, 2000)
+        loops = rng.uniform(2, 6)
+        samples = [(origin_x + t * 0.8 + 12 * math.sin(t / SAMPLES_PER_STROKE * loops * 2 * math.pi),
+                    origin_y + 15 * math.cos(t / SAMPLES_PER_STROKE * loops * 2 * math.pi) + rng.uniform(-0.4, 0.4))
+                   for t in range(SAMPLES_PER_STROKE)]
+        pipeline = StrokeFilterPipeline()
+        pipeline.begin(samples[0])
+        kept = [samples[0]] + [point for point in samples[1:] if pipeline.accept(point)]
+        strokes.append(pipeline.finish(kept))
+    return strokes
+
+
+def action(**fields):
+    return json.dumps(dict({'action_type': 'pen', 'user_id': "someone", 'color': "#000000", 'size': 2,
+                            'timestamp': time.time()}, **fields))
+
+
+def main():
+    strokes = capture_strokes()
+    point_count = sum(len(points) for points in strokes)
+
+    dict_actions = [action(points=[{'x': x, 'y': y} for x, y in points]) for points in strokes]
+    packed_actions = [action(point_data=pack_points(points)) for points in strokes]
+    dict_bytes = sum(len(text) for text in dict_actions)
+    packed_bytes = sum(len(text) for text in packed_actions)
+
+    print(f"{STROKES} strokes, {point_count / STROKES:.0f} points each after filtering")
+    print(f"Dict points:   {dict_bytes / point_count:6.1f} bytes/point, {dict_bytes / 1024:7.0f} KB")
+    print(f"Packed points: {packed_bytes / point_count:6.1f} bytes/point, {packed_bytes / 1024:7.0f} KB "
+          f"({packed_bytes / dict_bytes:.0%})")
+
+    # Best of REPEATS runs, single runs of a few tens of milliseconds are too noisy to compare
+    for name, actions in (("dict", dict_actions), ("packed", packed_actions)):
+        best = best_points = float('inf')
+        for _ in range(REPEATS):
+            received = []
+            start = time.perf_counter()
+            for text in actions:
+                received.append(json.loads(text))
+            parsed = time.perf_counter()
+            for fields in received:
+                read_points(fields.get('point_data'), fields.get('points'))
+            done = time.perf_counter()
+            best = min(best, done - start)
+            best_points = min(best_points, done - parsed)
+        print(f"Decode {name:6s}: {best / STROKES * 1e6:7.1f} us per stroke, "
+              f"{best_points / STROKES * 1e6:7.1f} of them in read_points")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+#Benchmark for the presence channel
+#One client moves its pointer over the board at 250 Hz for a few seconds while connected to a relay with another
+#client watching. Reports how many updates went out against how many mouse moves there were, the bytes a second
+#that costs, and checks that none of it reached the meeting's action log.
+#Run from the repository root: python -m Benchmarks.bench_presence
+import json
+import math
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtCore import QPointF
+from PySide6.QtWidgets import QApplication
+
+from WhiteboardApplication.board_scene import BoardScene
+from WhiteboardApplication.board_sync import WhiteboardSync
+from WhiteboardApplication.Collab_Functionality.client import Client
+from WhiteboardApplication.Collab_Functionality.relay_server import RelayServerThread
+
+SECONDS = 3
+MOVES_PER_SECOND = 250
+
+
+def wait_for(app, condition, timeout=10):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise TimeoutError
+        app.processEvents()
+
+
+def main():
+    app = QApplication.instance() or QApplication(sys.argv)
+    server = RelayServerThread()
+    port = server.start()
+
+    mover_scene = BoardScene()
+    mover = WhiteboardSync(mover_scene, "1", "mover@example.com", Client("127.0.0.1", port, "1"))
+    watcher = WhiteboardSync(BoardScene(), "1", "watcher@example.com", Client("127.0.0.1", port, "1"))
+    mover_scene.sync = mover
+    wait_for(app, lambda: mover.transport.connected.is_set() and watcher.transport.connected.is_set())
+    wait_for(app, lambda: "mover@example.com" in watcher.presence.cursors)
+
+    # Every update sent reaches the watcher, so what it receives is what was sent
+    received = []
+    watcher.presence.presence_received.connect(received.append)
+
+    moves = SECONDS * MOVES_PER_SECOND
+    start = time.perf_counter()
+    for i in range(moves):
+        angle = i / MOVES_PER_SECOND * math.tau
+        mover.presence.move_cursor(QPointF(300 + 200 * math.cos(angle), 250 + 200 * math.sin(angle)))
+        next_move = start + (i + 1) / MOVES_PER_SECOND
+        while time.perf_counter() < next_move:
+            app.processEvents()
+    wait_for(app, lambda: received and received[-1] == mover.presence.local)
+    elapsed = time.perf_counter() - start
+
+    size = sum(len(json.dumps({"type": "presence", "presence": update}, separators=(',', ':')))
+               for update in received)
+    print(f"{moves} pointer moves in {elapsed:.1f} s")
+    print(f"Sent {len(received)} updates ({len(received) / elapsed:.1f}/s), {size / elapsed:.0f} B/s")
+    print(f"Actions in the meeting log: {len(server.relay.meetings['1'].log)}")
+
+    mover.close()
+    watcher.close()
+    server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+#Benchmark for how a burst of remote actions affects the GUI
+#A host fills a meeting's log with strokes, then a client with a visible board joins and gets the whole log in one
+#burst. A 1 ms timer on the joiner's GUI thread measures how long the event loop goes without getting a turn
+#(how long the UI is frozen) while the backlog is applied, and how long until the board has caught up.
+#Run from the repository root: python -m Benchmarks.bench_remote_replay
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtCore import QTimer
+from PySide6.QtGui import QPen, QColor
+from PySide6.QtWidgets import QApplication, QGraphicsView
+
+from WhiteboardApplication.board_scene import BoardScene
+from WhiteboardApplication.board_sync import WhiteboardSync
+from WhiteboardApplication.Collab_Functionality.client import Client
+from WhiteboardApplication.Collab_Functionality.relay_server import RelayServerThread
+from WhiteboardApplication.stroke_item import StrokeItem
+
+STROKES = 3000
+POINTS_PER_STROKE = 24
+
+
+def wait_for(app, condition, timeout=120):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise TimeoutError
+        app.processEvents()
+
+
+def main():
+    app = QApplication.instance() or QApplication(sys.argv)
+    server = RelayServerThread()
+    port = server.start()
+    server.relay.compact_every = 0
+
+    host_scene = BoardScene()
+    host = WhiteboardSync(host_scene, "1", "host", Client("127.0.0.1", port, "1"))
+    wait_for(app, host.transport.connected.is_set)
+    for i in range(STROKES):
+        stroke = StrokeItem([(i % 60 * 15 + j * 0.5, i // 60 * 12 + j % 3) for j in range(POINTS_PER_STROKE)],
+                            QPen(QColor("#000000"), 2))
+        host_scene.addItem(stroke)
+        host.sync_drawing(stroke)
+    wait_for(app, lambda: host.last_seq == STROKES)
+
+    scene = BoardScene()
+    view = QGraphicsView(scene)
+    view.resize(1000, 700)
+    view.show()
+    app.processEvents()
+
+    ticks = []
+    timer = QTimer()
+    timer.setInterval(1)
+    timer.timeout.connect(lambda: ticks.append(time.perf_counter()))
+    timer.start()
+
+    start = time.perf_counter()
+    joiner = WhiteboardSync(scene, "1", "joiner", Client("127.0.0.1", port, "1"))
+    wait_for(app, lambda: len(scene.items()) == STROKES)
+    caught_up = time.perf_counter() - start
+    timer.stop()
+
+    gaps = sorted(later - earlier for earlier, later in zip(ticks, ticks[1:]))
+    print(f"{STROKES} remote strokes of {POINTS_PER_STROKE} points")
+    print(f"Caught up after {caught_up * 1000:.0f} ms")
+    print(f"Event loop gaps: longest {gaps[-1] * 1000:.1f} ms, 99th percentile "
+          f"{gaps[int(len(gaps) * 0.99)] * 1000:.1f} ms, {len(gaps)} timer ticks")
+
+    host.close()
+    joiner.close()
+    server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+#Benchmark for live stroke capture in BoardScene
+#Replays a 10k point pen stroke and reports the time spent per mouse move event,
+#comparing the old rebuild-the-whole-path approach with LiveStrokeItem
+#Run from the repository root: python -m Benchmarks.bench_stroke_capture
+import math
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtCore import QPointF, Qt
+from PySide6.QtGui import QPainterPath, QPen, QColor, QPainter
+from PySide6.QtWidgets import QApplication, QGraphicsPathItem, QGraphicsView
+
+from WhiteboardApplication.board_scene import BoardScene
+
+POINT_COUNT = 10000
+REPAINT_EVERY = 50
+
+
+def stroke_points(count):
+    return [QPointF(50 + i * 0.05, 250 + 200 * math.sin(i / 150)) for i in range(count)]
+
+
+def replay_legacy(scene, app, points):
+    """The previous implementation: lineTo + setPath on every move event"""
+    path = QPainterPath()
+    path.moveTo(points[0])
+    path_item = QGraphicsPathItem()
+    path_item.setPen(QPen(QColor("#000000"), 1))
+    scene.addItem(path_item)
+
+    timings = []
+    for i, point in enumerate(points[1:], 1):
+        start = time.perf_counter()
+        path.lineTo(point)
+        path_item.setPath(path)
+        if i % REPAINT_EVERY == 0:
+            app.processEvents()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def replay_live(scene, app, points):
+    pen = QPen(QColor("#000000"), 1)
+    pen.setCapStyle(Qt.PenCapStyle.RoundCap)
+    live_item = scene.start_stroke(points[0], pen)
+
+    timings = []
+    for i, point in enumerate(points[1:], 1):
+        start = time.perf_counter()
+        live_item.add_point(point)
+        if i % REPAINT_EVERY == 0:
+            app.processEvents()
+        timings.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    scene.finish_stroke(live_item)
+    finish_time = time.perf_counter() - start
+    return timings, finish_time
+
+
+def report(name, timings):
+    total = sum(timings)
+    first = sum(timings[:1000]) / 1000
+    last = sum(timings[-1000:]) / 1000
+    print(f"{name:>8}: {total * 1e6 / len(timings):8.2f} us/event overall, "
+          f"{first * 1e6:8.2f} us/event first 1k, {last * 1e6:8.2f} us/event last 1k")
+
+
+def main():
+    app = QApplication.instance() or QApplication(sys.argv)
+    points = stroke_points(POINT_COUNT)
+
+    for name in ("legacy", "live"):
+        scene = BoardScene()
+        view = QGraphicsView(scene)
+        view.setRenderHint(QPainter.RenderHint.Antialiasing, True)
+        view.resize(850, 1100)
+        view.show()
+        app.processEvents()
+
+        if name == "legacy":
+            report(name, replay_legacy(scene, app, points))
+        else:
+            timings, finish_time = replay_live(scene, app, points)
+            report(name, timings)
+            print(f"{'':>8}  finishing the stroke took {finish_time * 1e3:.2f} ms")
+
+        view.close()
+
+
+if __name__ == '__main__':
+    main()
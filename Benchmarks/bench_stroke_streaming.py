@@ -0,0 +1,108 @@
+#Benchmark for how far a collaborator's view lags behind the pen
+#One client draws strokes through the local relay at mouse rate while a second client watches. For every point
+#drawn it records how long until the watcher's board shows it, once with strokes sent on release only and once
+#with live streaming on. Without streaming the lag of a point is the rest of the stroke plus the round trip.
+#Run from the repository root: python -m Benchmarks.bench_stroke_streaming
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtCore import QPointF
+from PySide6.QtGui import QPen, QColor
+from PySide6.QtWidgets import QApplication
+
+from WhiteboardApplication.board_scene import BoardScene
+from WhiteboardApplication.board_sync import WhiteboardSync
+from WhiteboardApplication.Collab_Functionality.client import Client
+from WhiteboardApplication.Collab_Functionality.relay_server import RelayServerThread
+from WhiteboardApplication.stroke_item import StrokeItem
+
+STROKES = 10
+POINTS_PER_STROKE = 150
+MOVE_INTERVAL = 0.008     # Seconds between mouse move events, about a 120 Hz mouse
+
+
+def wait_for(app, condition, timeout=30):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise TimeoutError
+        app.processEvents()
+
+
+def shown_points(scene, stroke_id):
+    item = scene.item_by_id(stroke_id)
+    return 0 if item is None else len(item.points)
+
+
+def session(app, port, meeting, streaming):
+    drawer_scene = BoardScene()
+    watcher_scene = BoardScene()
+    drawer_scene.sync = WhiteboardSync(drawer_scene, meeting, "drawer", Client("127.0.0.1", port, meeting))
+    watcher = WhiteboardSync(watcher_scene, meeting, "watcher", Client("127.0.0.1", port, meeting))
+    wait_for(app, lambda: drawer_scene.sync.transport.connected.is_set() and watcher.transport.connected.is_set())
+    drawer_scene.sync.set_streaming(streaming)
+    # Keeps every point so the drawer's and the watcher's point counts line up
+    drawer_scene.set_stroke_tolerance(0)
+
+    lags = []
+    for stroke_number in range(STROKES):
+        drawn_at = []
+        shown = 0
+        y = stroke_number * 40.0
+
+        def watch():
+            nonlocal shown
+            count = shown_points(watcher_scene, stroke_id)
+            now = time.perf_counter()
+            while shown < min(count, len(drawn_at)):
+                lags.append(now - drawn_at[shown])
+                shown += 1
+
+        live_item = drawer_scene.start_stroke(QPointF(0, y), QPen(QColor("#000000"), 2))
+        stroke_id = drawer_scene.item_id(live_item)
+        drawn_at.append(time.perf_counter())
+        for i in range(1, POINTS_PER_STROKE):
+            next_move = time.perf_counter() + MOVE_INTERVAL
+            while time.perf_counter() < next_move:
+                app.processEvents()
+                watch()
+            drawer_scene.extend_stroke(live_item, QPointF(i * 3.0, y + (i % 7)))
+            drawn_at.append(time.perf_counter())
+
+        stroke = drawer_scene.finish_stroke(live_item)
+        drawer_scene.sync.sync_drawing(stroke)
+
+        def finished():
+            watch()
+            return isinstance(watcher_scene.item_by_id(stroke_id), StrokeItem)
+
+        wait_for(app, finished)
+        # The finished stroke shows every point that was drawn
+        now = time.perf_counter()
+        lags.extend(now - drawn for drawn in drawn_at[shown:])
+
+    drawer_scene.sync.close()
+    watcher.close()
+    return lags
+
+
+def main():
+    app = QApplication.instance() or QApplication(sys.argv)
+    server = RelayServerThread()
+    port = server.start()
+
+    print(f"{STROKES} strokes of {POINTS_PER_STROKE} points, a move every {MOVE_INTERVAL * 1000:.0f} ms")
+    for name, streaming, meeting in (("on release", False, "1"), ("streamed", True, "2")):
+        lags = sorted(session(app, port, meeting, streaming))
+        print(f"{name:10s}: lag per point mean {statistics.mean(lags) * 1000:6.1f} ms, "
+              f"median {lags[len(lags) // 2] * 1000:6.1f} ms, worst {lags[-1] * 1000:6.1f} ms")
+
+    server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+#Benchmark for the relay sync transport
+#Measures how long an action takes to get from one client to another through a localhost relay_server,
+#sent one at a time and then as a burst
+#Run from the repository root: python -m Benchmarks.bench_sync_transport
+import statistics
+import threading
+import time
+
+from WhiteboardApplication.Collab_Functionality.client import Client
+from WhiteboardApplication.Collab_Functionality.relay_server import RelayServerThread
+
+ROUND_TRIPS = 500
+BURST = 5000
+
+
+def main():
+    server = RelayServerThread()
+    port = server.start()
+    sender = Client("127.0.0.1", port, "bench")
+    receiver = Client("127.0.0.1", port, "bench")
+    sender.connected.wait(5)
+    receiver.connected.wait(5)
+
+    arrivals = {}
+    arrived = threading.Condition()
+
+    # The relay numbers every action in 'seq' itself, so arrivals are keyed on a field of our own
+    def on_action(action):
+        with arrived:
+            arrivals[action['bench_id']] = time.perf_counter()
+            arrived.notify_all()
+
+    receiver.listen(on_action)
+    points = [{'x': i * 2.5, 'y': i * 1.5} for i in range(24)]
+
+    latencies = []
+    for seq in range(ROUND_TRIPS):
+        start = time.perf_counter()
+        sender.send([{'action_type': 'pen', 'user_id': 'bench', 'points': points, 'bench_id': seq}])
+        with arrived:
+            arrived.wait_for(lambda: seq in arrivals, 5)
+        latencies.append(arrivals[seq] - start)
+
+    with arrived:
+        arrivals.clear()
+    start = time.perf_counter()
+    for batch_start in range(0, BURST, 200):
+        sender.send([{'action_type': 'pen', 'user_id': 'bench', 'points': points, 'bench_id': seq}
+                     for seq in range(batch_start, min(batch_start + 200, BURST))])
+    with arrived:
+        arrived.wait_for(lambda: len(arrivals) == BURST, 30)
+    burst_time = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"single action: median {statistics.median(latencies) * 1000:.3f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.3f} ms")
+    print(f"{BURST} actions in batches of 200: {burst_time * 1000:.1f} ms, {BURST / burst_time:.0f} actions/s")
+
+    sender.close()
+    receiver.close()
+    server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+#Benchmark for the sync traffic of typing into a text box
+#Types into the middle of text boxes of growing length one keystroke at a time and compares the JSON size of the
+#textbox_edit actions WhiteboardSync sends with a textbox_content action carrying the whole text, which is what
+#every keystroke used to send. Also times building the edit on the sending side and applying it on the receiving one.
+#Run from the repository root: python -m Benchmarks.bench_text_edits
+import json
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtGui import QTextCursor
+from PySide6.QtWidgets import QApplication
+
+from WhiteboardApplication.board_scene import BoardScene
+from WhiteboardApplication.board_sync import WhiteboardSync
+from WhiteboardApplication.sync_transport import SyncTransport
+from WhiteboardApplication.text_box import TextBox
+
+LENGTHS = (100, 1000, 10000)
+KEYSTROKES = 200
+
+
+def main():
+    app = QApplication.instance() or QApplication(sys.argv)
+    print(f"{KEYSTROKES} keystrokes typed into the middle of the text")
+    for length in LENGTHS:
+        scene = BoardScene()
+        remote_scene = BoardScene()
+        sync = WhiteboardSync(scene, "bench", "typist", SyncTransport())
+        remote = WhiteboardSync(remote_scene, "bench", "reader", SyncTransport())
+        sent = []
+        sync.outbound.put = lambda action, coalesce_key=None, urgent=False: sent.append(action)
+
+        text_box = TextBox()
+        text_box.setPlainText("lorem ipsum " * (length // 12))
+        scene.sync = sync
+        scene.add_text_box(text_box)
+        remote.handle_remote_action(sent.pop())
+
+        whole_text_bytes = 0
+        start = time.perf_counter()
+        for i in range(KEYSTROKES):
+            cursor = QTextCursor(text_box.document())
+            cursor.setPosition(length // 2 + i)
+            cursor.insertText("x")
+            whole_text_bytes += len(json.dumps({'action_type': 'textbox_content', 'user_id': "typist",
+                                                'text_content': text_box.toPlainText(), 'text_id': sent[-1]['text_id'],
+                                                'timestamp': time.time()}))
+        typing = time.perf_counter() - start
+
+        edit_bytes = sum(len(json.dumps(action)) for action in sent)
+        start = time.perf_counter()
+        for action in sent:
+            remote.handle_remote_action(action)
+        applying = time.perf_counter() - start
+        remote_box = remote_scene.item_by_id(sent[-1]['text_id'])
+        assert remote_box.toPlainText() == text_box.toPlainText()
+
+        print(f"{length:6d} chars: whole text {whole_text_bytes / KEYSTROKES:8.0f} B/keystroke, "
+              f"edit {edit_bytes / KEYSTROKES:5.0f} B/keystroke, "
+              f"send {typing / KEYSTROKES * 1e6:6.0f} us, apply {applying / KEYSTROKES * 1e6:6.0f} us")
+        sync.close()
+        remote.close()
+    app.processEvents()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+#Benchmark for tile cached ink rendering in BoardScene
+#Scrolls a board holding 20k strokes top to bottom and reports frame times with
+#vector rendering and with tile rendering (first pass fills the cache, second pass reuses it)
+#Run from the repository root: python -m Benchmarks.bench_tile_rendering
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QPen, QColor, QPainter
+from PySide6.QtWidgets import QApplication, QGraphicsView
+
+from WhiteboardApplication.board_scene import BoardScene
+from WhiteboardApplication.stroke_item import StrokeItem
+
+STROKE_COUNT = 20000
+POINTS_PER_STROKE = 24
+BOARD_WIDTH = 850
+BOARD_HEIGHT = 20000
+SCROLL_STEP = 120
+
+
+def build_board(scene):
+    random.seed(3)
+    for _ in range(STROKE_COUNT):
+        x = random.uniform(0, BOARD_WIDTH - 60)
+        y = random.uniform(0, BOARD_HEIGHT - 60)
+        points = [(x + i * 2.5, y + random.uniform(-8, 8)) for i in range(POINTS_PER_STROKE)]
+        pen = QPen(QColor("#000000"), random.choice([1, 5]))
+        pen.setCapStyle(Qt.PenCapStyle.RoundCap)
+        scene.addItem(StrokeItem(points, pen))
+
+
+def scroll_frames(view):
+    scroll_bar = view.verticalScrollBar()
+    timings = []
+    for value in range(scroll_bar.minimum(), scroll_bar.maximum() + 1, SCROLL_STEP):
+        start = time.perf_counter()
+        scroll_bar.setValue(value)
+        view.viewport().repaint()
+        timings.append(time.perf_counter() - start)
+    scroll_bar.setValue(scroll_bar.minimum())
+    return timings
+
+
+def report(name, timings):
+    timings = sorted(timings)
+    mean = sum(timings) / len(timings)
+    p95 = timings[int(len(timings) * 0.95)]
+    print(f"{name:>12}: {len(timings)} frames, mean {mean * 1e3:7.2f} ms, p95 {p95 * 1e3:7.2f} ms, "
+          f"max {timings[-1] * 1e3:7.2f} ms")
+
+
+def main():
+    app = QApplication.instance() or QApplication(sys.argv)
+
+    scene = BoardScene()
+    scene.setSceneRect(0, 0, BOARD_WIDTH, BOARD_HEIGHT)
+    build_board(scene)
+
+    view = QGraphicsView(scene)
+    view.setRenderHint(QPainter.RenderHint.Antialiasing, True)
+    view.resize(850, 1100)
+    view.show()
+    app.processEvents()
+
+    report("vector", scroll_frames(view))
+
+    scene.set_tile_rendering(True)
+    app.processEvents()
+    report("tiles cold", scroll_frames(view))
+    report("tiles warm", scroll_frames(view))
+    print(f"{'':>12}  {len(scene.tile_cache)} tiles cached")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+#Benchmark for undo groups
+#Fills a board with strokes drawn from raster tiles, clears it and undoes and redoes the clear as one grouped step.
+#For comparison the same strokes are then taken off and put back as one undo step per stroke, which is what a bulk
+#operation cost before groups. Reports the time of each and how often the tile cache was invalidated.
+#Run from the repository root: python -m Benchmarks.bench_undo_groups
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtGui import QColor, QPen
+from PySide6.QtWidgets import QApplication
+
+from WhiteboardApplication.board_scene import BoardScene
+from WhiteboardApplication.stroke_item import StrokeItem
+from WhiteboardApplication.undo_history import UndoHistory
+
+STROKES = 3000
+POINTS = 50
+
+
+def filled_board():
+    random.seed(1)
+    scene = BoardScene()
+    scene.setSceneRect(0, 0, 3000, 2000)
+    scene.set_tile_rendering(True)
+    pen = QPen(QColor("#000000"), 2)
+    for _ in range(STROKES):
+        x, y = random.uniform(0, 3000), random.uniform(0, 2000)
+        scene.addItem(StrokeItem([(x + i, y + random.uniform(-3, 3)) for i in range(POINTS)], pen))
+    # A view's worth of tiles at a few zoom levels, as after some panning and zooming
+    for zoom in (0.5, 1.0, 2.0):
+        for key in list(scene.tile_cache.tile_keys(zoom, scene.sceneRect()))[:150]:
+            scene.tile_cache.tile(scene, key)
+    return scene
+
+
+def count_invalidations(scene):
+    calls = []
+    invalidate = scene.tile_cache.invalidate
+    scene.tile_cache.invalidate = lambda rect: calls.append(rect) or invalidate(rect)
+    return calls
+
+
+def timed(label, calls, work):
+    del calls[:]
+    start = time.perf_counter()
+    work()
+    print(f"  {label}: {(time.perf_counter() - start) * 1000:.0f} ms, {len(calls)} tile invalidations")
+
+
+def main():
+    app = QApplication.instance() or QApplication(sys.argv)
+
+    scene = filled_board()
+    calls = count_invalidations(scene)
+    print(f"One grouped step for {STROKES} strokes:")
+    timed("Clear", calls, scene.clear_board)
+    timed("Undo", calls, scene.undo)
+    timed("Redo", calls, scene.redo)
+
+    scene = filled_board()
+    # Every one of the steps has to stay undoable
+    scene.history = UndoHistory(max_steps=None)
+    calls = count_invalidations(scene)
+    strokes = [item for item in scene.items() if item.parentItem() is None]
+    print(f"One step per stroke for {STROKES} strokes:")
+
+    def remove_each():
+        for stroke in strokes:
+            scene.removeItem(stroke)
+            scene.add_erase_to_undo([stroke])
+
+    def undo_each():
+        for _ in strokes:
+            scene.history.undo(scene)
+
+    def redo_each():
+        for _ in strokes:
+            scene.history.redo(scene)
+
+    timed("Clear", calls, remove_each)
+    timed("Undo", calls, undo_each)
+    timed("Redo", calls, redo_each)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+#Benchmark for the bounded undo history
+#Draws and erases a few thousand strokes, each its own undo step, once with the history unbounded and once with
+#the default limits scaled down. Reports the Python memory still allocated afterwards, what the history says it
+#holds in memory and on disk, and how long undoing every step, spilled ones included, takes.
+#Run from the repository root: python -m Benchmarks.bench_undo_history
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtGui import QColor, QPen
+from PySide6.QtWidgets import QApplication
+
+from WhiteboardApplication.board_scene import BoardScene
+from WhiteboardApplication.stroke_item import StrokeItem
+from WhiteboardApplication.undo_history import UndoHistory
+
+STROKES = 3000
+POINTS = 200
+MAX_BYTES = 8 * 1024 * 1024
+
+
+def session(history):
+    random.seed(1)
+    scene = BoardScene()
+    scene.history = history
+    pen = QPen(QColor("#000000"), 2)
+    for _ in range(STROKES):
+        x, y = random.uniform(0, 600), random.uniform(0, 500)
+        stroke = StrokeItem([(x + i, y + random.uniform(-3, 3)) for i in range(POINTS)], pen)
+        scene.addItem(stroke)
+        scene.add_item_to_undo(stroke)
+        scene.removeItem(stroke)
+        scene.add_erase_to_undo([stroke])
+    return scene
+
+
+def measure(name, history):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    scene = session(history)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    held, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    usage = scene.history.usage()
+    print(f"{name}: {STROKES} strokes drawn and erased in {elapsed:.2f} s, {held / 1e6:.1f} MB still allocated")
+    print(f"  {usage['undo_steps']} steps, {usage['memory_bytes'] / 1e6:.1f} MB held in memory, "
+          f"{usage['spilled_steps']} spilled ({usage['spilled_bytes'] / 1e6:.1f} MB on disk), "
+          f"{usage['dropped_steps']} dropped")
+
+    start = time.perf_counter()
+    undone = len(scene.undo_list)
+    for _ in range(undone):
+        scene.history.undo(scene)
+    print(f"  Undoing all {undone} steps took {(time.perf_counter() - start) * 1000:.0f} ms")
+    scene.history.clear()
+
+
+def main():
+    app = QApplication.instance() or QApplication(sys.argv)
+    measure("Unbounded", UndoHistory(max_steps=None, max_bytes=None, max_spill_bytes=None))
+    measure("Bounded", UndoHistory(max_steps=2 * STROKES, max_bytes=MAX_BYTES))
+    measure("Spilling most steps", UndoHistory(max_bytes=MAX_BYTES // 8))
+
+
+if __name__ == '__main__':
+    main()
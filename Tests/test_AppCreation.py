@@ -14,11 +14,11 @@ from pytestqt import *
 
 
 
-def test_AppCreation(qtbot):
+def test_AppCreation(qtbot, tmp_path):
     print("Hello World")
 
 
-    window = MainWindow()
+    window = MainWindow(str(tmp_path))
     qtbot.addWidget(window)
     window.show()
 
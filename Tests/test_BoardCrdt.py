@@ -0,0 +1,51 @@
+#Tests file for board_crdt.py and crdt_simulator.py in WhiteboardApplication directory
+import itertools
+
+from WhiteboardApplication.board_crdt import BoardState
+from WhiteboardApplication.crdt_simulator import ConvergenceSimulator
+
+
+def test_AddWinsOverConcurrentRemove():
+    a = BoardState("a")
+    b = BoardState("b")
+    b.apply(a.add_item("stroke"))
+
+    # a erases the stroke while b, not having seen that, brings it back
+    removed = a.remove_item("stroke")
+    b.apply(b.remove_item("stroke"))
+    restored = b.add_item("stroke")
+    a.apply(restored)
+    b.apply(removed)
+
+    assert a.contains("stroke") and b.contains("stroke")
+
+
+def test_ConcurrentEditsMergeInAnyOrder():
+    origin = BoardState("origin")
+    ops = [origin.add_item("text"), origin.move_item("text", [0, 0]), origin.insert_text("text", 0, "ac")]
+    a = BoardState("a")
+    b = BoardState("b")
+    for op in ops:
+        a.apply(op)
+        b.apply(op)
+
+    # Both type between the same two characters and drag the box at the same time
+    edits = [a.insert_text("text", 1, "xy"), a.move_item("text", [5, 5]),
+             b.insert_text("text", 1, "b"), b.delete_text("text", 0, 1), b.move_item("text", [9, 9])]
+    digests = set()
+    for order in itertools.permutations(ops + edits):
+        replica = BoardState("c")
+        for op in order + order[:2]:
+            replica.apply(op)
+        digests.add(str(replica.digest()))
+
+    assert len(digests) == 1
+    _items, _positions, texts = replica.digest()
+    assert sorted(texts["text"][0]) == sorted("xybc")
+
+
+def test_SimulatedClientsConverge():
+    for seed in range(5):
+        simulator = ConvergenceSimulator(replicas=4, seed=seed)
+        assert simulator.run(500)
+        assert simulator.states[0].digest()[0]
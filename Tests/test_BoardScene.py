@@ -0,0 +1,73 @@
+#Tests file for board_scene.py in WhiteboardApplication directory
+from PySide6.QtCore import QPointF
+from PySide6.QtGui import QPen, QColor
+from pytestqt.plugin import qtbot
+
+from WhiteboardApplication.board_scene import BoardScene
+from WhiteboardApplication.stroke_item import StrokeItem
+
+
+def add_stroke(scene, points, item_id=None):
+    stroke = StrokeItem(points, QPen(QColor("#000000"), 2))
+    scene.addItem(stroke, item_id)
+    scene.add_item_to_undo(stroke)
+    return stroke
+
+
+def test_ItemsKeepTheirIdThroughUndo(qtbot):
+    scene = BoardScene()
+    first = add_stroke(scene, [(0, 0), (10, 0)])
+    second = add_stroke(scene, [(0, 20), (10, 20)], "remote-7")
+
+    first_id = scene.item_id(first)
+    assert first_id != scene.item_id(second)
+    assert scene.item_id(second) == "remote-7"
+    assert scene.item_by_id(first_id) is first
+    assert scene.item_by_id("remote-7") is second
+
+    scene.undo()
+    assert scene.item_by_id("remote-7") is None
+    scene.redo()
+    assert scene.item_by_id("remote-7") is second
+
+    # Two scenes never hand out the same id
+    assert first_id != scene.item_id(add_stroke(BoardScene(), [(0, 0), (10, 0)]))
+
+
+def test_CutPiecesAreNamedAfterTheirStroke(qtbot):
+    ids = []
+    for _ in range(2):
+        scene = BoardScene()
+        add_stroke(scene, [(0, 0), (100, 0)], "stroke-1")
+        scene.cut_path([QPointF(50, -20), QPointF(50, 20)])
+        ids.append(sorted(scene.items_by_id))
+
+    assert ids[0] == ids[1]
+    assert len(ids[0]) == 2 and all(item_id.startswith("stroke-1.") for item_id in ids[0])
+
+
+def test_UndoGroupIsOneBatchedStep(qtbot):
+    scene = BoardScene()
+    with scene.undo_group():
+        strokes = [add_stroke(scene, [(0, y), (10, y)]) for y in (0, 10, 20)]
+        with scene.undo_group():
+            scene.removeItem(strokes[2])
+            scene.add_erase_to_undo([strokes[2]])
+    # The stroke drawn and erased inside the group isn't part of the step at all
+    assert len(scene.undo_list) == 1 and len(scene.undo_list[0]) == 2
+    scene.undo()
+    assert not scene.items()
+    scene.redo()
+    assert set(scene.items()) == set(strokes[:2])
+
+    scene.clear_board()
+    assert not scene.items() and len(scene.undo_list) == 2
+
+    # Putting the whole board back drops the tiles once, not once per stroke
+    scene.set_tile_rendering(True)
+    invalidated = []
+    invalidate = scene.tile_cache.invalidate
+    scene.tile_cache.invalidate = lambda rect: invalidated.append(rect) or invalidate(rect)
+    scene.undo()
+    assert set(scene.items()) == set(strokes[:2])
+    assert len(invalidated) == 1 and invalidated[0].contains(strokes[1].sceneBoundingRect())
@@ -0,0 +1,308 @@
+#Tests file for board_sync.py in WhiteboardApplication directory
+import base64
+import threading
+
+from PySide6.QtCore import QPointF, QEvent, Qt
+from PySide6.QtGui import QTextCursor, QPen, QColor
+from PySide6.QtWidgets import QGraphicsSceneMouseEvent
+from pytestqt.plugin import qtbot
+
+from WhiteboardApplication.board_scene import BoardScene
+from WhiteboardApplication.board_sync import WhiteboardSync
+from WhiteboardApplication.notebook_format import notebook_items, snapshot_items, pack_records
+from WhiteboardApplication.point_codec import pack_points
+from WhiteboardApplication.stroke_item import StrokeItem
+from WhiteboardApplication.sync_transport import SyncTransport
+from WhiteboardApplication.text_box import TextBox, select_range, char_format_of, format_of
+
+
+def test_BurstOfRemoteActionsIsReplayedInBatches(qtbot):
+    scene = BoardScene()
+    sync = WhiteboardSync(scene, "1234", "joiner", SyncTransport())
+    sync.REPLAY_BUDGET = 1
+    replayed = []
+    sync.action_received.connect(lambda action: replayed.append(action['seq']))
+
+    def deliver():
+        for seq in range(1, 2001):
+            sync.receive_action({'action_type': 'pen', 'user_id': "host", 'color': "#000000", 'size': 2, 'seq': seq,
+                                 'point_data': pack_points([(seq, 0), (seq, 10)]), 'item_id': f"stroke-{seq}"})
+
+    thread = threading.Thread(target=deliver)
+    thread.start()
+    thread.join()
+
+    # One pass only gets through what fits in the budget, the rest is left for later passes
+    sync.replay_incoming()
+    assert 0 < len(replayed) < 2000
+
+    qtbot.waitUntil(lambda: len(replayed) == 2000, timeout=10000)
+    assert replayed == list(range(1, 2001))
+    assert len(scene.items()) == 2000
+    assert not sync.replay_scheduled
+    sync.close()
+
+
+def type_text(text_box, position, text):
+    cursor = QTextCursor(text_box.document())
+    cursor.setPosition(position)
+    cursor.insertText(text)
+
+
+def test_ConcurrentTypingInATextBoxMerges(qtbot):
+    scenes = [BoardScene(), BoardScene()]
+    syncs = [WhiteboardSync(scene, "1234", user, SyncTransport()) for scene, user in zip(scenes, "ab")]
+    sent = [[], []]
+    for sync, outbox in zip(syncs, sent):
+        sync.queue_action = lambda action, coalesce_key=None, urgent=False, outbox=outbox: outbox.append(vars(action))
+
+    text_box = TextBox()
+    text_box.setPlainText("hello")
+    scenes[0].sync = syncs[0]
+    scenes[0].add_text_box(text_box)
+    syncs[1].handle_remote_action(sent[0].pop())
+    remote_box = scenes[1].item_by_id(scenes[0].item_id(text_box))
+    assert remote_box.toPlainText() == "hello"
+
+    # Both type before seeing the other's edit, one keystroke at a time on one side
+    for offset, char in enumerate(" world"):
+        type_text(text_box, 5 + offset, char)
+    type_text(remote_box, 0, "oh ")
+    select_range(remote_box.document(), 3, 5).mergeCharFormat(char_format_of({'bold': True}))
+    # A keystroke only carries the character typed
+    assert len(sent[0]) == 6 and all(action['text_content'] is None for action in sent[0])
+    for action in sent[0]:
+        syncs[1].handle_remote_action(action)
+    for action in sent[1]:
+        syncs[0].handle_remote_action(action)
+
+    assert text_box.toPlainText() == remote_box.toPlainText() == "oh hello world"
+    for box in (text_box, remote_box):
+        assert format_of(select_range(box.document(), 4, 0).charFormat()) == {'bold': True}
+        assert format_of(select_range(box.document(), 10, 0).charFormat()) == {}
+    for sync in syncs:
+        sync.close()
+
+
+def test_UndoOnlyTakesBackTheUsersOwnSteps(qtbot):
+    scenes = [BoardScene(), BoardScene()]
+    syncs = [WhiteboardSync(scene, "1234", user, SyncTransport()) for scene, user in zip(scenes, "ab")]
+    sent = [[], []]
+    for scene, sync, outbox in zip(scenes, syncs, sent):
+        scene.sync = sync
+        sync.queue_action = lambda action, coalesce_key=None, urgent=False, outbox=outbox: outbox.append(vars(action))
+
+    def deliver():
+        for sender, receiver in ((0, 1), (1, 0)):
+            for action in sent[sender]:
+                syncs[receiver].handle_remote_action(action)
+            sent[sender].clear()
+
+    def draw(index, y):
+        stroke = StrokeItem([(0, y), (100, y)], QPen(QColor("#000000"), 2))
+        scenes[index].addItem(stroke)
+        scenes[index].add_item_to_undo(stroke)
+        syncs[index].sync_drawing(stroke)
+        return scenes[index].item_id(stroke)
+
+    def on_board(item_id):
+        return [scene.item_by_id(item_id) is not None for scene in scenes]
+
+    mine = draw(0, 0)
+    theirs = draw(1, 50)
+    deliver()
+    # The other user's stroke never lands on this user's undo stack
+    assert len(scenes[0].undo_list) == len(scenes[1].undo_list) == 1
+
+    scenes[0].undo()
+    deliver()
+    assert on_board(mine) == [False, False] and on_board(theirs) == [True, True]
+    scenes[0].redo()
+    deliver()
+    assert on_board(mine) == [True, True]
+
+    # Undoing an erase puts the very same strokes back on every board
+    erased = scenes[0].erase_path([QPointF(50, -10), QPointF(50, 60)])
+    scenes[0].add_erase_to_undo(erased)
+    syncs[0].sync_eraser([QPointF(50, -10), QPointF(50, 60)], items=erased)
+    remote_stroke = scenes[1].item_by_id(theirs)
+    deliver()
+    assert on_board(mine) == on_board(theirs) == [False, False]
+    scenes[0].undo()
+    deliver()
+    assert on_board(mine) == on_board(theirs) == [True, True]
+    assert scenes[1].item_by_id(theirs).points == remote_stroke.points
+    assert syncs[0].board.contains(theirs) and syncs[1].board.contains(theirs)
+    for sync in syncs:
+        sync.close()
+
+
+def scene_mouse_event(event_type, position):
+    event = QGraphicsSceneMouseEvent(event_type)
+    event.setScenePos(position)
+    event.setButton(Qt.LeftButton)
+    event.setButtons(Qt.LeftButton)
+    return event
+
+
+def test_PixelEraseAndItsUndoLeaveTheSameBoardEverywhere(qtbot):
+    scenes = [BoardScene(), BoardScene()]
+    syncs = [WhiteboardSync(scene, "1234", user, SyncTransport()) for scene, user in zip(scenes, "ab")]
+    sent = [[], []]
+    for scene, sync, outbox in zip(scenes, syncs, sent):
+        scene.sync = sync
+        sync.queue_action = lambda action, coalesce_key=None, urgent=False, outbox=outbox: outbox.append(vars(action))
+
+    def deliver():
+        for sender, receiver in ((0, 1), (1, 0)):
+            for action in sent[sender]:
+                syncs[receiver].handle_remote_action(action)
+            sent[sender].clear()
+
+    def strokes(scene):
+        return {item_id: [(round(x, 3), round(y, 3)) for x, y in item.points]
+                for item_id, item in scene.items_by_id.items()}
+
+    stroke = StrokeItem([(0, 50), (100, 50), (200, 50)], QPen(QColor("#000000"), 2))
+    scenes[1].addItem(stroke, "A")
+    syncs[1].sync_drawing(stroke)
+    deliver()
+
+    # A drag whose path doesn't survive the trip to the other board exactly, cut pieces and all
+    scenes[0].active_tool = "pixel_eraser"
+    scenes[0].mousePressEvent(scene_mouse_event(QEvent.Type.GraphicsSceneMousePress, QPointF(100.01, 50.02)))
+    scenes[0].mouseMoveEvent(scene_mouse_event(QEvent.Type.GraphicsSceneMouseMove, QPointF(130.03, 50.01)))
+    scenes[0].mouseReleaseEvent(scene_mouse_event(QEvent.Type.GraphicsSceneMouseRelease, QPointF(130.03, 50.01)))
+    deliver()
+    assert "A" not in scenes[0].items_by_id and len(scenes[0].items_by_id) == 2
+    assert strokes(scenes[1]) == strokes(scenes[0])
+
+    scenes[0].undo()
+    deliver()
+    assert list(scenes[0].items_by_id) == list(scenes[1].items_by_id) == ["A"]
+    assert strokes(scenes[1]) == strokes(scenes[0])
+    scenes[0].redo()
+    deliver()
+    assert strokes(scenes[1]) == strokes(scenes[0]) and "A" not in strokes(scenes[1])
+    for sync in syncs:
+        sync.close()
+
+
+def test_CutUndoneAndCutAgainLeavesTheSameBoardEverywhere(qtbot):
+    scenes = [BoardScene(), BoardScene()]
+    syncs = [WhiteboardSync(scene, "1234", user, SyncTransport()) for scene, user in zip(scenes, "ab")]
+    sent = [[], []]
+    for scene, sync, outbox in zip(scenes, syncs, sent):
+        scene.sync = sync
+        sync.queue_action = lambda action, coalesce_key=None, urgent=False, outbox=outbox: outbox.append(vars(action))
+
+    def deliver():
+        for sender, receiver in ((0, 1), (1, 0)):
+            for action in sent[sender]:
+                syncs[receiver].handle_remote_action(action)
+            sent[sender].clear()
+
+    def strokes(scene):
+        return {item_id: [(round(x, 3), round(y, 3)) for x, y in item.points]
+                for item_id, item in scene.items_by_id.items()}
+
+    def erase_at(x):
+        scenes[0].mousePressEvent(scene_mouse_event(QEvent.Type.GraphicsSceneMousePress, QPointF(x, 50)))
+        scenes[0].mouseReleaseEvent(scene_mouse_event(QEvent.Type.GraphicsSceneMouseRelease, QPointF(x, 50)))
+        deliver()
+
+    stroke = StrokeItem([(0, 50), (200, 50)], QPen(QColor("#000000"), 2))
+    scenes[0].addItem(stroke, "A")
+    syncs[0].sync_drawing(stroke)
+    deliver()
+    scenes[0].active_tool = "pixel_eraser"
+
+    erase_at(60)
+    scenes[0].undo()
+    deliver()
+    # The same stroke cut somewhere else, its pieces have other shapes than the first cut's
+    erase_at(140)
+    assert len(strokes(scenes[0])) == 2
+    assert strokes(scenes[1]) == strokes(scenes[0])
+
+    scenes[0].undo()
+    deliver()
+    scenes[0].redo()
+    deliver()
+    assert strokes(scenes[1]) == strokes(scenes[0])
+    for sync in syncs:
+        sync.close()
+
+
+def test_LateJoinerGetsBackItemsRemovedBeforeTheyJoined(qtbot):
+    scenes = [BoardScene(), BoardScene(), BoardScene()]
+    syncs = [WhiteboardSync(scene, "1234", user, SyncTransport()) for scene, user in zip(scenes, "abc")]
+    sent = []
+    for scene, sync in zip(scenes, syncs):
+        scene.sync = sync
+        sync.queue_action = lambda action, coalesce_key=None, urgent=False: sent.append(vars(action))
+
+    def deliver(receivers):
+        for action in sent:
+            for index in receivers:
+                syncs[index].handle_remote_action(action)
+        sent.clear()
+
+    def draw(y):
+        stroke = StrokeItem([(0, y), (100, y)], QPen(QColor("#000000"), 2))
+        scenes[0].addItem(stroke)
+        scenes[0].add_item_to_undo(stroke)
+        syncs[0].sync_drawing(stroke)
+        return scenes[0].item_id(stroke)
+
+    erased = draw(0)
+    scenes[0].remove_items([scenes[0].item_by_id(erased)])
+    undone = draw(50)
+    scenes[0].undo()
+    deliver([1])
+
+    # The third user joins from a snapshot of the board as it is now, without either stroke
+    snapshot = {'seq': 1, 'item_ids': [scenes[1].item_id(item) for item in notebook_items(scenes[1])],
+                'data': base64.b64encode(pack_records(snapshot_items(notebook_items(scenes[1])))).decode('ascii'),
+                'board': syncs[1].board.dump()}
+    syncs[2].apply_snapshot(snapshot)
+    assert not scenes[2].items()
+
+    scenes[0].redo()
+    scenes[0].undo()
+    scenes[0].undo()
+    deliver([1, 2])
+    for scene in scenes:
+        assert scene.item_by_id(erased) is not None and scene.item_by_id(undone) is None
+    scenes[0].redo()
+    scenes[0].redo()
+    deliver([1, 2])
+    for scene in scenes:
+        assert scene.item_by_id(erased) is None and scene.item_by_id(undone) is not None
+    assert scenes[2].item_by_id(undone).points == [(0, 50), (100, 50)]
+    for sync in syncs:
+        sync.close()
+
+
+def test_UnfinishedRemoteStrokesDoNotStayForever(qtbot):
+    scene = BoardScene()
+    sync = WhiteboardSync(scene, "1234", "a", SyncTransport())
+
+    def chunk(user, item_id):
+        sync.handle_remote_action({'action_type': 'stroke_chunk', 'user_id': user, 'item_id': item_id,
+                                   'point_data': pack_points([(0, 0), (10, 10)]), 'color': "#000000", 'size': 2})
+
+    chunk("b", "b-1")
+    chunk("c", "c-1")
+    chunk("c", "c-2")
+    assert len(scene.items_by_id) == 3
+
+    # Their user leaves before the finished stroke is sent
+    sync.presence.apply_update({'user': "c", 'gone': True})
+    assert list(scene.items_by_id) == ["b-1"]
+
+    # The finished stroke is lost on the way
+    sync.LIVE_STROKE_TIMEOUT = 0
+    sync.drop_stale_live_strokes()
+    assert scene.items_by_id == {} and not sync.live_timer.isActive()
+    sync.close()
@@ -0,0 +1,61 @@
+#Tests file for board_view.py in WhiteboardApplication directory
+from PySide6.QtGui import QPen, QColor
+from PySide6.QtWidgets import QGraphicsView, QGraphicsItem
+from pytestqt.plugin import qtbot
+
+from WhiteboardApplication.board_scene import BoardScene
+from WhiteboardApplication.board_view import BoardView, RENDER_PROFILES
+from WhiteboardApplication.stroke_item import StrokeItem
+
+
+def test_RenderProfilesApplyToViewAndScene(qtbot):
+    scene = BoardScene()
+    stroke = StrokeItem([(0, 0), (50, 50)], QPen(QColor("#000000"), 1))
+    scene.addItem(stroke)
+
+    view = BoardView()
+    qtbot.addWidget(view)
+    view.setScene(scene)
+
+    view.set_render_profile(RENDER_PROFILES['Balanced'])
+    assert view.viewportUpdateMode() == QGraphicsView.ViewportUpdateMode.SmartViewportUpdate
+    assert view.cacheMode() == QGraphicsView.CacheModeFlag.CacheBackground
+    assert stroke.cacheMode() == QGraphicsItem.CacheMode.DeviceCoordinateCache
+
+    view.set_render_profile(RENDER_PROFILES['Quality'])
+    assert view.viewportUpdateMode() == QGraphicsView.ViewportUpdateMode.MinimalViewportUpdate
+    assert stroke.cacheMode() == QGraphicsItem.CacheMode.NoCache
+    assert not scene.tile_rendering
+
+
+def test_FpsOverlayCountsFrames(qtbot):
+    view = BoardView()
+    qtbot.addWidget(view)
+    view.setScene(BoardScene())
+    view.show()
+    qtbot.wait(50)
+    view.set_show_fps(True)
+
+    for _ in range(3):
+        view.viewport().repaint()
+
+    fps, paint_ms = view.fps_stats()
+    assert fps >= 3
+    assert paint_ms > 0
+
+
+def test_RenderProfilesLeaveTheUsersTileSettingAlone(qtbot):
+    scene = BoardScene()
+    view = BoardView()
+    qtbot.addWidget(view)
+    view.setScene(scene)
+
+    view.set_render_profile(RENDER_PROFILES['Fast'])
+    assert scene.tile_rendering
+    view.set_render_profile(RENDER_PROFILES['Quality'])
+    assert not scene.tile_rendering
+
+    view.set_tile_rendering(True)
+    view.set_render_profile(RENDER_PROFILES['Fast'])
+    view.set_render_profile(RENDER_PROFILES['Balanced'])
+    assert scene.tile_rendering
@@ -14,9 +14,9 @@ from pytestqt.plugin import qtbot
 from WhiteboardApplication.main import *
 from pytestqt import *
 
-def test_PenButton(qtbot):
+def test_PenButton(qtbot, tmp_path):
 
-    window = MainWindow()
+    window = MainWindow(str(tmp_path))
     qtbot.addWidget(window)
     window.show()
 
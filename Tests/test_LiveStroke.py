@@ -0,0 +1,32 @@
+#Tests file for live_stroke.py in WhiteboardApplication directory
+from PySide6.QtCore import QPointF, Qt
+from PySide6.QtGui import QPen, QColor
+from pytestqt.plugin import qtbot
+
+from WhiteboardApplication.board_scene import BoardScene
+from WhiteboardApplication.live_stroke import LiveStrokeItem
+from WhiteboardApplication.stroke_item import StrokeItem
+
+
+def test_LiveStrokeCommitsToPathItem(qtbot):
+    scene = BoardScene()
+    scene.set_stroke_tolerance(0)
+    pen = QPen(QColor("#000000"), 5)
+
+    live_item = scene.start_stroke(QPointF(10, 10), pen)
+    for i in range(1, 1000):
+        scene.extend_stroke(live_item, QPointF(10 + i, 10 + (i % 7)))
+
+    # Long strokes get sealed into cached chunks instead of one growing path
+    assert len(live_item.chunks) > 1
+    assert live_item.boundingRect().contains(QPointF(1009, 10))
+
+    stroke = scene.finish_stroke(live_item)
+
+    assert isinstance(stroke, StrokeItem)
+    assert live_item.scene() is None
+    assert stroke.scene() is scene
+    assert len(stroke.points) == 1000
+    assert stroke.path().elementCount() == 1000
+    assert stroke.pen().width() == 5
+    assert not any(isinstance(item, LiveStrokeItem) for item in scene.items())
@@ -0,0 +1,113 @@
+#Tests file for notebook_format.py in WhiteboardApplication directory
+import pytest
+from PySide6.QtCore import Qt, QPointF
+from PySide6.QtGui import QPen, QColor, QPixmap, QPainterPath
+from PySide6.QtWidgets import QGraphicsPathItem, QGraphicsView
+from pytestqt.plugin import qtbot
+
+from WhiteboardApplication.board_scene import BoardScene
+from WhiteboardApplication.notebook_format import (encode_items, decode_items, notebook_items, save_notebook,
+                                                   NotebookReader, NotebookFormatError)
+from WhiteboardApplication.resize_handle_image import ResizablePixmapItem
+from WhiteboardApplication.stroke_item import StrokeItem
+from WhiteboardApplication.text_box import TextBox
+
+
+def test_NotebookRoundTrip(qtbot):
+    scene = BoardScene()
+
+    stroke = StrokeItem([(0, 0), (10.5, 20.25), (30, 5)], QPen(QColor(255, 255, 0, 30), 10), highlighter=True, smooth=True)
+    stroke.setPos(5, 6)
+    scene.addItem(stroke)
+
+    pen_stroke = StrokeItem([(1, 2), (3, 4), (5, 8)], QPen(QColor("#000000"), 1))
+    scene.addItem(pen_stroke)
+
+    curve = QPainterPath()
+    curve.moveTo(0, 0)
+    curve.cubicTo(10, 0, 20, 10, 30, 30)
+    scene.addItem(QGraphicsPathItem(curve))
+
+    text_box = TextBox()
+    text_box.setPlainText("Notes")
+    text_box.setPos(100, 120)
+    scene.addItem(text_box)
+
+    pixmap = QPixmap(40, 20)
+    pixmap.fill(Qt.GlobalColor.red)
+    scene.addItem(ResizablePixmapItem(pixmap))
+
+    items = decode_items(encode_items(notebook_items(scene)))
+
+    loaded_pen_stroke = next(item for item in items if isinstance(item, StrokeItem) and not item.highlighter)
+    assert loaded_pen_stroke.path() == pen_stroke.path()
+
+    loaded_stroke = next(item for item in items if isinstance(item, StrokeItem) and item.highlighter)
+    assert loaded_stroke.points == stroke.points
+    assert loaded_stroke.highlighter and loaded_stroke.smooth
+    assert loaded_stroke.pen().color() == stroke.pen().color()
+    assert loaded_stroke.pos() == stroke.pos()
+
+    loaded_curve = next(item for item in items if type(item) is QGraphicsPathItem)
+    assert loaded_curve.path().elementCount() == curve.elementCount()
+    assert loaded_curve.path().elementAt(3).y == 30
+
+    loaded_text = next(item for item in items if isinstance(item, TextBox))
+    assert loaded_text.toPlainText() == "Notes"
+    assert loaded_text.pos() == text_box.pos()
+
+    loaded_image = next(item for item in items if isinstance(item, ResizablePixmapItem))
+    assert loaded_image.pixmap().size() == pixmap.size()
+
+
+def test_RejectsOtherFiles():
+    with pytest.raises(NotebookFormatError):
+        decode_items(b"\x80\x05not a notebook")
+
+
+def test_LazyLoadsVisibleItemsFirst(qtbot, tmp_path):
+    scene = BoardScene()
+    for y in range(0, 20000, 100):
+        scene.addItem(StrokeItem([(10, y), (60, y + 20)], QPen(QColor("#000000"), 2)))
+    path = str(tmp_path / "notebook.bnote")
+    save_notebook(path, scene)
+
+    view = QGraphicsView()
+    view.resize(400, 300)
+    loaded = BoardScene()
+    view.setScene(loaded)
+
+    reader = NotebookReader(path)
+    assert len(reader.entries) == 200
+    loaded.start_lazy_load(reader, view)
+
+    visible = view.mapToScene(view.viewport().rect()).boundingRect()
+    assert 0 < len(loaded.items()) < 200
+    assert all(item.sceneBoundingRect().intersects(visible) for item in loaded.items())
+
+    loaded.finish_loading()
+    assert len(loaded.items()) == 200
+    assert loaded.loader is None and reader.file is None
+
+
+def test_LazyLoadKeepsTheSavedStacking(qtbot, tmp_path):
+    scene = BoardScene()
+    # The lower stroke reaches out of view, the upper one is in view and crosses it further down
+    scene.addItem(StrokeItem([(30, 1000), (30, 3000)], QPen(QColor("#000000"), 8)))
+    scene.addItem(StrokeItem([(30, 100), (30, 1200)], QPen(QColor("#ff0000"), 8)))
+    path = str(tmp_path / "notebook.bnote")
+    save_notebook(path, scene)
+
+    view = QGraphicsView()
+    view.resize(400, 300)
+    loaded = BoardScene()
+    loaded.setSceneRect(0, 0, 400, 3000)
+    view.setScene(loaded)
+    view.centerOn(200, 0)
+
+    loaded.start_lazy_load(NotebookReader(path), view)
+    assert len(loaded.items()) == 1
+    loaded.finish_loading()
+
+    top = loaded.items(QPointF(30, 1100))[0]
+    assert top.pen().color() == QColor("#ff0000")
@@ -0,0 +1,103 @@
+#Tests file for notebook_journal.py in WhiteboardApplication directory
+import os
+
+from PySide6.QtGui import QPen, QColor
+from pytestqt.plugin import qtbot
+
+from WhiteboardApplication.board_scene import BoardScene
+from WhiteboardApplication.board_sync import WhiteboardSync
+from WhiteboardApplication.main import MainWindow
+from WhiteboardApplication.notebook_journal import NotebookJournal, replay_journal
+from WhiteboardApplication.stroke_item import StrokeItem
+from WhiteboardApplication.sync_transport import SyncTransport
+from WhiteboardApplication.text_box import TextBox
+
+
+def journaled_scene(path):
+    scene = BoardScene()
+    scene.set_journal(NotebookJournal(path, scene))
+    return scene
+
+
+def test_ReplaysSceneChanges(qtbot, tmp_path):
+    path = str(tmp_path / "notebook.journal")
+    scene = journaled_scene(path)
+
+    strokes = [StrokeItem([(i, 0), (i, 10)], QPen(QColor("#000000"), 1)) for i in range(3)]
+    for stroke in strokes:
+        scene.addItem(stroke)
+    scene.removeItem(strokes[1])
+
+    text_box = TextBox()
+    scene.addItem(text_box)
+    text_box.setPlainText("Autosaved")
+    text_box.setPos(40, 50)
+    scene.journal.record_move(text_box)
+    scene.journal.flush()
+
+    items, next_id = replay_journal(path)
+    assert next_id == 4
+    assert [item.points for item in items.values() if isinstance(item, StrokeItem)] == \
+           [strokes[0].points, strokes[2].points]
+    restored_text = next(item for item in items.values() if isinstance(item, TextBox))
+    assert restored_text.toPlainText() == "Autosaved"
+    assert restored_text.pos() == text_box.pos()
+
+    # A crash part way through writing an entry loses only that entry
+    with open(path, 'ab') as file:
+        file.write(b"\x01\x09\x00")
+    assert len(replay_journal(path)[0]) == 3
+
+
+def test_CompactionKeepsLaterChanges(qtbot, tmp_path):
+    path = str(tmp_path / "notebook.journal")
+    scene = journaled_scene(path)
+    for i in range(200):
+        stroke = StrokeItem([(i, 0), (i, 10)], QPen(QColor("#000000"), 1))
+        scene.addItem(stroke)
+        scene.removeItem(stroke)
+    scene.addItem(StrokeItem([(0, 0), (5, 5)], QPen(QColor("#000000"), 1)))
+    scene.journal.flush()
+    size = os.path.getsize(path)
+
+    with qtbot.waitSignal(scene.journal.compacted, timeout=10000):
+        scene.journal.compact()
+        # Made while the compacted journal is being written
+        scene.addItem(StrokeItem([(10, 10), (20, 20)], QPen(QColor("#000000"), 1)))
+    scene.journal.flush()
+
+    assert os.path.getsize(path) < size
+    assert len(replay_journal(path)[0]) == 2
+    assert not os.path.exists(path + ".tmp")
+
+    scene.clear()
+    scene.journal.close()
+    assert replay_journal(path)[0] == {}
+
+
+def test_RemoteMovesAreJournaled(qtbot, tmp_path):
+    path = str(tmp_path / "notebook.journal")
+    scene = journaled_scene(path)
+    sync = WhiteboardSync(scene, "1234", "joiner", SyncTransport())
+    text_box = TextBox()
+    scene.addItem(text_box, "box-1")
+
+    sync.handle_remote_action({'action_type': 'textbox_move', 'user_id': "host", 'text_id': "box-1",
+                               'text_position': {'x': 70, 'y': 80}})
+    scene.journal.flush()
+
+    restored = next(iter(replay_journal(path)[0].values()))
+    assert (restored.pos().x(), restored.pos().y()) == (70, 80)
+    sync.close()
+
+
+def test_QuittingDropsTheJournals(qtbot, tmp_path):
+    window = MainWindow(str(tmp_path))
+    qtbot.addWidget(window)
+    window.new_tab()
+    window.scene.addItem(StrokeItem([(0, 0), (5, 5)], QPen(QColor("#000000"), 1)))
+    assert len(os.listdir(tmp_path)) == 2
+
+    # Nothing is left for the next launch to reopen
+    window.close()
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,69 @@
+#Tests file for notebook_saver.py in WhiteboardApplication directory
+import os
+
+from PySide6.QtGui import QPen, QColor
+from pytestqt.plugin import qtbot
+
+from WhiteboardApplication.board_scene import BoardScene
+from WhiteboardApplication.notebook_format import load_notebook
+from WhiteboardApplication.notebook_saver import NotebookSaver
+from WhiteboardApplication.stroke_item import StrokeItem
+
+
+def test_SavesSnapshotOnWorkerThread(qtbot, tmp_path):
+    scene = BoardScene()
+    for i in range(2500):
+        scene.addItem(StrokeItem([(i, 0), (i, 10)], QPen(QColor("#000000"), 1)))
+    path = str(tmp_path / "notebook.bnote")
+    saver = NotebookSaver()
+    progress = []
+    saver.progress.connect(lambda _path, done, total: progress.append((done, total)))
+
+    with qtbot.waitSignal(saver.saved, timeout=10000) as blocker:
+        saver.save(path, scene)
+        # The scene is copied over later event loop passes, not inside save()
+        assert saver.jobs and saver.jobs[0].next == 0
+
+    assert blocker.args == [path]
+    assert len(load_notebook(path)) == 2500
+    assert progress[-1] == (2500, 2500)
+    assert os.listdir(tmp_path) == ["notebook.bnote"]
+
+
+def test_ReportsFailedSave(qtbot, tmp_path):
+    saver = NotebookSaver()
+    with qtbot.waitSignal(saver.failed, timeout=10000):
+        saver.save(str(tmp_path / "missing" / "notebook.bnote"), BoardScene())
+    assert not saver.is_saving()
+
+
+def test_SnapshotFollowsEditsMadeWhileItRuns(qtbot, tmp_path):
+    scene = BoardScene()
+    strokes = [StrokeItem([(i, 0), (i, 10)], QPen(QColor("#000000"), 1)) for i in range(3)]
+    for stroke in strokes:
+        scene.addItem(stroke)
+    path = str(tmp_path / "notebook.bnote")
+    saver = NotebookSaver()
+
+    saver.save(path, scene)
+    scene.removeItem(strokes[0])
+    scene.addItem(StrokeItem([(0, 20), (5, 25)], QPen(QColor("#ff0000"), 1)))
+    with qtbot.waitSignal(saver.saved, timeout=10000):
+        saver.finish_snapshots()
+
+    loaded = load_notebook(path)
+    assert sorted(item.points[0] for item in loaded) == [(0, 20), (1, 0), (2, 0)]
+
+
+def test_SceneClearedWhileSnapshotting(qtbot, tmp_path):
+    scene = BoardScene()
+    scene.addItem(StrokeItem([(0, 0), (0, 10)], QPen(QColor("#000000"), 1)))
+    path = str(tmp_path / "notebook.bnote")
+    saver = NotebookSaver()
+
+    saver.save(path, scene)
+    scene.clear()
+    with qtbot.waitSignal(saver.saved, timeout=10000):
+        pass
+
+    assert load_notebook(path) == []
@@ -0,0 +1,30 @@
+#Tests file for point_codec.py in WhiteboardApplication directory
+from WhiteboardApplication.point_codec import (POINT_SCALE, encode_points, decode_points, pack_points, unpack_points,
+                                               read_points)
+
+
+def test_RoundTripWithinQuantization():
+    points = [(12.3456, -7.25), (13.0, -6.9), (-4000.5, 250000.125), (0.0, 0.0)]
+
+    decoded = decode_points(encode_points(points))
+
+    assert len(decoded) == len(points)
+    for (x, y), (decoded_x, decoded_y) in zip(points, decoded):
+        assert abs(x - decoded_x) <= 0.5 / POINT_SCALE
+        assert abs(y - decoded_y) <= 0.5 / POINT_SCALE
+
+
+def test_NearbyPointsTakeFewBytes():
+    points = [(100 + i * 0.75, 200 + (i % 5)) for i in range(1000)]
+
+    # One byte for each coordinate's delta, apart from the first point and the scale
+    assert len(encode_points(points)) < 2 * len(points) + 10
+
+
+def test_ReadsPackedAndOlderPoints():
+    points = [(1.0, 2.0), (3.5, -4.0)]
+
+    assert unpack_points(pack_points(points)) == points
+    assert read_points(pack_points(points), None) == points
+    assert read_points(None, [{'x': 1.0, 'y': 2.0}, {'x': 3.5, 'y': -4.0}]) == points
+    assert read_points(None, None) == []
@@ -0,0 +1,78 @@
+#Tests file for presence.py in WhiteboardApplication directory
+import time
+
+from PySide6.QtCore import QPointF
+from PySide6.QtGui import QImage, QPainter
+from PySide6.QtWidgets import QGraphicsView
+from pytestqt.plugin import qtbot
+
+from WhiteboardApplication.board_scene import BoardScene
+from WhiteboardApplication.presence import PresenceChannel
+from WhiteboardApplication.sync_transport import SyncTransport
+
+
+class PresenceLog(SyncTransport):
+    def __init__(self):
+        self.sent = []
+        self.callback = None
+
+    def send_presence(self, presence):
+        self.sent.append(dict(presence, sent_at=time.monotonic()))
+
+    def listen_presence(self, callback):
+        self.callback = callback
+
+
+def test_PointerMovesAreThrottled(qtbot):
+    transport = PresenceLog()
+    presence = PresenceChannel(BoardScene(), "a@example.com", transport)
+    presence.start()
+    qtbot.waitUntil(lambda: len(transport.sent) == 1)
+
+    # A second of mouse moves at about 250 Hz
+    start = time.monotonic()
+    for i in range(250):
+        presence.move_cursor(QPointF(i, i))
+        qtbot.wait(4)
+    qtbot.waitUntil(lambda: transport.sent[-1].get('x') == 249, timeout=2000)
+    elapsed = time.monotonic() - start
+    presence.close()
+
+    updates = [update for update in transport.sent if 'x' in update]
+    assert len(updates) <= elapsed * 1000 / PresenceChannel.SEND_INTERVAL + 2
+    gaps = [later['sent_at'] - earlier['sent_at'] for earlier, later in zip(updates, updates[1:])]
+    assert min(gaps) >= PresenceChannel.SEND_INTERVAL / 1000 * 0.8
+    assert transport.sent[-1] == {'user': "a@example.com", 'gone': True, 'sent_at': transport.sent[-1]['sent_at']}
+
+
+def test_RemoteCursorGlidesAndLeaves(qtbot):
+    scene = BoardScene()
+    view = QGraphicsView(scene)
+    transport = PresenceLog()
+    presence = PresenceChannel(scene, "a", transport)
+    presence.start()
+    joined = []
+    presence.participants_changed.connect(joined.append)
+
+    transport.callback({'user': "b", 'x': 0, 'y': 0, 'tool': "pen", 'color': "#ff0000"})
+    qtbot.waitUntil(lambda: "b" in presence.cursors)
+    transport.callback({'user': "b", 'x': 100, 'y': 50})
+    qtbot.waitUntil(lambda: presence.cursors["b"].target == QPointF(100, 50))
+    cursor = presence.cursors["b"]
+    duration = PresenceChannel.INTERPOLATION / 1000
+    halfway = cursor.position(cursor.moved_at + duration / 2, duration)
+    assert abs(halfway.x() - 50) < 1e-6 and abs(halfway.y() - 25) < 1e-6
+    assert cursor.tool == "pen" and cursor.color.name() == "#ff0000"
+
+    # Painting goes through the scene's foreground
+    image = QImage(200, 200, QImage.Format.Format_ARGB32)
+    painter = QPainter(image)
+    presence.paint(painter, scene.sceneRect())
+    painter.end()
+
+    qtbot.waitUntil(lambda: not presence.frame_timer.isActive(), timeout=2000)
+    transport.callback({'user': "b", 'gone': True})
+    qtbot.waitUntil(lambda: not presence.cursors)
+    assert joined == [["b"], []]
+    presence.close()
+    view.close()
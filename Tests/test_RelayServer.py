@@ -0,0 +1,165 @@
+#Tests file for relay_server.py and client.py in WhiteboardApplication/Collab_Functionality directory
+import pytest
+from PySide6.QtCore import QPointF
+from PySide6.QtGui import QPen, QColor
+from pytestqt.plugin import qtbot
+
+from WhiteboardApplication.board_scene import BoardScene
+from WhiteboardApplication.board_sync import WhiteboardSync
+from WhiteboardApplication.Collab_Functionality.client import Client
+from WhiteboardApplication.Collab_Functionality.relay_server import RelayServerThread
+from WhiteboardApplication.stroke_item import StrokeItem
+
+
+@pytest.fixture
+def relay():
+    server = RelayServerThread()
+    port = server.start()
+    yield port
+    server.stop()
+
+
+def test_RelaysDrawingBetweenClients(qtbot, relay):
+    scene_a = BoardScene()
+    scene_b = BoardScene()
+    scene_other_meeting = BoardScene()
+    sync_a = WhiteboardSync(scene_a, "1234", "a", Client("127.0.0.1", relay, "1234"))
+    sync_b = WhiteboardSync(scene_b, "1234", "b", Client("127.0.0.1", relay, "1234"))
+    sync_other = WhiteboardSync(scene_other_meeting, "9999", "c", Client("127.0.0.1", relay, "9999"))
+    qtbot.waitUntil(lambda: sync_a.transport.connected.is_set() and sync_b.transport.connected.is_set()
+                    and sync_other.transport.connected.is_set())
+
+    stroke = StrokeItem([(0, 0), (10, 10), (20, 5)], QPen(QColor("#ff0000"), 3))
+    scene_a.addItem(stroke)
+    sync_a.sync_drawing(stroke)
+
+    qtbot.waitUntil(lambda: any(isinstance(item, StrokeItem) for item in scene_b.items()), timeout=5000)
+    received = next(item for item in scene_b.items() if isinstance(item, StrokeItem))
+    assert received.points == stroke.points
+    assert received.pen().color().name() == "#ff0000"
+    assert not scene_other_meeting.items()
+
+    for sync in (sync_a, sync_b, sync_other):
+        sync.close()
+
+
+def test_LateJoinLoadsSnapshotThenDeltas(qtbot):
+    server = RelayServerThread()
+    port = server.start()
+
+    host_scene = BoardScene()
+    host = WhiteboardSync(host_scene, "1234", "host", Client("127.0.0.1", port, "1234"))
+    qtbot.waitUntil(host.transport.connected.is_set)
+
+    def draw(count):
+        for i in range(count):
+            stroke = StrokeItem([(i, 0), (i, 10)], QPen(QColor("#000000"), 1))
+            host_scene.addItem(stroke)
+            host.sync_drawing(stroke)
+
+    draw(60)
+    # The echo can arrive before the outbound queue has marked the batch as sent
+    qtbot.waitUntil(lambda: host.last_seq == 60 and not host.unechoed and not host.outbound.sending, timeout=5000)
+    host.publish_snapshot()
+    meeting = server.relay.meetings["1234"]
+    qtbot.waitUntil(lambda: meeting.snapshot is not None, timeout=5000)
+    draw(2)
+    qtbot.waitUntil(lambda: host.last_seq == 62, timeout=5000)
+
+    joiner_scene = BoardScene()
+    joiner = WhiteboardSync(joiner_scene, "1234", "joiner", Client("127.0.0.1", port, "1234"))
+    replayed = []
+    joiner.action_received.connect(replayed.append)
+    qtbot.waitUntil(lambda: len(joiner_scene.items()) == 62, timeout=5000)
+
+    assert meeting.snapshot["seq"] == 60
+    assert [action["seq"] for action in replayed] == [61, 62]
+    assert joiner.last_seq == 62
+
+    host.close()
+    joiner.close()
+    server.stop()
+
+
+def test_RelayCompactsLogForLateJoiners(qtbot, monkeypatch):
+    monkeypatch.setattr("WhiteboardApplication.Collab_Functionality.relay_server.KEEP_RECENT", 0)
+    server = RelayServerThread()
+    port = server.start()
+    host_scene = BoardScene()
+    host = WhiteboardSync(host_scene, "1234", "host", Client("127.0.0.1", port, "1234"))
+    qtbot.waitUntil(host.transport.connected.is_set)
+
+    for i in range(10):
+        stroke = StrokeItem([(i * 50, 0), (i * 50, 10)], QPen(QColor("#000000"), 1))
+        host_scene.addItem(stroke)
+        host.sync_drawing(stroke)
+    # Erases the first five strokes
+    path = [QPointF(0, 5), QPointF(200, 5)]
+    host.sync_eraser(path, items=host_scene.erase_path(path))
+    qtbot.waitUntil(lambda: host.last_seq == 11, timeout=5000)
+    host.transport.compact()
+    meeting = server.relay.meetings["1234"]
+    qtbot.waitUntil(lambda: len(meeting.log) == 5, timeout=5000)
+
+    joiner_scene = BoardScene()
+    joiner = WhiteboardSync(joiner_scene, "1234", "joiner", Client("127.0.0.1", port, "1234"))
+    replayed = []
+    joiner.action_received.connect(replayed.append)
+    qtbot.waitUntil(lambda: len(joiner_scene.items()) == 5, timeout=5000)
+
+    assert [action["seq"] for action in replayed] == [6, 7, 8, 9, 10]
+
+    host.close()
+    joiner.close()
+    server.stop()
+
+
+def test_StreamedStrokeGrowsBeforeItIsFinished(qtbot, relay):
+    scene_a = BoardScene()
+    scene_b = BoardScene()
+    scene_a.sync = WhiteboardSync(scene_a, "1234", "a", Client("127.0.0.1", relay, "1234"))
+    sync_b = WhiteboardSync(scene_b, "1234", "b", Client("127.0.0.1", relay, "1234"))
+    qtbot.waitUntil(lambda: scene_a.sync.transport.connected.is_set() and sync_b.transport.connected.is_set())
+    scene_a.sync.set_streaming(True)
+
+    live_item = scene_a.start_stroke(QPointF(0, 0), QPen(QColor("#0000ff"), 3))
+    for i in range(1, 100):
+        scene_a.extend_stroke(live_item, QPointF(i * 4, (i % 2) * 6))
+
+    # The other board shows the stroke while the pen is still down
+    stroke_id = scene_a.item_id(live_item)
+    qtbot.waitUntil(lambda: scene_b.item_by_id(stroke_id) is not None and
+                    len(scene_b.item_by_id(stroke_id).points) == len(live_item.points), timeout=5000)
+    assert scene_b.item_by_id(stroke_id).points == live_item.points
+
+    stroke = scene_a.finish_stroke(live_item)
+    scene_a.sync.sync_drawing(stroke)
+    qtbot.waitUntil(lambda: isinstance(scene_b.item_by_id(stroke_id), StrokeItem), timeout=5000)
+    assert scene_b.item_by_id(stroke_id).points == stroke.points
+    assert len(scene_b.items()) == 1
+
+    scene_a.sync.close()
+    sync_b.close()
+
+
+def test_PresenceIsRelayedButNotLogged(qtbot, relay):
+    scene_a = BoardScene()
+    scene_b = BoardScene()
+    sync_a = WhiteboardSync(scene_a, "1234", "a", Client("127.0.0.1", relay, "1234"))
+    sync_b = WhiteboardSync(scene_b, "1234", "b", Client("127.0.0.1", relay, "1234"))
+    qtbot.waitUntil(lambda: sync_a.transport.connected.is_set() and sync_b.transport.connected.is_set())
+
+    scene_a.sync = sync_a
+    scene_a.set_active_tool("highlighter")
+    sync_a.presence.move_cursor(QPointF(120, 80))
+    qtbot.waitUntil(lambda: "a" in sync_b.presence.cursors
+                    and sync_b.presence.cursors["a"].target == QPointF(120, 80), timeout=5000)
+    assert sync_b.presence.cursors["a"].tool == "highlighter"
+    assert not sync_b.presence.cursors.get("b")
+    assert sync_a.last_seq is None and sync_b.last_seq is None
+
+    # Leaving, even without saying so, takes the cursor away
+    sync_a.transport.close()
+    qtbot.waitUntil(lambda: "a" not in sync_b.presence.cursors, timeout=5000)
+    sync_a.close()
+    sync_b.close()
@@ -0,0 +1,51 @@
+#Tests file for stroke_filters.py in WhiteboardApplication directory
+from PySide6.QtCore import QPointF
+from PySide6.QtGui import QPen, QColor
+from pytestqt.plugin import qtbot
+
+from WhiteboardApplication.board_scene import BoardScene
+from WhiteboardApplication.stroke_filters import StrokeFilterPipeline, simplify_rdp, catmull_rom_segments
+
+
+def test_RdpDropsCollinearPoints():
+    points = [(float(i), 0.0) for i in range(100)] + [(99.0, 50.0)]
+
+    simplified = simplify_rdp(points, 0.5)
+
+    assert simplified == [(0.0, 0.0), (99.0, 0.0), (99.0, 50.0)]
+    assert simplify_rdp(points, 0) == points
+
+
+def test_PipelineKeepsReleasePoint():
+    pipeline = StrokeFilterPipeline(tolerance=2)
+    pipeline.begin((0, 0))
+
+    assert pipeline.accept((1, 0)) is False
+    assert pipeline.accept((3, 0)) is True
+    assert pipeline.accept((4, 0)) is False
+
+    # The dropped end point is still where the stroke ends
+    assert pipeline.finish([(0, 0), (3, 0)]) == [(0, 0), (4, 0)]
+
+
+def test_CatmullRomPassesThroughPoints():
+    points = [(0, 0), (10, 10), (20, 0), (30, 10)]
+
+    segments = catmull_rom_segments(points)
+
+    assert len(segments) == 3
+    assert [end for _, _, end in segments] == points[1:]
+
+
+def test_SceneDecimatesAndSmoothsStroke(qtbot):
+    scene = BoardScene()
+    scene.set_stroke_tolerance(1)
+    scene.set_stroke_smoothing(True)
+
+    live_item = scene.start_stroke(QPointF(0, 0), QPen(QColor("#000000"), 1))
+    for i in range(1, 2001):
+        scene.extend_stroke(live_item, QPointF(i * 0.1, 0))
+    stroke = scene.finish_stroke(live_item)
+
+    assert stroke.points == [(0.0, 0.0), (200.0, 0.0)]
+    assert stroke.smooth
@@ -0,0 +1,118 @@
+#Tests file for stroke_index.py in WhiteboardApplication directory
+from PySide6.QtCore import QPointF, QEvent, Qt
+from PySide6.QtGui import QPen, QColor
+from PySide6.QtWidgets import QGraphicsSceneMouseEvent
+from pytestqt.plugin import qtbot
+
+from WhiteboardApplication.board_scene import BoardScene
+from WhiteboardApplication.stroke_index import StrokeIndex
+from WhiteboardApplication.stroke_item import StrokeItem
+
+
+def test_QueryUsesSegmentDistance():
+    index = StrokeIndex(cell_size=16)
+    index.insert("diagonal", [[(0, 0), (100, 100)]], width=2)
+
+    # Inside the segment's bounding box but far from the segment itself
+    assert index.query((90, 10), 5) == []
+    assert index.query((50, 53), 5) == ["diagonal"]
+
+    index.remove("diagonal")
+    assert len(index) == 0
+    assert index.cells == {}
+
+
+def test_EraserFollowsUndoRedo(qtbot):
+    scene = BoardScene()
+    stroke = StrokeItem([(0, 0), (200, 0)], QPen(QColor("#000000"), 1))
+    highlight = StrokeItem([(0, 100), (200, 100)], QPen(QColor("#FFFF00"), 10), highlighter=True)
+    for item in (stroke, highlight):
+        scene.addItem(item)
+        scene.add_item_to_undo(item)
+
+    assert highlight in scene.highlight_items
+
+    scene.undo()
+    assert highlight not in scene.stroke_index
+    assert highlight not in scene.highlight_items
+
+    scene.redo()
+    scene.erase(QPointF(100, 112))
+    assert highlight.scene() is None
+    assert stroke.scene() is scene
+
+
+def scene_mouse_event(event_type, position):
+    event = QGraphicsSceneMouseEvent(event_type)
+    event.setScenePos(position)
+    event.setButton(Qt.LeftButton)
+    event.setButtons(Qt.LeftButton)
+    return event
+
+
+def test_DragEraseIsOneUndoStep(qtbot):
+    scene = BoardScene()
+    scene.set_active_tool("eraser")
+    strokes = [StrokeItem([(x, 0), (x, 100)], QPen(QColor("#000000"), 1)) for x in range(20, 200, 20)]
+    for stroke in strokes:
+        scene.addItem(stroke)
+
+    # One press, a single long move and the release should sweep every stroke
+    scene.mousePressEvent(scene_mouse_event(QEvent.Type.GraphicsSceneMousePress, QPointF(0, 50)))
+    scene.mouseMoveEvent(scene_mouse_event(QEvent.Type.GraphicsSceneMouseMove, QPointF(300, 50)))
+    scene.mouseReleaseEvent(scene_mouse_event(QEvent.Type.GraphicsSceneMouseRelease, QPointF(300, 50)))
+
+    assert all(stroke.scene() is None for stroke in strokes)
+    assert len(scene.undo_list) == 1
+
+    scene.undo()
+    assert all(stroke.scene() is scene for stroke in strokes)
+    assert len(scene.stroke_index) == len(strokes)
+
+
+def test_PixelEraserSplitsStroke(qtbot):
+    scene = BoardScene()
+    scene.set_active_tool("pixel_eraser")
+    stroke = StrokeItem([(0, 50), (100, 50), (200, 50)], QPen(QColor("#000000"), 2))
+    scene.addItem(stroke)
+
+    scene.mousePressEvent(scene_mouse_event(QEvent.Type.GraphicsSceneMousePress, QPointF(100, 0)))
+    scene.mouseMoveEvent(scene_mouse_event(QEvent.Type.GraphicsSceneMouseMove, QPointF(100, 100)))
+    scene.mouseReleaseEvent(scene_mouse_event(QEvent.Type.GraphicsSceneMouseRelease, QPointF(100, 100)))
+
+    pieces = [item for item in scene.items() if isinstance(item, StrokeItem)]
+    assert stroke.scene() is None
+    assert sorted(piece.points[-1][0] for piece in pieces) == [89.0, 200.0]
+    assert len(scene.undo_list) == 1
+
+    scene.undo()
+    assert [item for item in scene.items() if isinstance(item, StrokeItem)] == [stroke]
+
+
+def test_EraserClickOnEmptyCanvasIsNotSynced(qtbot):
+    scene = BoardScene()
+    sent = []
+    scene.sync = type("Sync", (), {'sync_eraser': lambda self, *args, **kwargs: sent.append(args)})()
+    scene.addItem(StrokeItem([(0, 0), (100, 0)], QPen(QColor("#000000"), 2)))
+
+    for tool in ("eraser", "pixel_eraser"):
+        scene.active_tool = tool
+        scene.mousePressEvent(scene_mouse_event(QEvent.Type.GraphicsSceneMousePress, QPointF(50, 200)))
+        scene.mouseReleaseEvent(scene_mouse_event(QEvent.Type.GraphicsSceneMouseRelease, QPointF(50, 200)))
+
+    assert sent == [] and scene.undo_list == []
+
+
+def test_PiecesEndingOnTheEraserEdgeAreNotCutAgain(qtbot):
+    scene = BoardScene()
+    scene.addItem(StrokeItem([(0, 50), (200, 50)], QPen(QColor("#000000"), 2)), "A")
+
+    removed, added = scene.cut_segment(QPointF(100, 50), QPointF(100, 50))
+    assert [scene.item_id(item) for item in removed] == ["A"]
+    pieces = sorted(scene.items_by_id)
+    assert len(pieces) == 2 and all(item_id.startswith("A.") for item_id in pieces)
+
+    # Both pieces end on the circle, the same cut again touches them without taking anything off
+    assert scene.cut_segment(QPointF(100, 50), QPointF(100, 50)) == ([], [])
+    assert scene.stroke_index.query((100, 50), scene.eraser_radius) == []
+    assert sorted(scene.items_by_id) == pieces
@@ -0,0 +1,131 @@
+#Tests file for sync_compaction.py in WhiteboardApplication directory
+from PySide6.QtCore import QPointF
+from PySide6.QtGui import QPen, QColor
+from pytestqt.plugin import qtbot
+
+from WhiteboardApplication.board_scene import BoardScene
+from WhiteboardApplication.board_sync import WhiteboardSync
+from WhiteboardApplication.stroke_item import StrokeItem
+from WhiteboardApplication.sync_compaction import compact_actions
+from WhiteboardApplication.sync_transport import SyncTransport
+from WhiteboardApplication.text_box import TextBox
+
+
+def stroke(user, points, color="#000000", size=2):
+    return {'action_type': 'pen', 'user_id': user, 'points': [{'x': x, 'y': y} for x, y in points],
+            'color': color, 'size': size}
+
+
+def eraser(user, points, pixel=False):
+    return {'action_type': 'pixel_eraser' if pixel else 'eraser', 'user_id': user,
+            'points': [{'x': x, 'y': y} for x, y in points]}
+
+
+def undo_of(action, kind='undo'):
+    return dict(action, action_type=kind)
+
+
+def meeting_log():
+    kept = stroke("a", [(0, 0), (100, 0)])
+    erased = stroke("a", [(0, 50), (100, 50)])
+    undone = stroke("b", [(0, 100), (100, 100)], "#ff0000")
+    redone = stroke("b", [(0, 150), (100, 150)], "#00ff00")
+    cut = stroke("a", [(0, 200), (100, 200)])
+    create = {'action_type': 'textbox_create', 'user_id': "a", 'text_content': "", 'text_id': "t1",
+              'text_position': {'x': 0, 'y': 300}}
+    actions = [kept, erased, undone, redone, cut, create]
+    actions += [{'action_type': 'textbox_content', 'user_id': "a", 'text_id': "t1", 'text_content': "hello"[:i]}
+                for i in range(1, 6)]
+    actions += [{'action_type': 'textbox_move', 'user_id': "a", 'text_id': "t1", 'text_position': {'x': i, 'y': 300}}
+                for i in range(10)]
+    actions += [eraser("b", [(50, 40), (50, 60)]),
+                undo_of(undone), undo_of(redone), undo_of(redone, 'redo'),
+                eraser("a", [(50, 190), (50, 210)], pixel=True)]
+    for seq, action in enumerate(actions, 1):
+        action['seq'] = seq
+    return actions
+
+
+#What a client joining the meeting would end up with after replaying the actions
+def replay(qtbot, actions):
+    scene = BoardScene()
+    sync = WhiteboardSync(scene, "1234", "joiner", SyncTransport())
+    for action in actions:
+        sync.handle_remote_action(action)
+    strokes = sorted((tuple(item.points), item.pen().color().name()) for item in scene.items()
+                     if isinstance(item, StrokeItem))
+    texts = [(item.toPlainText(), item.pos().x(), item.pos().y()) for item in scene.items() if isinstance(item, TextBox)]
+    sync.close()
+    return strokes, texts
+
+
+def test_CompactionDropsErasedAndFoldsEdits():
+    compacted = compact_actions(meeting_log())
+
+    # The redone stroke comes back in the redo's place
+    assert [action['seq'] for action in compacted] == [1, 5, 6, 25, 26]
+    assert compacted[3]['action_type'] == 'pen'
+    create = compacted[2]
+    assert create['text_content'] == "hello"
+    assert create['text_position'] == {'x': 9, 'y': 300}
+
+
+def test_CompactedLogReplaysToTheSameBoard(qtbot):
+    log = meeting_log()
+    # Undo isn't replayed by the scene yet, so only compare what both versions of the log agree on
+    replayable = [action for action in log if action['action_type'] not in ('undo', 'redo')]
+    compacted = compact_actions(replayable)
+
+    assert len(compacted) < len(replayable)
+    assert replay(qtbot, compacted) == replay(qtbot, replayable)
+
+
+def test_CompactionKeepsRecentActions():
+    log = meeting_log()
+    compacted = compact_actions(log, keep_recent=5)
+
+    assert compacted[-5:] == log[-5:]
+
+
+def test_CompactionDropsChunksOfFinishedStrokes():
+    chunks = [{'action_type': 'stroke_chunk', 'user_id': "a", 'item_id': "s1", 'points': [{'x': i, 'y': 0}]}
+              for i in range(3)]
+    finished = dict(stroke("a", [(0, 0), (1, 0), (2, 0)]), item_id="s1")
+    unfinished = dict(chunks[0], item_id="s2")
+
+    assert compact_actions(chunks + [unfinished, finished]) == [unfinished, finished]
+
+
+def test_UndoByIdFoldsAwayWithItsStroke():
+    drawn = dict(stroke("a", [(0, 0), (100, 0)]), item_id="s1", seq=1)
+    kept = dict(stroke("b", [(0, 50), (100, 50)]), item_id="s2", seq=2)
+    undo = {'action_type': 'undo', 'user_id': "a", 'item_ids': ["s1"], 'restored_ids': [], 'seq': 3}
+    redo = {'action_type': 'redo', 'user_id': "a", 'item_ids': [], 'restored_ids': ["s1"], 'seq': 4}
+    # Someone else's undo of the stroke isn't theirs to fold
+    other = dict(undo, user_id="b", seq=5)
+
+    assert compact_actions([drawn, kept, undo]) == [kept]
+    assert compact_actions([drawn, kept, undo, redo]) == [kept, dict(drawn, seq=4)]
+    assert compact_actions([drawn, kept, other]) == [drawn, kept, other]
+
+
+def test_PixelEraseByIdFollowsItsPieces(qtbot):
+    scene = BoardScene()
+    sync = WhiteboardSync(scene, "1234", "a", SyncTransport())
+    sent = []
+    sync.queue_action = lambda action, coalesce_key=None, urgent=False: sent.append(vars(action))
+    drawn = StrokeItem([(0, 0), (100, 0)], QPen(QColor("#000000"), 2))
+    scene.addItem(drawn, "s1")
+    sync.sync_drawing(drawn)
+    removed, pieces = scene.cut_segment(QPointF(50, 0), QPointF(50, 0))
+    sync.sync_eraser([QPointF(50, 0)], pixel=True, items=removed, pieces=pieces)
+    drawn, cut = sent
+    left, right = cut['restored_ids']
+    assert cut['item_ids'] == ["s1"] and left.startswith("s1.") and right.startswith("s1.")
+
+    # The erasers go by the ids they name, their path misses both pieces
+    erase_left = {'action_type': 'eraser', 'user_id': "b", 'points': [{'x': 10, 'y': 30}], 'item_ids': [left]}
+    erase_right = dict(erase_left, item_ids=[right])
+    assert compact_actions([drawn, cut, erase_left]) == [drawn, cut, erase_left]
+    assert compact_actions([drawn, cut, erase_left, erase_right]) == []
+    sync.close()
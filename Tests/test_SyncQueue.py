@@ -0,0 +1,130 @@
+#Tests file for sync_queue.py in WhiteboardApplication directory
+import threading
+from types import SimpleNamespace
+
+from firebase_admin import db
+
+from WhiteboardApplication.sync_transport import PushKeys, FirebaseTransport
+from WhiteboardApplication.sync_queue import SyncQueue
+
+
+def test_CoalescesAndBatches():
+    batches = []
+    release = threading.Event()
+
+    def send(actions):
+        release.wait(5)
+        batches.append(actions)
+
+    queue = SyncQueue(send)
+    queue.BATCH_INTERVAL = 0.5
+    queue.put({'action_type': 'textbox_create', 'text_id': '1'})
+    for i in range(50):
+        queue.put({'action_type': 'textbox_content', 'text_id': '1', 'text_content': 'a' * i}, ('textbox_content', '1'))
+    queue.put({'action_type': 'pen'})
+    release.set()
+    assert queue.flush(5)
+    queue.close(5)
+
+    sent = [action for batch in batches for action in batch]
+    assert [action['action_type'] for action in sent] == ['textbox_create', 'textbox_content', 'pen']
+    assert sent[1]['text_content'] == 'a' * 49
+    assert len(batches) == 1
+
+
+def test_RetriesFailedBatch():
+    attempts = []
+
+    def send(actions):
+        attempts.append(actions)
+        if len(attempts) == 1:
+            raise ConnectionError("offline")
+
+    queue = SyncQueue(send)
+    queue.RETRY_DELAY = 0.01
+    queue.put({'action_type': 'pen'})
+    assert queue.flush(5)
+    queue.close(5)
+    assert attempts == [[{'action_type': 'pen'}], [{'action_type': 'pen'}]]
+
+
+def test_PushKeysSortInOrder():
+    keys = PushKeys()
+    generated = [keys.next() for _ in range(1000)]
+    assert generated == sorted(generated)
+    assert len(set(generated)) == 1000
+
+
+class FakeReference:
+    """Stands in for a firebase_admin db.Reference, events are pushed to the listener by the test"""
+
+    def __init__(self, path, values):
+        self.path = path
+        self.values = values
+        self.handler = None
+        self.listening = threading.Event()
+
+    def get(self):
+        return self.values.get(self.path)
+
+    def set(self, value):
+        self.values[self.path] = value
+
+    def listen(self, handler):
+        self.handler = handler
+        self.listening.set()
+        return SimpleNamespace(close=lambda: None)
+
+    def event(self, path, data, event_type="put"):
+        self.handler(SimpleNamespace(event_type=event_type, path=path, data=data))
+
+
+def firebase_transport(monkeypatch, values):
+    references = {}
+
+    def reference(path):
+        name = path.rsplit("/", 1)[-1]
+        references[name] = FakeReference(name, values)
+        return references[name]
+
+    monkeypatch.setattr(db, "reference", reference)
+    return FirebaseTransport("meeting"), references
+
+
+def test_FirebaseDeliversLateKeysOnce(monkeypatch):
+    transport, references = firebase_transport(monkeypatch, {})
+    delivered = []
+    transport.listen(lambda action: delivered.append(action['seq']))
+    assert references['actions'].listening.wait(5)
+
+    actions = references['actions']
+    actions.event("/", {"b": {'action_type': 'pen'}})
+    # Written by a client whose clock is behind, so its key sorts before one already delivered
+    actions.event("/", {"a": {'action_type': 'pen'}, "b": {'action_type': 'pen'}}, "patch")
+    actions.event("/c", {'action_type': 'pen'})
+    actions.event("/c", {'action_type': 'pen'})
+
+    assert delivered == ["b", "a", "c"]
+
+
+def test_FirebaseSnapshotListsTheKeysItIncludes(monkeypatch):
+    values = {}
+    host, references = firebase_transport(monkeypatch, values)
+    host.listen(lambda action: None)
+    assert references['actions'].listening.wait(5)
+    references['actions'].event("/", {"b": {'action_type': 'pen'}})
+    references['actions'].event("/a", {'action_type': 'pen'})
+    references['actions'].event("/c", {'action_type': 'pen'})
+    host.publish_snapshot({'seq': "a", 'data': ""})
+    assert values['snapshot']['keys'] == ["b", "a"]
+
+    joiner, references = firebase_transport(monkeypatch, values)
+    snapshots = []
+    delivered = []
+    joiner.listen(lambda action: delivered.append(action['seq']), snapshots.append)
+    assert references['actions'].listening.wait(5)
+    # "0" reached the log after the snapshot was taken even though its key sorts first
+    references['actions'].event("/", {key: {'action_type': 'pen'} for key in ("0", "a", "b", "c")})
+
+    assert len(snapshots) == 1
+    assert delivered == ["0", "c"]
@@ -22,9 +22,9 @@ from pytestqt import *
 
 
 
-def test_PenButton(qtbot):
+def test_PenButton(qtbot, tmp_path):
 
-    window = MainWindow()
+    window = MainWindow(str(tmp_path))
     qtbot.addWidget(window)
     window.show()
 
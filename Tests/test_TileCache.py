@@ -0,0 +1,67 @@
+#Tests file for tile_cache.py in WhiteboardApplication directory
+from PySide6.QtGui import QPen, QColor, QPixmap
+from pytestqt.plugin import qtbot
+
+from WhiteboardApplication.board_scene import BoardScene
+from WhiteboardApplication.resize_handle_image import ResizablePixmapItem
+from WhiteboardApplication.stroke_item import StrokeItem
+
+
+def test_EditsOnlyInvalidateTouchedTiles(qtbot):
+    scene = BoardScene()
+    scene.set_tile_rendering(True)
+    scene.addItem(StrokeItem([(10, 10), (50, 50)], QPen(QColor("#000000"), 2)))
+
+    cache = scene.tile_cache
+    near = (1.0, 0, 0)
+    far = (1.0, 3, 3)
+    cache.tile(scene, near)
+    cache.tile(scene, far)
+    assert cache.tile(scene, near).toImage().pixelColor(30, 30).alpha() > 0
+
+    scene.addItem(StrokeItem([(20, 200), (60, 200)], QPen(QColor("#000000"), 2)))
+
+    assert near not in cache.tiles
+    assert far in cache.tiles
+
+    scene.set_tile_rendering(False)
+    assert len(cache) == 0
+    assert not any(item.tile_cached for item in scene.items() if isinstance(item, StrokeItem))
+
+
+def test_InkAboveAnImageStaysAboveIt(qtbot):
+    scene = BoardScene()
+    scene.set_tile_rendering(True)
+    under = StrokeItem([(10, 20), (90, 20)], QPen(QColor("#000000"), 2))
+    scene.addItem(under)
+    image = QPixmap(100, 100)
+    image.fill(QColor("#ffffff"))
+    image = ResizablePixmapItem(image)
+    scene.addItem(image)
+    over = StrokeItem([(10, 60), (90, 60)], QPen(QColor("#ff0000"), 2))
+    scene.addItem(over)
+    apart = StrokeItem([(300, 60), (390, 60)], QPen(QColor("#ff0000"), 2))
+    scene.addItem(apart)
+
+    # The stroke drawn on the image isn't in the tiles painted beneath it
+    assert under.tile_cached and apart.tile_cached and not over.tile_cached
+    tile = scene.tile_cache.tile(scene, (1.0, 0, 0)).toImage()
+    assert tile.pixelColor(50, 20).alpha() > 0 and tile.pixelColor(50, 60).alpha() == 0
+
+    # Once the image is out of the way the stroke goes back into the tiles
+    old_rect = image.sceneBoundingRect()
+    image.setPos(400, 300)
+    scene.item_moved(image, old_rect)
+    assert over.tile_cached
+    old_rect = image.sceneBoundingRect()
+    image.setPos(0, 0)
+    scene.item_moved(image, old_rect)
+    assert not over.tile_cached
+    scene.removeItem(image)
+    assert over.tile_cached
+
+    # Put back it is stacked above every stroke, so they all stay in the tiles
+    scene.addItem(image)
+    scene.set_tile_rendering(False)
+    scene.set_tile_rendering(True)
+    assert under.tile_cached and over.tile_cached and apart.tile_cached
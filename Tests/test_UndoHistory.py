@@ -0,0 +1,88 @@
+#Tests file for undo_history.py in WhiteboardApplication directory
+from PySide6.QtCore import QPointF
+from PySide6.QtGui import QPen, QColor
+from pytestqt.plugin import qtbot
+
+from WhiteboardApplication.board_scene import BoardScene
+from WhiteboardApplication.stroke_item import StrokeItem
+from WhiteboardApplication.undo_history import ItemStash, UndoHistory, item_size
+
+
+def add_stroke(scene, y):
+    stroke = StrokeItem([(x, y) for x in range(0, 100, 5)], QPen(QColor("#000000"), 2))
+    scene.addItem(stroke)
+    scene.add_item_to_undo(stroke)
+    return scene.item_id(stroke)
+
+
+def erase_stroke(scene, item_id):
+    stroke = scene.item_by_id(item_id)
+    scene.removeItem(stroke)
+    scene.add_erase_to_undo([stroke])
+
+
+def test_OldestStepsAreDroppedPastTheStepLimit(qtbot):
+    scene = BoardScene()
+    scene.history = UndoHistory(max_steps=3)
+    ids = [add_stroke(scene, y) for y in range(0, 50, 10)]
+
+    assert len(scene.undo_list) == 3
+    assert scene.history_usage()['undo']['dropped_steps'] == 2
+    for _ in range(4):
+        scene.undo()
+    # The first two strokes can't be undone anymore
+    assert [scene.item_by_id(item_id) is not None for item_id in ids] == [True, True, False, False, False]
+
+
+def test_StepsSpillToDiskAndComeBack(qtbot, tmp_path):
+    scene = BoardScene()
+    ids = [add_stroke(scene, y) for y in range(0, 100, 10)]
+    points = {item_id: scene.item_by_id(item_id).points for item_id in ids}
+    one_stroke = item_size(scene.item_by_id(ids[0]))
+    scene.history = UndoHistory(max_bytes=one_stroke * 3, directory=tmp_path)
+    for item_id in ids:
+        erase_stroke(scene, item_id)
+
+    usage = scene.history.usage()
+    assert usage['memory_bytes'] <= one_stroke * 3
+    assert usage['spilled_steps'] == len(ids) - 3 and usage['spilled_bytes'] > 0
+    assert usage['undo_steps'] == len(ids)
+
+    for _ in ids:
+        scene.undo()
+    for item_id in ids:
+        stroke = scene.item_by_id(item_id)
+        assert stroke is not None and stroke.scene() is scene
+        assert [(round(x), round(y)) for x, y in stroke.points] == points[item_id]
+    assert scene.history.usage()['spill_file_bytes'] == 0
+
+    # And redo still takes them off again
+    for _ in ids:
+        scene.redo()
+    assert all(scene.item_by_id(item_id) is None for item_id in ids)
+
+
+def test_StashSpillsItsOldestItems(qtbot, tmp_path):
+    scene = BoardScene()
+    strokes = {}
+    for y in range(0, 50, 10):
+        stroke = StrokeItem([(0, y), (50, y), (50, y + 5)], QPen(QColor("#ff0000"), 3))
+        scene.addItem(stroke)
+        strokes[scene.item_id(stroke)] = stroke
+    stash = ItemStash(scene, max_items=4, max_bytes=item_size(stroke) * 2, directory=tmp_path)
+    for item_id, stroke in strokes.items():
+        scene.removeItem(stroke)
+        stash[item_id] = stroke
+
+    first, second, *rest = strokes
+    assert first not in stash and len(stash) == 4
+    assert stash.usage()['spilled_items'] == 2 and stash.usage()['items'] == 2
+    assert stash.pop(rest[-1]) is strokes[rest[-1]]
+
+    revived = stash.pop(second)
+    assert revived is not strokes[second] and scene.item_id(revived) == second
+    assert revived.points == [(0, 10), (50, 10), (50, 15)]
+    assert revived.pen().color().name() == "#ff0000" and revived.pen().widthF() == 3
+    scene.addItem(revived)
+    assert scene.item_by_id(second) is revived
+    stash.clear()
@@ -0,0 +1,152 @@
+import json
+import socket
+import threading
+
+from WhiteboardApplication.sync_transport import SyncTransport
+
+
+class Client(SyncTransport):
+    """Sync transport that talks to a relay_server over one persistent TCP connection"""
+
+    RECONNECT_DELAY = 1.0    # Seconds between attempts to reach the relay
+    CONNECT_WAIT = 2.0       # Seconds send waits for a connection before failing so the batch is retried
+
+    def __init__(self, host, port, meeting_id):
+        self.host = host
+        self.port = port
+        self.meeting_id = str(meeting_id)
+
+        self.socket = None
+        self.send_lock = threading.Lock()
+        self.connected = threading.Event()
+        self.closed = threading.Event()
+
+        # Messages that arrive before listen is called are held until it is
+        self.callback = None
+        self.snapshot_callback = None
+        self.held = []
+        self.listen_lock = threading.Lock()
+        self.last_seq = 0
+        # Presence is only of interest once someone listens, earlier updates are dropped rather than held
+        self.presence_callback = None
+
+        # The reader thread owns the connection, it connects, reads and reconnects after a drop
+        self.reader = threading.Thread(target=self.run, daemon=True)
+        self.reader.start()
+
+    def connect(self):
+        connection = socket.create_connection((self.host, self.port))
+        connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # After a drop only the actions missed while away are sent again
+        connection.sendall(self.encode({"type": "join", "meeting": self.meeting_id, "since": self.last_seq}))
+        self.socket = connection
+        return connection
+
+    def disconnect(self):
+        self.connected.clear()
+        connection, self.socket = self.socket, None
+        if connection is not None:
+            try:
+                connection.close()
+            except OSError:
+                pass
+
+    @staticmethod
+    def encode(message):
+        return json.dumps(message, separators=(',', ':')).encode('utf-8') + b"\n"
+
+    def run(self):
+        while not self.closed.is_set():
+            try:
+                connection = self.connect()
+                with connection.makefile('rb') as lines:
+                    for line in lines:
+                        self.receive(line)
+            except OSError as e:
+                if not self.closed.is_set():
+                    print(f"Relay connection to {self.host}:{self.port} lost: {e}")
+            self.disconnect()
+            self.closed.wait(self.RECONNECT_DELAY)
+
+    def receive(self, line):
+        try:
+            message = json.loads(line)
+        except ValueError:
+            return
+        if message.get("type") == "joined":
+            # Anything sent from here on reaches the rest of the meeting
+            self.connected.set()
+            return
+        if message.get("type") == "presence":
+            callback = self.presence_callback
+            if callback is not None and isinstance(message.get("presence"), dict):
+                callback(message["presence"])
+            return
+        with self.listen_lock:
+            if self.callback is None:
+                self.held.append(message)
+            else:
+                self.deliver(message)
+
+    def deliver(self, message):
+        if message.get("type") == "snapshot":
+            if self.snapshot_callback is not None:
+                self.snapshot_callback(message["snapshot"])
+            self.last_seq = max(self.last_seq, message["snapshot"]["seq"])
+        elif message.get("type") == "actions":
+            for action in message.get("actions", ()):
+                if action["seq"] > self.last_seq:
+                    self.last_seq = action["seq"]
+                    self.callback(action)
+
+    #Waits a little for the connection, and raises so the caller can retry if there still isn't one
+    def send_message(self, message):
+        if not self.connected.wait(self.CONNECT_WAIT):
+            raise ConnectionError(f"Not connected to the relay at {self.host}:{self.port}")
+        data = self.encode(message)
+        with self.send_lock:
+            connection = self.socket
+            if connection is None:
+                raise ConnectionError("Relay connection closed")
+            connection.sendall(data)
+
+    def send(self, actions):
+        self.send_message({"type": "actions", "actions": actions})
+
+    def listen(self, callback, snapshot_callback=None):
+        with self.listen_lock:
+            self.callback = callback
+            self.snapshot_callback = snapshot_callback
+            for message in self.held:
+                self.deliver(message)
+            self.held = []
+
+    def publish_snapshot(self, snapshot):
+        self.send_message({"type": "snapshot", "snapshot": snapshot})
+
+    #The relay does the folding, this only asks for it
+    def compact(self):
+        self.send_message({"type": "compact"})
+
+    #An update that can't be sent is dropped, the next one or the heartbeat after reconnecting replaces it
+    def send_presence(self, presence):
+        if not self.closed.is_set() and self.connected.wait(self.CONNECT_WAIT):
+            self.send_message({"type": "presence", "presence": presence})
+
+    def listen_presence(self, callback):
+        self.presence_callback = callback
+
+    def close(self):
+        self.closed.set()
+        if self.socket is not None:
+            try:
+                self.socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self.disconnect()
+        self.reader.join(2)
+        # The callbacks usually reference Qt objects, which shouldn't be released from the reader thread
+        with self.listen_lock:
+            self.callback = None
+            self.snapshot_callback = None
+            self.presence_callback = None
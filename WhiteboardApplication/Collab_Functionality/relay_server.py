@@ -0,0 +1,217 @@
+#Self-hosted relay for whiteboard sync, an alternative to the Firebase realtime database
+#Clients keep one TCP connection open and speak newline-delimited JSON. The first line joins a meeting:
+#    {"type": "join", "meeting": "<meeting id>", "since": <last seq seen, when reconnecting>}
+#The relay answers with the meeting's snapshot if it has one, {"type": "snapshot", "snapshot": {...}}, then the
+#logged actions after it and finally {"type": "joined"}. Every line after the join is either a batch of actions,
+#{"type": "actions", "actions": [...]}, which the relay numbers with 'seq', logs and sends to everyone in the
+#meeting (the sender too, so it learns the numbers), a new snapshot to hand to later joiners, or
+#{"type": "compact"} asking the relay to fold the meeting's log into its net effect (see sync_compaction.py), or
+#{"type": "presence", "presence": {"user": ..., ...}}, the sender's pointer, tool and colour (see presence.py).
+#Presence is passed on to the rest of the meeting as it is, never logged, and skipped for peers that are behind.
+#When a client that sent presence disconnects the others get {"user": ..., "gone": true} for it.
+#The relay also compacts a meeting's log by itself every COMPACT_EVERY actions.
+#Run it with: python -m WhiteboardApplication.Collab_Functionality.relay_server --host 0.0.0.0 --port 8765
+import argparse
+import asyncio
+import bisect
+import json
+import logging
+import threading
+
+from WhiteboardApplication.sync_compaction import compact_actions, KEEP_RECENT
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8765
+MAX_LINE = 64 * 1024 * 1024
+JOINED = b'{"type":"joined"}\n'
+COMPACT_EVERY = 5000     # New actions in a meeting before the relay compacts its log
+PRESENCE_BACKLOG = 64 * 1024    # Bytes waiting to be written to a peer before presence updates to it are skipped
+
+
+def encode(message):
+    return json.dumps(message, separators=(',', ':')).encode('utf-8') + b"\n"
+
+
+class Meeting:
+    def __init__(self):
+        self.peers = set()
+        self.log = []          # Actions in seq order, compaction leaves gaps in the numbering
+        self.next_seq = 1
+        self.snapshot = None
+        self.since_compaction = 0
+        self.compacting = False
+
+
+class RelayServer:
+    """Numbers, logs and forwards each meeting's actions to everyone connected to that meeting"""
+
+    def __init__(self, compact_every=COMPACT_EVERY):
+        # Meetings outlive their connections so people can leave and join again
+        self.meetings = {}
+        self.server = None
+        self.compact_every = compact_every
+
+    async def start(self, host="127.0.0.1", port=DEFAULT_PORT):
+        self.server = await asyncio.start_server(self.handle_client, host, port, limit=MAX_LINE)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def handle_client(self, reader, writer):
+        meeting = None
+        user = None
+        try:
+            join = json.loads(await reader.readline())
+            if join.get("type") != "join" or not join.get("meeting"):
+                return
+            meeting = self.meetings.setdefault(str(join["meeting"]), Meeting())
+            self.send_backlog(meeting, writer, join.get("since") or 0)
+            meeting.peers.add(writer)
+            await writer.drain()
+
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                if message.get("type") == "actions":
+                    await self.broadcast(meeting, message.get("actions", []))
+                elif message.get("type") == "snapshot":
+                    self.store_snapshot(meeting, message.get("snapshot"))
+                elif message.get("type") == "compact":
+                    await self.compact(meeting)
+                elif message.get("type") == "presence" and isinstance(message.get("presence"), dict):
+                    user = message["presence"].get("user", user)
+                    self.forward_presence(meeting, writer, line)
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError) as e:
+            logger.debug("Relay client dropped: %s", e)
+        finally:
+            if meeting is not None:
+                meeting.peers.discard(writer)
+                if user is not None:
+                    self.forward_presence(meeting, writer, encode({"type": "presence",
+                                                                   "presence": {"user": user, "gone": True}}))
+            writer.close()
+
+    #Snapshot, then the actions it doesn't cover, or only the actions after since for a client reconnecting.
+    #Called right before the writer joins the peers with nothing awaited in between, so no action is missed.
+    def send_backlog(self, meeting, writer, since):
+        after = since
+        if not since and meeting.snapshot is not None:
+            writer.write(encode({"type": "snapshot", "snapshot": meeting.snapshot}))
+            after = meeting.snapshot["seq"]
+        start = bisect.bisect_right(meeting.log, after, key=lambda action: action["seq"])
+        if start < len(meeting.log):
+            writer.write(encode({"type": "actions", "actions": meeting.log[start:]}))
+        writer.write(JOINED)
+
+    def store_snapshot(self, meeting, snapshot):
+        if not snapshot or not isinstance(snapshot.get("seq"), int) or snapshot["seq"] >= meeting.next_seq:
+            return
+        if meeting.snapshot is None or snapshot["seq"] >= meeting.snapshot["seq"]:
+            meeting.snapshot = snapshot
+
+    async def broadcast(self, meeting, actions):
+        for action in actions:
+            action["seq"] = meeting.next_seq
+            meeting.next_seq += 1
+            meeting.log.append(action)
+        meeting.since_compaction += len(actions)
+        line = encode({"type": "actions", "actions": actions})
+
+        peers = list(meeting.peers)
+        for peer in peers:
+            peer.write(line)
+        # A peer that can't keep up or has gone away is dropped rather than holding up the others
+        results = await asyncio.gather(*(peer.drain() for peer in peers), return_exceptions=True)
+        for peer, result in zip(peers, results):
+            if isinstance(result, Exception):
+                meeting.peers.discard(peer)
+                peer.close()
+
+        if self.compact_every and meeting.since_compaction >= self.compact_every:
+            asyncio.ensure_future(self.compact(meeting))
+
+    #Writes a presence line to everyone else in the meeting without waiting for it to drain. A newer update follows
+    #soon, so a peer with a backlog misses this one instead of queueing more behind it.
+    def forward_presence(self, meeting, sender, line):
+        for peer in meeting.peers:
+            if peer is not sender and peer.transport.get_write_buffer_size() < PRESENCE_BACKLOG:
+                peer.write(line)
+
+    #Folds the log on a worker thread, actions that arrive meanwhile are kept after the folded part. The newest
+    #KEEP_RECENT actions are left alone so clients reconnecting with 'since' still get exactly what they missed.
+    async def compact(self, meeting):
+        if meeting.compacting:
+            return
+        meeting.compacting = True
+        meeting.since_compaction = 0
+        try:
+            folded = len(meeting.log)
+            compacted = await asyncio.get_running_loop().run_in_executor(
+                None, compact_actions, meeting.log[:folded], KEEP_RECENT)
+            meeting.log = compacted + meeting.log[folded:]
+            logger.info("Compacted meeting log from %d to %d actions", folded, len(compacted))
+        finally:
+            meeting.compacting = False
+
+    async def serve_forever(self):
+        async with self.server:
+            await self.server.serve_forever()
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+        for meeting in self.meetings.values():
+            for writer in meeting.peers:
+                writer.close()
+            meeting.peers.clear()
+
+
+class RelayServerThread(threading.Thread):
+    """Runs a RelayServer on its own event loop, port 0 picks a free port which is available as .port once started"""
+
+    def __init__(self, host="127.0.0.1", port=0):
+        super().__init__(daemon=True)
+        self.host = host
+        self.port = port
+        self.relay = RelayServer()
+        self.loop = None
+        self.ready = threading.Event()
+
+    def run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.port = self.loop.run_until_complete(self.relay.start(self.host, self.port))
+        self.ready.set()
+        self.loop.run_forever()
+        self.loop.close()
+
+    def start(self):
+        super().start()
+        self.ready.wait()
+        return self.port
+
+    def stop(self):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.relay.close)
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        self.join(5)
+
+
+def run_relay(host="127.0.0.1", port=DEFAULT_PORT):
+    async def main():
+        relay = RelayServer()
+        bound_port = await relay.start(host, port)
+        logger.info("BestNotes relay listening on %s:%d", host, bound_port)
+        await relay.serve_forever()
+
+    asyncio.run(main())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="BestNotes sync relay")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    arguments = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    run_relay(arguments.host, arguments.port)
@@ -0,0 +1,336 @@
+#Conflict-free replicated model of the board shared in a meeting
+#Every client applies the same operations in whatever order they reach it, more than once even, and ends up with the
+#same board without a server deciding which edit came first. The board is made of:
+#  - an add-wins set of item ids. Adding tags the item with a new stamp and removing takes away only the tags the
+#    remover had seen, so an add concurrent with a remove (a redo while someone erases) keeps the item
+#  - a last-writer-wins register per item for its position, the higher stamp wins
+#  - a sequence per text box (RGA). Every character has its own stamp and is placed after the character it was typed
+#    after, deleted characters stay behind as tombstones so inserts made before the delete still find their place.
+#    Each character's format (bold, italic, ...) is a last-writer-wins register of its own
+#Stamps are Lamport clocks, (counter, replica id) pairs, which every client orders the same way.
+#Operations are plain dicts that can go over the transports as JSON, WhiteboardSync sends them with its actions.
+
+
+def stamp_of(value):
+    """Stamps arrive as [counter, replica] lists from JSON"""
+    return None if value is None else (value[0], value[1])
+
+
+#Length of the longest common start of a and b, or of their ends with from_end. Binary search over slice
+#comparisons, which run in C, is much faster than comparing character by character in Python.
+def common_length(a, b, limit, from_end=False):
+    low, high = 0, limit
+    while low < high:
+        middle = (low + high + 1) // 2
+        if (a[len(a) - middle:] == b[len(b) - middle:]) if from_end else (a[:middle] == b[:middle]):
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+#(start, old end, new end) of the part of old that has to be replaced to get new
+def changed_range(old, new):
+    prefix = common_length(old, new, min(len(old), len(new)))
+    suffix = common_length(old, new, min(len(old), len(new)) - prefix, True)
+    return prefix, len(old) - suffix, len(new) - suffix
+
+
+class TextSequence:
+    """The characters of one text box as an RGA sequence"""
+
+    def __init__(self):
+        self.order = []              # Character stamps in document order, deleted ones included
+        self.chars = {}              # stamp -> character
+        self.deleted = set()
+        self.waiting = {}            # stamp of a character not seen yet -> runs to insert after it
+        self.early_deletes = set()   # Deleted characters that haven't been inserted here yet
+        self.formats = {}            # stamp -> (stamp of the format, format dict), for characters with a format
+        self.early_formats = {}      # Formats of characters that haven't been inserted here yet
+        self.length = 0              # Number of visible characters
+
+    def text(self):
+        return ''.join([self.chars[stamp] for stamp in self.order if stamp not in self.deleted])
+
+    def visible(self):
+        return [stamp for stamp in self.order if stamp not in self.deleted]
+
+    #Smallest range of visible indices that covers the characters still visible among stamps, or None
+    def visible_span(self, stamps):
+        stamps = set(stamps)
+        indices = [index for index, stamp in enumerate(self.visible()) if stamp in stamps]
+        return (indices[0], indices[-1] + 1) if indices else None
+
+    #Format runs [length, format] of count visible characters from index, {} is the default format
+    def format_runs(self, index, count):
+        runs = []
+        for stamp in self.visible()[index:index + count]:
+            value = self.formats.get(stamp, (None, {}))[1]
+            if runs and runs[-1][1] == value:
+                runs[-1][0] += 1
+            else:
+                runs.append([1, value])
+        return runs
+
+    def set_format(self, stamp, format_stamp, value):
+        if stamp not in self.chars:
+            current = self.early_formats.get(stamp)
+            if current is None or current[0] < format_stamp:
+                self.early_formats[stamp] = (format_stamp, value)
+            return False
+        current = self.formats.get(stamp)
+        if current is not None and current[0] >= format_stamp:
+            return False
+        self.formats[stamp] = (format_stamp, value)
+        return stamp not in self.deleted
+
+    #Places a run of characters typed one after another, the first one goes after the character stamped after
+    #(None for the start of the text) and the others after it with consecutive counters. formats are the run's
+    #[length, format] runs, each character's format is stamped with the character's own stamp. Returns whether
+    #the text changed.
+    def insert(self, after, first, text, formats=None):
+        if after is not None and after not in self.chars:
+            self.waiting.setdefault(after, []).append((first, text, formats))
+            return False
+
+        values = []
+        for length, value in formats or ():
+            values.extend([value] * length)
+
+        changed = False
+        previous = after
+        index = None                 # Where the previous character of the run went, when still known
+        counter, replica = first
+        for offset, char in enumerate(text):
+            stamp = (counter + offset, replica)
+            if stamp in self.chars:
+                index = None
+            else:
+                if index is None:
+                    index = 0 if previous is None else self.order.index(previous) + 1
+                # Characters typed after the same one concurrently are ordered by stamp, the newest first
+                while index < len(self.order) and self.order[index] > stamp:
+                    index += 1
+                self.order.insert(index, stamp)
+                self.chars[stamp] = char
+                if offset < len(values) and values[offset]:
+                    self.formats[stamp] = (stamp, values[offset])
+                if stamp in self.early_formats:
+                    self.set_format(stamp, *self.early_formats.pop(stamp))
+                if stamp in self.early_deletes:
+                    self.early_deletes.discard(stamp)
+                    self.deleted.add(stamp)
+                else:
+                    self.length += 1
+                    changed = True
+                index += 1
+                waiting = self.waiting.pop(stamp, ())
+                for run in waiting:
+                    changed = self.insert(stamp, *run) or changed
+                if waiting:
+                    index = None
+            previous = stamp
+        return changed
+
+    def delete(self, stamps):
+        changed = False
+        for stamp in stamps:
+            if stamp not in self.chars:
+                self.early_deletes.add(stamp)
+            elif stamp not in self.deleted:
+                self.deleted.add(stamp)
+                self.length -= 1
+                changed = True
+        return changed
+
+    #[counter, replica, character, deleted] per character, followed by the format's stamp and value if it has one
+    def dump(self):
+        data = []
+        for stamp in self.order:
+            entry = [stamp[0], stamp[1], self.chars[stamp], stamp in self.deleted]
+            if stamp in self.formats:
+                format_stamp, value = self.formats[stamp]
+                entry += [list(format_stamp), value]
+            data.append(entry)
+        return data
+
+    @classmethod
+    def load(cls, data):
+        sequence = cls()
+        for entry in data:
+            stamp = (entry[0], entry[1])
+            sequence.order.append(stamp)
+            sequence.chars[stamp] = entry[2]
+            if entry[3]:
+                sequence.deleted.add(stamp)
+            else:
+                sequence.length += 1
+            if len(entry) > 4:
+                sequence.formats[stamp] = (stamp_of(entry[4]), entry[5])
+        return sequence
+
+
+class BoardState:
+    """One client's replica of the board, edits made here return the operations to send to the others"""
+
+    def __init__(self, replica):
+        self.replica = replica
+        self.counter = 0
+        self.tags = {}           # item id -> stamps of the adds that still stand
+        self.removed = {}        # item id -> stamps of adds that were removed
+        self.positions = {}      # item id -> (stamp, position)
+        self.texts = {}          # item id -> TextSequence
+
+    #Stamp of a new operation, count reserves consecutive counters for a run of characters
+    def tick(self, count=1):
+        self.counter += count
+        return (self.counter - count + 1, self.replica)
+
+    def observe(self, stamp, count=1):
+        self.counter = max(self.counter, stamp[0] + count - 1)
+
+    def contains(self, item_id):
+        return bool(self.tags.get(item_id))
+
+    def position(self, item_id):
+        register = self.positions.get(item_id)
+        return None if register is None else register[1]
+
+    def text(self, item_id):
+        sequence = self.texts.get(item_id)
+        return '' if sequence is None else sequence.text()
+
+    def text_length(self, item_id):
+        sequence = self.texts.get(item_id)
+        return 0 if sequence is None else sequence.length
+
+    def text_sequence(self, item_id):
+        if item_id not in self.texts:
+            self.texts[item_id] = TextSequence()
+        return self.texts[item_id]
+
+    #Local edits, each is applied here and returns the operation for the other replicas
+
+    def add_item(self, item_id):
+        op = {'op': 'add', 'item': item_id, 'tag': list(self.tick())}
+        self.apply(op)
+        return op
+
+    def remove_item(self, item_id):
+        op = {'op': 'remove', 'item': item_id, 'tags': [list(tag) for tag in sorted(self.tags.get(item_id, ()))]}
+        self.apply(op)
+        return op
+
+    def move_item(self, item_id, position):
+        op = {'op': 'move', 'item': item_id, 'stamp': list(self.tick()), 'position': position}
+        self.apply(op)
+        return op
+
+    #formats are [length, format] runs covering text, left out when all of it has the default format
+    def insert_text(self, item_id, index, text, formats=None):
+        visible = self.text_sequence(item_id).visible()
+        after = visible[index - 1] if index > 0 else None
+        op = {'op': 'insert', 'item': item_id, 'after': None if after is None else list(after),
+              'first': list(self.tick(len(text))), 'text': text}
+        if formats and any(value for _length, value in formats):
+            op['formats'] = formats
+        self.apply(op)
+        return op
+
+    def delete_text(self, item_id, index, count):
+        visible = self.text_sequence(item_id).visible()
+        op = {'op': 'delete', 'item': item_id, 'chars': [list(stamp) for stamp in visible[index:index + count]]}
+        self.apply(op)
+        return op
+
+    #Sets the format of the visible characters the [length, format] runs cover, starting at index
+    def format_text(self, item_id, index, formats):
+        visible = self.text_sequence(item_id).visible()
+        count = sum(length for length, _value in formats)
+        op = {'op': 'format', 'item': item_id, 'stamp': list(self.tick()),
+              'chars': [list(stamp) for stamp in visible[index:index + count]], 'formats': formats}
+        self.apply(op)
+        return op
+
+    #Operations that turn the text box's text into text, only the changed middle part is sent
+    def edit_text(self, item_id, text):
+        start, old_end, new_end = changed_range(self.text(item_id), text)
+        ops = []
+        if old_end > start:
+            ops.append(self.delete_text(item_id, start, old_end - start))
+        if new_end > start:
+            ops.append(self.insert_text(item_id, start, text[start:new_end]))
+        return ops
+
+    #Applies an operation from any replica, returns whether the board looks different afterwards
+    def apply(self, op):
+        kind = op['op']
+        item_id = op['item']
+        if kind == 'add':
+            tag = stamp_of(op['tag'])
+            self.observe(tag)
+            if tag in self.removed.get(item_id, ()):
+                return False
+            tags = self.tags.setdefault(item_id, set())
+            was_there = bool(tags)
+            tags.add(tag)
+            return not was_there
+        if kind == 'remove':
+            tags = self.tags.get(item_id, set())
+            was_there = bool(tags)
+            removed = self.removed.setdefault(item_id, set())
+            for tag in map(stamp_of, op['tags']):
+                removed.add(tag)
+                tags.discard(tag)
+            return was_there and not tags
+        if kind == 'move':
+            stamp = stamp_of(op['stamp'])
+            self.observe(stamp)
+            register = self.positions.get(item_id)
+            if register is not None and register[0] >= stamp:
+                return False
+            self.positions[item_id] = (stamp, op['position'])
+            return True
+        if kind == 'insert':
+            first = stamp_of(op['first'])
+            self.observe(first, len(op['text']))
+            return self.text_sequence(item_id).insert(stamp_of(op['after']), first, op['text'], op.get('formats'))
+        if kind == 'delete':
+            return self.text_sequence(item_id).delete([stamp_of(stamp) for stamp in op['chars']])
+        if kind == 'format':
+            format_stamp = stamp_of(op['stamp'])
+            self.observe(format_stamp)
+            sequence = self.text_sequence(item_id)
+            chars = iter(op['chars'])
+            changed = False
+            for length, value in op['formats']:
+                for _ in range(length):
+                    changed = sequence.set_format(stamp_of(next(chars)), format_stamp, value) or changed
+            return changed
+        raise ValueError(f"Unknown board operation {kind}")
+
+    #What every replica has to agree on once they have seen the same operations
+    def digest(self):
+        items = sorted(item_id for item_id, tags in self.tags.items() if tags)
+        positions = {item_id: tuple(register[1]) for item_id, register in self.positions.items()}
+        texts = {item_id: (sequence.text(), sequence.format_runs(0, len(sequence.order)))
+                 for item_id, sequence in self.texts.items()}
+        return items, positions, texts
+
+    #JSON friendly copy of the state for board snapshots, load gives a late joiner the same replica
+    def dump(self):
+        return {
+            'counter': self.counter,
+            'tags': {item_id: [list(tag) for tag in tags] for item_id, tags in self.tags.items() if tags},
+            'removed': {item_id: [list(tag) for tag in tags] for item_id, tags in self.removed.items() if tags},
+            'positions': {item_id: [list(stamp), position] for item_id, (stamp, position) in self.positions.items()},
+            'texts': {item_id: sequence.dump() for item_id, sequence in self.texts.items()},
+        }
+
+    def load(self, data):
+        self.counter = max(self.counter, data['counter'])
+        self.tags = {item_id: set(map(stamp_of, tags)) for item_id, tags in data['tags'].items()}
+        self.removed = {item_id: set(map(stamp_of, tags)) for item_id, tags in data['removed'].items()}
+        self.positions = {item_id: (stamp_of(stamp), position)
+                          for item_id, (stamp, position) in data['positions'].items()}
+        self.texts = {item_id: TextSequence.load(chars) for item_id, chars in data['texts'].items()}
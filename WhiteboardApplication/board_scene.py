@@ -1,9 +1,23 @@
+import itertools
+import math
+import uuid
+from contextlib import contextmanager
+
 from WhiteboardApplication.resize_handle_image import ResizablePixmapItem
 from PySide6.QtCore import QPointF, QRectF, Qt, QSizeF
 from PySide6.QtGui import QColor, QPen, QPainterPath, QBrush, QTransform
-from PySide6.QtWidgets import QGraphicsScene, QGraphicsPathItem, QGraphicsEllipseItem, QMessageBox
+from PySide6.QtWidgets import QGraphicsScene, QGraphicsPathItem, QGraphicsEllipseItem, QMessageBox, QGraphicsItem
 from WhiteboardApplication.text_box import TextBox
 from WhiteboardApplication.video_player import MediaPlayer
+from WhiteboardApplication.live_stroke import LiveStrokeItem
+from WhiteboardApplication.notebook_loader import LazyNotebookLoader
+from WhiteboardApplication.stroke_filters import StrokeFilterPipeline, simplify_rdp
+from WhiteboardApplication.stroke_index import StrokeIndex, item_polylines, split_polyline
+from WhiteboardApplication.stroke_item import StrokeItem
+from WhiteboardApplication.tile_cache import TileCache
+from WhiteboardApplication.undo_history import UndoCommand, UndoHistory
+
+ITEM_ID = 0     # QGraphicsItem data key holding an item's id, see BoardScene.item_id
 
 class BoardScene(QGraphicsScene):
     def __init__(self):
@@ -11,7 +25,6 @@ class BoardScene(QGraphicsScene):
 
         self.setSceneRect(0, 0, 600, 500)
 
-        self.path = None
         self.previous_position = None
         self.drawing = False
         self.color = QColor("#000000")
@@ -20,13 +33,15 @@ class BoardScene(QGraphicsScene):
         self.sync = None
 
         # Highlighter
-        self.path_highlighter = None
         self.previous_position_highlighter = None
         self.highlighting= False
         self.color_highlighter = QColor(255, 255, 0, 30)
         self.size_highlighter = 10
         self.pathItem_highlighter = None
 
+        # Decimation and smoothing applied to pen and highlighter input
+        self.stroke_filter = StrokeFilterPipeline()
+
         #Added flags to check which button is being pressed, and if text boxes are being dragged
         self.is_text_box_selected = False
         self.dragging_text_box = False
@@ -35,74 +50,352 @@ class BoardScene(QGraphicsScene):
         self.erasing_enabled = False
         self.active_tool = None
 
-        self.undo_list = []
-        self.redo_list = []
-        self.highlight_items = []
+        # UndoCommands of this user's own steps, other users' steps are undone by them (see WhiteboardSync).
+        # The history keeps itself within its step and memory limits, see undo_history.py
+        self.history = UndoHistory()
+        # Step being collected while an undo group is open, see begin_group
+        self.group = None
+        self.group_depth = 0
+        # Tile invalidation collected while changes are batched, see batch_changes
+        self.batch_depth = 0
+        self.batch_rect = None
+        self.batch_layer_rect = None
+        self.highlight_items = set()
+        # Grid over stroke segments so the eraser doesn't query the whole scene
+        self.stroke_index = StrokeIndex()
+        self.eraser_radius = 10
+
+        # Committed ink can be drawn from raster tiles in the background layer instead of as vector items
+        self.tile_rendering = False
+        self.tile_cache = TileCache()
+        self.selectionChanged.connect(self.invalidate_tiles)
+        # Scene rects of the images and text boxes being dragged, as they were when the drag started
+        self.moving_items = {}
+
+        # Device coordinate caching for items that don't change once placed, set by the view's render profile
+        self.static_item_cache = False
+
+        # Notebook still being streamed in from disk, see start_lazy_load
+        self.loader = None
+        self.loading_journal = None
+
+        # Autosave journal, every item added or removed goes through addItem/removeItem and is recorded there
+        self.journal = None
+
+        # Every top-level item gets an id that is unique across clients, sync and undo find items by it.
+        # The id stays with the item while it is off the scene so undo/redo brings it back under the same id.
+        self.id_prefix = uuid.uuid4().hex[:16]
+        self.id_counter = itertools.count(1)
+        self.items_by_id = {}
+
+        # Drag-to-erase state, the whole drag becomes one undo entry and one synced action
+        self.erasing = False
+        self.eraser_points = []
+        self.erased_items = []
+        self.eraser_pieces = []
         self.i = 1
         self.j = 1
         self.highlight_radius_options = [10, 20, 30, 40]
         self.pen_radius_options = [1,5,10,20]
 
-    #Adds an action to the undo list (or a list of items in the case of textbox), by treating every action as a list
-    def add_item_to_undo(self, item):
-        """Add a single item or group of items to the undo list and clear redo list"""
-        # Clear redo list to ensure correct redo functionality
-        self.redo_list.clear()
+    #Keeps the eraser index and highlight set in step with every path item added to the scene,
+    #this covers drawing, undo, redo and remote actions since they all go through addItem/removeItem.
+    #item_id gives the item the id another client knows it by
+    def addItem(self, item, item_id=None):
+        super().addItem(item)
+        if item.parentItem() is None:
+            if item_id is not None:
+                item.setData(ITEM_ID, item_id)
+            self.items_by_id[self.item_id(item)] = item
+            if self.journal is not None:
+                self.journal.record_add(item)
+        if isinstance(item, QGraphicsPathItem):
+            self.stroke_index.insert(item, item_polylines(item), item.pen().widthF())
+            if isinstance(item, StrokeItem) and item.highlighter:
+                self.highlight_items.add(item)
+        if isinstance(item, StrokeItem):
+            item.tile_cached = self.tile_rendering
+            if self.tile_rendering:
+                self.invalidate_tiles(item.sceneBoundingRect())
+        if self.tile_rendering and item.parentItem() is None:
+            self.update_tile_layering(item.sceneBoundingRect())
+        if isinstance(item, (StrokeItem, ResizablePixmapItem)):
+            item.setCacheMode(self.static_cache_mode())
+
+    def removeItem(self, item):
+        super().removeItem(item)
+        item_id = item.data(ITEM_ID)
+        if item_id is not None and self.items_by_id.get(item_id) is item:
+            del self.items_by_id[item_id]
+        if self.journal is not None:
+            self.journal.record_remove(item)
+        self.stroke_index.remove(item)
+        self.highlight_items.discard(item)
+        if self.tile_rendering and isinstance(item, StrokeItem):
+            self.invalidate_tiles(item.sceneBoundingRect())
+        elif self.tile_rendering and item.parentItem() is None:
+            self.update_tile_layering(item.sceneBoundingRect())
+
+    def clear(self):
+        if self.loader is not None:
+            self.loader.cancel()
+            self.loader = None
+            self.journal = self.loading_journal
+            self.loading_journal = None
+        if self.journal is not None:
+            self.journal.record_clear()
+        super().clear()
+        self.items_by_id.clear()
+        self.stroke_index.clear()
+        self.highlight_items.clear()
+        self.tile_cache.clear()
+
+    def set_journal(self, journal):
+        self.journal = journal
+
+    #Returns the item's id, giving it a new one if it doesn't have one yet
+    def item_id(self, item):
+        item_id = item.data(ITEM_ID)
+        if item_id is None:
+            item_id = f"{self.id_prefix}-{next(self.id_counter)}"
+            item.setData(ITEM_ID, item_id)
+        return item_id
+
+    #The item on the scene with this id, or None
+    def item_by_id(self, item_id):
+        return self.items_by_id.get(item_id)
+
+    #Gives an item rebuilt from the undo history's spill file the id it had, text boxes get synced again
+    def restore_item(self, item, item_id):
+        item.setData(ITEM_ID, item_id)
+        if self.sync and isinstance(item, TextBox):
+            self.sync.connect_text_box(item)
+
+    #Adds the items of an open NotebookReader, the ones visible in view first and the rest in the background
+    def start_lazy_load(self, reader, view=None):
+        self.clear()
+        # A loaded notebook starts a new history, the steps of the board it replaces can't be undone onto it
+        self.history.clear()
+        # Loaded items are already on disk, the journal picks them all up in one compaction once loading is done
+        self.loading_journal = self.journal
+        self.journal = None
+        self.loader = LazyNotebookLoader(self, reader, view)
+        self.loader.finished.connect(self.lazy_load_finished)
+        self.loader.start()
+
+    def lazy_load_finished(self):
+        self.loader = None
+        self.journal = self.loading_journal
+        self.loading_journal = None
+        if self.journal is not None:
+            self.journal.compact()
+
+    #Blocks until every item of a lazily loaded notebook is in the scene
+    def finish_loading(self):
+        if self.loader is not None:
+            self.loader.finish()
+
+    def static_cache_mode(self):
+        if self.static_item_cache:
+            return QGraphicsItem.CacheMode.DeviceCoordinateCache
+        return QGraphicsItem.CacheMode.NoCache
+
+    #Turns device coordinate caching of committed strokes and images on or off
+    def set_static_item_cache(self, enable):
+        self.static_item_cache = enable
+        for item in self.items():
+            if isinstance(item, (StrokeItem, ResizablePixmapItem)):
+                item.setCacheMode(self.static_cache_mode())
+
+    #Turns raster tile rendering of committed strokes on or off, the live stroke and selected items stay vector
+    def set_tile_rendering(self, enable):
+        self.tile_rendering = enable
+        for item in self.items():
+            if isinstance(item, StrokeItem):
+                item.tile_cached = enable
+        if enable:
+            self.update_tile_layering(self.itemsBoundingRect())
+        self.invalidate_tiles()
+        self.update()
+
+    #The tiles are painted under every item, so a stroke stacked above an image or text box it overlaps stays a
+    #vector item, or it would end up beneath it. Works this out again for the strokes touching rect
+    def update_tile_layering(self, rect):
+        if not self.tile_rendering:
+            return
+        if self.batch_depth:
+            self.batch_layer_rect = rect if self.batch_layer_rect is None else self.batch_layer_rect.united(rect)
+            return
 
-        # Add item (or list of items if it's a group) to the undo list
-        self.undo_list.append([item])
-        print("Added to undo:", item)
+        strokes = {item for item in self.items(rect, Qt.ItemSelectionMode.IntersectsItemBoundingRect)
+                   if isinstance(item, StrokeItem)}
+        if not strokes:
+            return
+        # Whatever overlaps these strokes lies within their bounds
+        area = QRectF(rect)
+        for stroke in strokes:
+            area = area.united(stroke.sceneBoundingRect())
+
+        below = []
+        for item in self.items(area, Qt.ItemSelectionMode.IntersectsItemBoundingRect, Qt.SortOrder.AscendingOrder):
+            if item.parentItem() is not None:
+                continue
+            if item in strokes:
+                bounds = item.sceneBoundingRect()
+                cached = not any(bounds.intersects(other) for other in below)
+                if item.tile_cached != cached:
+                    item.tile_cached = cached
+                    item.update()
+                    self.invalidate_tiles(bounds)
+            elif not isinstance(item, (StrokeItem, LiveStrokeItem)):
+                below.append(item.sceneBoundingRect())
+
+    #Checks the tile layering again where an image or text box was and where it is now
+    def item_moved(self, item, old_rect):
+        self.update_tile_layering(old_rect.united(item.sceneBoundingRect()))
+
+    #Drops the tiles an edit touched and repaints that part of the background, with no rect everything is dropped
+    def invalidate_tiles(self, rect=None):
+        if rect is not None and self.batch_depth:
+            self.batch_rect = rect if self.batch_rect is None else self.batch_rect.united(rect)
+            return
+        if rect is None:
+            self.tile_cache.clear()
+            self.invalidate(self.sceneRect(), QGraphicsScene.SceneLayer.BackgroundLayer)
+        else:
+            self.tile_cache.invalidate(rect)
+            self.invalidate(rect, QGraphicsScene.SceneLayer.BackgroundLayer)
+
+    def drawBackground(self, painter, rect):
+        super().drawBackground(painter, rect)
+        if not self.tile_rendering:
+            return
 
-    #Pops action of undo stack to undo, and adds it to redo in case user wants to redo the action
-    def undo(self):
+        # Tiles are rendered for the view's current zoom so they stay sharp
+        zoom = round(painter.worldTransform().m11(), 3)
+        for key in self.tile_cache.tile_keys(zoom, rect):
+            pixmap = self.tile_cache.tile(self, key)
+            painter.drawPixmap(self.tile_cache.tile_rect(*key), pixmap, QRectF(pixmap.rect()))
+
+    @property
+    def undo_list(self):
+        return self.history.undo_list
+
+    @property
+    def redo_list(self):
+        return self.history.redo_list
+
+    #Adds a step to the undo list and clears the redo list, while a group is open the step becomes part of it
+    def add_command(self, command):
+        if self.group is not None:
+            self.group.merge(command)
+        else:
+            self.history.add(command)
+
+    #Opens an undo group, the steps added until the matching end_group are undone and redone as one.
+    #Groups nest, the outermost one makes the step
+    def begin_group(self):
+        if not self.group_depth:
+            self.group = UndoCommand(self)
+        self.group_depth += 1
+
+    def end_group(self):
+        self.group_depth -= 1
+        if self.group_depth:
+            return
+        group, self.group = self.group, None
+        if len(group):
+            self.history.add(group)
+
+    @contextmanager
+    def undo_group(self):
+        self.begin_group()
+        try:
+            yield
+        finally:
+            self.end_group()
+
+    #Collects the tile invalidation of every item added or removed inside it into one, so undoing a large group or
+    #replaying a batch of remote actions drops and repaints the tiles once instead of once per item
+    @contextmanager
+    def batch_changes(self):
+        self.batch_depth += 1
+        try:
+            yield
+        finally:
+            self.batch_depth -= 1
+            if not self.batch_depth and self.batch_layer_rect is not None:
+                rect, self.batch_layer_rect = self.batch_layer_rect, None
+                self.update_tile_layering(rect)
+            if not self.batch_depth and self.batch_rect is not None:
+                rect, self.batch_rect = self.batch_rect, None
+                self.invalidate_tiles(rect)
+
+    #Steps and bytes held by the undo history, and by the items other users' actions took off this board
+    def history_usage(self):
+        usage = {'undo': self.history.usage()}
         if self.sync:
-            print("Sync Undo\n")
-            self.sync.sync_undo()
+            usage['remote'] = self.sync.removed_items.usage()
+        return usage
 
-        if not self.undo_list:
-            print("Undo list is empty")
+    #Adds an item this user put on the board to the undo list
+    def add_item_to_undo(self, item):
+        self.add_command(UndoCommand(self, added=[item]))
+
+    #Takes items off the board and puts others back, every undo and redo comes down to this
+    def swap_items(self, take_off, put_back):
+        with self.batch_changes():
+            for item in take_off:
+                if item.scene() is self:
+                    self.removeItem(item)
+            for item in put_back:
+                if item.scene() is None:
+                    self.addItem(item)
+
+    #Takes items off the board as one undo step and one synced erase, like an eraser drag that hit all of them
+    def remove_items(self, items):
+        items = [item for item in items if item.scene() is self and item.parentItem() is None]
+        if not items:
             return
+        with self.batch_changes():
+            for item in items:
+                self.removeItem(item)
+        self.add_erase_to_undo(items)
+        if self.sync:
+            self.sync.sync_eraser([], items=items)
 
-        # Pop the last group of items from the undo stack
-        item_group = self.undo_list.pop()
-        for item in item_group:
-            self.removeItem(item)
-            print("Removed from scene (undo):", item)
+    #Empties the board as one step that undo puts back, clear drops the items for good
+    def clear_board(self):
+        self.finish_loading()
+        self.remove_items([item for item in self.items() if item.parentItem() is None])
 
-        # Push the removed items to the redo stack
-        self.redo_list.append(item_group)
-        print("Added to redo stack:", item_group)
+    #Pops this user's last step off the undo stack, reverses it here and on the other boards, keeps it for redo
+    def undo(self):
+        command = self.history.undo(self)
+        if command is None:
+            print("Undo list is empty")
+            return
 
-    #Pops an action off the redo stack and adds it back to undo to redo and action
-    def redo(self):
+        print("Undone:", command)
         if self.sync:
-            print("Sync Redo\n")
-            self.sync.sync_redo()
+            self.sync.sync_undo(command)
 
-        if not self.redo_list:
+    #Pops the last undone step off the redo stack and does it again here and on the other boards
+    def redo(self):
+        command = self.history.redo(self)
+        if command is None:
             print("Redo list is empty")
             return
 
-        # Pop the last group of items from the redo stack
-        item_group = self.redo_list.pop()
-        for item in item_group:
-            self.addItem(item)
-            print("Added back to scene (redo):", item)
-
-        # Push the redone items back to the undo stack
-        self.undo_list.append(item_group)
-        print("Restored to undo stack:", item_group)
+        print("Redone:", command)
+        if self.sync:
+            self.sync.sync_redo(command)
 
     #Adds text box and resizing handles as a group so they are undone at once
     def add_text_box(self, text_box_item):
         if self.sync:
             self.sync.sync_textbox_create(text_box_item)
-            text_box_item.contentChanged.connect(
-                lambda: self.sync.sync_textbox_content(text_box_item)
-            )
-            text_box_item.moved.connect(
-                lambda: self.sync.sync_textbox_move(text_box_item)
-            )
+            self.sync.connect_text_box(text_box_item)
         self.addItem(text_box_item)
         self.add_item_to_undo(text_box_item)  # For complex items, group with handles if needed
         print("TextBox added to scene:", text_box_item)
@@ -112,8 +405,42 @@ class BoardScene(QGraphicsScene):
         self.add_item_to_undo(pixmap_item)
         print("Image added to scene:", pixmap_item)
 
+    #Starts a live stroke that points can be appended to cheaply while the mouse moves
+    def start_stroke(self, position, pen, highlighter=False):
+        live_item = LiveStrokeItem(position, pen, highlighter)
+        self.stroke_filter.begin((position.x(), position.y()))
+        self.addItem(live_item)
+        if self.sync:
+            self.sync.sync_stroke_points(live_item)
+        return live_item
+
+    #Adds a point to the live stroke unless the input filters drop it
+    def extend_stroke(self, live_item, position):
+        if self.stroke_filter.accept((position.x(), position.y())):
+            live_item.add_point(position)
+            if self.sync:
+                self.sync.sync_stroke_points(live_item)
+
+    #Swaps the live stroke for a normal path item once the mouse is released, the path item keeps the live
+    #stroke's id so it replaces the copy other clients were shown while it was streamed
+    def finish_stroke(self, live_item):
+        points = self.stroke_filter.finish(live_item.points)
+        stroke = live_item.to_stroke_item(points, self.stroke_filter.smoothing)
+        self.removeItem(live_item)
+        self.addItem(stroke, self.item_id(live_item))
+        return stroke
+
+    #Error tolerance in scene units for dropping stroke points, 0 keeps every point
+    def set_stroke_tolerance(self, tolerance):
+        self.stroke_filter.set_tolerance(tolerance)
+
+    def set_stroke_smoothing(self, enable):
+        self.stroke_filter.smoothing = enable
+
     def change_color(self, color):
         self.color = color
+        if self.sync:
+            self.sync.presence.update(color=color.name())
 
     def change_size(self, size):
         self.size = size
@@ -140,23 +467,97 @@ class BoardScene(QGraphicsScene):
             self.drawing_enabled = False
             self.erasing_enabled = False
 
-    #A basic eraser, created as a hold so text box function could be implemented
-    def erase(self, position):
-        if self.sync:
-            self.sync.sync_eraser(position)
-
-        eraser_radius = 10
-
-        #Creates a 20 x 20 rectangle, using the current position and moving further left and up to set the left corner of the rectangle
-        erase_item = self.items(QRectF(position - QPointF(eraser_radius, eraser_radius), QSizeF(eraser_radius * 2, eraser_radius * 2)))
+    #Removes every stroke within the eraser radius of the segment start -> end and returns them,
+    #removeItem also updates the index
+    def erase_segment(self, start, end):
+        removed = self.stroke_index.query_segment((start.x(), start.y()), (end.x(), end.y()), self.eraser_radius)
+        for item in removed:
+            self.removeItem(item)
+        return removed
 
-        #Removes all items within the rectangle
-        for item in erase_item:
-            if item in self.highlight_items:
-                self.removeItem(item)
-                self.highlight_items.remove(item)
-            elif isinstance(item, QGraphicsPathItem):
-                self.removeItem(item)
+    def erase(self, position):
+        return self.erase_segment(position, position)
+
+    #Erases along a whole eraser polyline, used when replaying a batched eraser action
+    def erase_path(self, points):
+        if len(points) == 1:
+            return self.erase(points[0])
+
+        removed = []
+        for start, end in zip(points, points[1:]):
+            removed.extend(self.erase_segment(start, end))
+        return removed
+
+    #Adds everything erased during one drag to the undo list as a single step, added are the pieces the pixel
+    #eraser left in place of the strokes it cut
+    def add_erase_to_undo(self, items, added=()):
+        self.add_command(UndoCommand(self, added=added, removed=items))
+
+    #Pixel eraser: cuts the eraser circle out of a stroke and replaces it with the pieces left over.
+    #Returns the pieces, or None if the circle missed the stroke and it was left alone.
+    #replaying names the pieces the way older clients do, who send only the eraser path
+    def cut_item(self, item, center, replaying=False):
+        reach = self.eraser_radius + item.pen().widthF() / 2
+        polylines = item_polylines(item)
+        splits = [split_polyline(polyline, center, reach) for polyline in polylines]
+        if all(split == [list(polyline)] for split, polyline in zip(splits, polylines)):
+            return None
+
+        pieces = []
+        for split in splits:
+            for piece in split:
+                stroke = StrokeItem(piece, item.pen(), getattr(item, 'highlighter', False), getattr(item, 'smooth', False))
+                stroke.setZValue(item.zValue())
+                pieces.append(stroke)
+
+        # Pieces are named after the stroke they were first cut from and this cut, the pixel eraser action sends
+        # them by these ids. A piece brought back by an undo and cut again gets pieces with new ids, never those of
+        # the earlier cut, which other boards may still hold in a different shape.
+        if replaying:
+            prefix = self.item_id(item)
+        else:
+            prefix = f"{self.item_id(item).split('.')[0]}.{self.id_prefix}-{next(self.id_counter)}"
+        self.removeItem(item)
+        for number, stroke in enumerate(pieces):
+            self.addItem(stroke, f"{prefix}.{number}")
+        return pieces
+
+    #Folds the result of a cut into the running totals of a drag,
+    #a piece cut again in the same drag was never on the board before so it is just dropped
+    def merge_cut(self, removed, added, cut_removed, cut_added):
+        for item in cut_removed:
+            if item in added:
+                added.remove(item)
+            else:
+                removed.append(item)
+        added.extend(cut_added)
+
+    #Cuts along the segment start -> end, sampled at half the eraser radius so the cut has no gaps.
+    #Returns the original items that were removed and the pieces added
+    def cut_segment(self, start, end, replaying=False):
+        removed = []
+        added = []
+        length = math.hypot(end.x() - start.x(), end.y() - start.y())
+        steps = max(1, math.ceil(length / (self.eraser_radius / 2)))
+        for step in range(steps + 1):
+            t = step / steps
+            center = (start.x() + (end.x() - start.x()) * t, start.y() + (end.y() - start.y()) * t)
+            for item in self.stroke_index.query(center, self.eraser_radius):
+                pieces = self.cut_item(item, center, replaying)
+                if pieces is not None:
+                    self.merge_cut(removed, added, [item], pieces)
+        return removed, added
+
+    #Pixel erases along a whole eraser polyline, used when replaying a pixel eraser action of an older client
+    def cut_path(self, points):
+        if len(points) == 1:
+            return self.cut_segment(points[0], points[0], True)
+
+        removed = []
+        added = []
+        for start, end in zip(points, points[1:]):
+            self.merge_cut(removed, added, *self.cut_segment(start, end, True))
+        return removed, added
 
     def open_video_player(self):
         print("Video button clicked")
@@ -189,66 +590,63 @@ class BoardScene(QGraphicsScene):
                 if self.active_tool == "pen":
                     print("Pen tool active")
                     self.drawing = True
-                    self.path = QPainterPath()
                     self.previous_position = event.scenePos()
-                    self.path.moveTo(self.previous_position)
-                    self.pathItem = QGraphicsPathItem()
                     my_pen = QPen(self.color, self.size)
                     my_pen.setCapStyle(Qt.PenCapStyle.RoundCap)
-                    self.pathItem.setPen(my_pen)
-                    self.addItem(self.pathItem)
+                    self.pathItem = self.start_stroke(self.previous_position, my_pen)
                 elif self.active_tool == "highlighter":
                     print("Highlighter tool active")
                     self.highlighting = True
-                    self.path_highlighter = QPainterPath()
                     self.previous_position_highlighter = event.scenePos()
-                    self.path_highlighter.moveTo(self.previous_position_highlighter)
-                    self.pathItem_highlighter = QGraphicsPathItem()
                     my_pen = QPen(self.color_highlighter, self.size_highlighter)
                     my_pen.setCapStyle(Qt.PenCapStyle.RoundCap)
-                    self.pathItem_highlighter.setPen(my_pen)
-                    self.addItem(self.pathItem_highlighter)
+                    self.pathItem_highlighter = self.start_stroke(self.previous_position_highlighter, my_pen, True)
                 elif self.active_tool == "eraser":
                     print("Eraser tool active")
                     self.drawing = False
-                    self.erase(event.scenePos())
+                    self.erasing = True
+                    self.eraser_points = [event.scenePos()]
+                    self.erased_items = self.erase(event.scenePos())
+                    self.eraser_pieces = []
+                elif self.active_tool == "pixel_eraser":
+                    print("Pixel eraser tool active")
+                    self.drawing = False
+                    self.erasing = True
+                    self.eraser_points = [event.scenePos()]
+                    self.erased_items, self.eraser_pieces = self.cut_segment(event.scenePos(), event.scenePos())
                 elif self.active_tool == "cursor":
                     print("Cursor active")
                     self.drawing = False
         elif event.button() == Qt.RightButton:
             if self.active_tool == "highlighter":
                 self.highlighting = True
-                self.path_highlighter = QPainterPath()
                 self.previous_position_highlighter = event.scenePos()
-                self.path_highlighter.moveTo(self.previous_position_highlighter)
-                self.pathItem_highlighter = QGraphicsPathItem()
                 self.size_highlighter = self.highlight_radius_options[self.i]
                 my_pen = QPen(self.color_highlighter, self.size_highlighter)
                 my_pen.setCapStyle(Qt.PenCapStyle.RoundCap)
-                self.pathItem_highlighter.setPen(my_pen)
-                self.addItem(self.pathItem_highlighter)
-                self.add_item_to_undo(self.pathItem_highlighter)
+                self.pathItem_highlighter = self.start_stroke(self.previous_position_highlighter, my_pen, True)
                 self.i += 1
                 if self.i >= len(self.highlight_radius_options):
                     self.i = 0
             elif self.active_tool == "pen":
                 self.drawing = True
-                self.path = QPainterPath()
                 self.previous_position = event.scenePos()
-                self.path.moveTo(self.previous_position)
-                self.pathItem = QGraphicsPathItem()
                 self.size = self.pen_radius_options[self.j]
                 my_pen = QPen(self.color, self.size)
                 my_pen.setCapStyle(Qt.PenCapStyle.RoundCap)
-                self.pathItem.setPen(my_pen)
-                self.addItem(self.pathItem)
-                self.add_item_to_undo(self.pathItem)
+                self.pathItem = self.start_stroke(self.previous_position, my_pen)
                 self.j += 1
                 if self.j >= len(self.pen_radius_options):
                     self.j = 0
 
         super().mousePressEvent(event)
 
+        # Whatever is selected now moves with the drag
+        self.moving_items = {item: item.sceneBoundingRect() for item in self.selectedItems()
+                             if item.parentItem() is None and not isinstance(item, StrokeItem)}
+        if self.dragging_text_box:
+            self.moving_items[self.selected_text_box] = self.selected_text_box.sceneBoundingRect()
+
     def mouseMoveEvent(self, event):
         if self.dragging_text_box and self.selected_text_box:
             self.drawing = False
@@ -259,26 +657,41 @@ class BoardScene(QGraphicsScene):
             self.selected_text_box.setPos(self.selected_text_box.pos() + delta)
             self.start_pos = event.scenePos()
         elif self.drawing:
-            print("drawing")
             curr_position = event.scenePos()
-            self.path.lineTo(curr_position)
-            self.pathItem.setPath(self.path)
+            self.extend_stroke(self.pathItem, curr_position)
             self.previous_position = curr_position
         elif self.highlighting:
-            print("highlighting")
             curr_position = event.scenePos()
-            self.path_highlighter.lineTo(curr_position)
-            self.pathItem_highlighter.setPath(self.path_highlighter)
+            self.extend_stroke(self.pathItem_highlighter, curr_position)
             self.previous_position_highlighter = curr_position
+        elif self.erasing:
+            # Erase along the segment since the last event so fast drags don't skip strokes
+            curr_position = event.scenePos()
+            if self.active_tool == "pixel_eraser":
+                self.merge_cut(self.erased_items, self.eraser_pieces,
+                               *self.cut_segment(self.eraser_points[-1], curr_position))
+            else:
+                self.erased_items.extend(self.erase_segment(self.eraser_points[-1], curr_position))
+            self.eraser_points.append(curr_position)
+
+        if self.sync:
+            self.sync.presence.move_cursor(event.scenePos())
 
         super().mouseMoveEvent(event)
 
     def mouseReleaseEvent(self, event):
         if event.button() == Qt.LeftButton or event.button() == Qt.RightButton:
-            if self.drawing and self.pathItem and self.sync:
-                self.sync.sync_drawing(self.pathItem)
-            elif self.highlighting and self.pathItem_highlighter and self.sync:
-                self.sync.sync_drawing(self.pathItem_highlighter, True)
+            # Replace the live stroke with the committed path item before syncing it
+            if self.drawing and self.pathItem:
+                self.pathItem = self.finish_stroke(self.pathItem)
+                if self.sync:
+                    self.sync.sync_drawing(self.pathItem)
+            elif self.highlighting and self.pathItem_highlighter:
+                self.pathItem_highlighter = self.finish_stroke(self.pathItem_highlighter)
+                if self.sync:
+                    self.sync.sync_drawing(self.pathItem_highlighter, True)
+            elif self.erasing:
+                self.finish_erasing()
             if self.dragging_text_box:
                 print("Finished dragging box")
                 self.dragging_text_box = False
@@ -286,7 +699,7 @@ class BoardScene(QGraphicsScene):
                 # Add the completed path to the undo stack when drawing is finished so it can be deleted or added back with undo
                 self.add_item_to_undo(self.pathItem)
                 print("Path item added to undo stack:", self.pathItem)
-            elif self.active_tool == "highlighter":
+            elif self.highlighting:
                 self.add_item_to_undo(self.pathItem_highlighter)
                 print("Path item added to undo stack:", self.pathItem_highlighter)
             self.drawing = False
@@ -295,6 +708,43 @@ class BoardScene(QGraphicsScene):
             self.is_text_box_selected = False
 
         super().mouseReleaseEvent(event)
+
+        # Items can only be dragged while selected, so the selection covers every move
+        if self.journal is not None:
+            for item in self.selectedItems():
+                self.journal.record_move(item)
+        for item, old_rect in self.moving_items.items():
+            if item.scene() is self:
+                self.item_moved(item, old_rect)
+        self.moving_items = {}
+
+    #Ends a drag of the eraser with one undo entry and one synced action carrying the eraser path,
+    #a drag that didn't touch anything leaves neither
+    def finish_erasing(self):
+        if self.erased_items or self.eraser_pieces:
+            self.add_erase_to_undo(self.erased_items, self.eraser_pieces)
+            if self.sync:
+                if self.active_tool == "pixel_eraser":
+                    # Older clients cut along the path themselves, so it is sent as recorded
+                    self.sync.sync_eraser(self.eraser_points, pixel=True, items=self.erased_items,
+                                          pieces=self.eraser_pieces)
+                else:
+                    points = simplify_rdp([(point.x(), point.y()) for point in self.eraser_points], 1.0)
+                    self.sync.sync_eraser([QPointF(x, y) for x, y in points], items=self.erased_items)
+
+        self.erasing = False
+        self.eraser_points = []
+        self.erased_items = []
+        self.eraser_pieces = []
+
     #Marks which tool (pen, eraser, highlighter) is being used so multiple don't run at once
     def set_active_tool(self, tool):
         self.active_tool = tool
+        if self.sync:
+            self.sync.presence.update(tool=tool)
+
+    #Other users' cursors are drawn over the board, see presence.py
+    def drawForeground(self, painter, rect):
+        super().drawForeground(painter, rect)
+        if self.sync:
+            self.sync.presence.paint(painter, rect)
@@ -1,8 +1,19 @@
+import base64
 import json
-from WhiteboardApplication.text_box import TextBox
+import threading
+from collections import deque
+from WhiteboardApplication.text_box import TextBox, select_range, char_format_of
+from WhiteboardApplication.board_crdt import BoardState, changed_range
+from WhiteboardApplication.point_codec import pack_points, read_points
+from WhiteboardApplication.notebook_format import notebook_items, snapshot_item, pack_records, read_index, decode_entry
+from WhiteboardApplication.sync_queue import SyncQueue
+from WhiteboardApplication.sync_transport import FirebaseTransport
+from WhiteboardApplication.stroke_item import StrokeItem
+from WhiteboardApplication.live_stroke import LiveStrokeItem
+from WhiteboardApplication.presence import PresenceChannel
+from WhiteboardApplication.undo_history import ItemStash, pack_items, read_packed, decode_packed
 from dataclasses import dataclass, field
 from typing import Dict, Any, Optional
-from firebase_admin import db
 from PySide6.QtCore import QPointF, Qt, Signal, QObject, QTimer
 import time
 from PySide6.QtGui import QPainterPath, QPen, QColor
@@ -13,272 +24,648 @@ from PySide6.QtWidgets import QGraphicsPathItem
 class DrawingAction:
     action_type: str
     user_id: str  # Add user_id to track who performed the action
-    points: list = None
+    points: list = None  # Older clients send {'x', 'y'} dicts here, point_data replaces it
+    point_data: str = None  # Points packed with point_codec.pack_points
     color: str = None
     size: int = None
     text_content: str = None
     text_position: dict = None
-    text_id: str = None  # Unique identifier for textboxes
+    text_id: str = None  # Scene id of the text box, see BoardScene.item_id
+    item_id: str = None  # Scene id of the stroke drawn
+    item_ids: list = None  # Scene ids of the strokes an eraser removed, or of the items an undo or redo took off
+    restored_ids: list = None  # Scene ids of the items an undo or redo put back, or of the pieces a pixel eraser left
+    item_data: str = None  # Items of restored_ids packed with undo_history.pack_items, for boards that don't have them
+    smooth: bool = False  # Whether the stroke points are drawn as a smoothed curve
+    highlighter: bool = False  # Whether a streamed stroke chunk belongs to a highlighter stroke
+    ops: list = None  # board_crdt operations of the action, older clients don't send them
     timestamp: float = field(default_factory=time.time)
 
 
 class WhiteboardSync(QObject):
-    action_received = Signal(dict)
-
-    def __init__(self, board_scene, meeting_id, user_id):
+    action_received = Signal(dict)    # Emitted on the GUI thread for each remote action as it is replayed
+    replay_wakeup = Signal()
+
+    SNAPSHOT_INTERVAL = 30000      # ms between snapshot checks on the host
+    SNAPSHOT_MIN_ACTIONS = 50      # New actions needed before another snapshot is worth publishing
+    COMPACT_MIN_ACTIONS = 2000     # New actions needed before the host asks for the log to be compacted
+    STREAM_INTERVAL = 30           # ms between chunks of a stroke that is still being drawn
+    STREAM_POINTS = 32             # New points that send a chunk straight away
+    REPLAY_BUDGET = 8              # ms of remote actions replayed per pass of the event loop
+    LIVE_STROKE_TIMEOUT = 30.0     # Seconds without a chunk before another user's unfinished stroke is dropped
+
+    #transport defaults to Firebase, see sync_transport.py and Collab_Functionality/client.py for the relay
+    def __init__(self, board_scene, meeting_id, user_id, transport=None):
         super().__init__()
         self.scene = board_scene
         self.meeting_id = meeting_id
         self.user_id = user_id  # Store the current user's ID
-        self.actions_ref = db.reference(f"meetings/{meeting_id}/actions")
+        self.transport = transport if transport is not None else FirebaseTransport(meeting_id)
         self.local_action = False
-        self.text_boxes = {}  # Store text box references by ID
 
-        # Per-user undo/redo stacks
-        self.user_undo_stacks = {}
-        self.user_redo_stacks = {}
+        # Replica of the board that decides concurrent edits the same way on every client, see board_crdt.py
+        self.board = BoardState(user_id)
+
+        # Streaming sends the stroke being drawn in chunks, others see it grow instead of appearing on release
+        self.streaming = False
+        self.stream_item = None
+        self.stream_sent = 0
+        self.stream_time = 0.0
+        # Sends points left waiting when the pen pauses
+        self.stream_timer = QTimer(self)
+        self.stream_timer.setSingleShot(True)
+        self.stream_timer.timeout.connect(self.send_stroke_chunk)
+        # Other users' strokes still being drawn, item id -> (user id, when its last chunk came). One whose finished
+        # stroke never arrives is dropped once it goes quiet or its user leaves.
+        self.live_strokes = {}
+        self.live_timer = QTimer(self)
+        self.live_timer.setInterval(1000)
+        self.live_timer.timeout.connect(self.drop_stale_live_strokes)
+
+        # Sends go through a worker thread, several actions share one request
+        self.outbound = SyncQueue(self.send_actions)
+
+        # Position in the meeting's log, and our sent actions that haven't come back from it yet
+        self.last_seq = None
+        self.unechoed = set()
+        self.unechoed_lock = threading.Lock()
+
+        # The host publishes board snapshots so people joining late don't replay the whole log
+        self.snapshot_timer = QTimer(self)
+        self.snapshot_timer.setInterval(self.SNAPSHOT_INTERVAL)
+        self.snapshot_timer.timeout.connect(self.publish_snapshot)
+        self.snapshot_timer.timeout.connect(self.compact_log)
+        self.actions_since_snapshot = 0
+        self.publishing_snapshot = False
+        self.actions_since_compaction = 0
+        self.compacting = False
+
+        # Items other users' actions took off this board, by id, for when one of them undoes or redoes the action.
+        # Only so many are kept and the oldest go to disk, see ItemStash
+        self.removed_items = ItemStash(board_scene)
+
+        # Snapshot and actions from the transport's thread as (handler, data), replayed on the GUI thread in
+        # batches so a burst of them doesn't freeze the board
+        self.incoming = deque()
+        self.incoming_lock = threading.Lock()
+        self.replay_scheduled = False
+        self.replay_wakeup.connect(self.replay_incoming)
+
+        # Other users' cursors, on their own channel so they never go through the action log or the replay above
+        self.presence = PresenceChannel(board_scene, user_id, self.transport)
+        self.presence.update(tool=board_scene.active_tool, color=board_scene.color.name())
+        self.presence.user_left.connect(self.drop_live_strokes)
 
-        self.action_received.connect(self.handle_remote_action)
         QTimer.singleShot(0, self.setup_listeners)
 
     def setup_listeners(self):
-        """Set up Firebase listeners for all action types"""
+        """Listen for the board snapshot and actions from other users on the transport"""
+        try:
+            self.transport.listen(self.receive_action, self.receive_snapshot)
+            self.presence.start()
+        except Exception as e:
+            print(f"Error setting up listener: {e}")
+
+    def receive_action(self, action_data):
+        """Queue a remote action for replay, called on the transport's thread"""
+        self.queue_incoming(self.handle_remote_action, action_data)
+
+    def receive_snapshot(self, snapshot):
+        """Queue the meeting's snapshot, it is applied before any action the transport delivers after it"""
+        self.queue_incoming(self.apply_snapshot, snapshot)
+
+    def queue_incoming(self, handler, data):
+        with self.incoming_lock:
+            self.incoming.append((handler, data))
+            if self.replay_scheduled:
+                return
+            self.replay_scheduled = True
+        # Only the first of a burst wakes the GUI thread, the rest are picked up by the same pass
+        self.replay_wakeup.emit()
+
+    def replay_incoming(self):
+        """Replay queued remote actions for up to REPLAY_BUDGET ms, then let the GUI paint and handle input"""
+        # The scene collects the changes of the whole batch and the views repaint them once, after this returns
+        deadline = time.perf_counter() + self.REPLAY_BUDGET / 1000
+        with self.scene.batch_changes():
+            while self.incoming and time.perf_counter() < deadline:
+                handler, data = self.incoming.popleft()
+                handler(data)
+
+        with self.incoming_lock:
+            if not self.incoming:
+                self.replay_scheduled = False
+                return
+        QTimer.singleShot(0, self.replay_incoming)
+
+    def send_actions(self, actions):
+        """Hand a batch to the transport, runs on the outbound queue's thread"""
+        stamps = {action['timestamp'] for action in actions}
+        with self.unechoed_lock:
+            self.unechoed |= stamps
+        try:
+            self.transport.send(actions)
+        except Exception:
+            with self.unechoed_lock:
+                self.unechoed -= stamps
+            raise
+
+    def start_snapshots(self):
+        """Publish board snapshots and compact the log for this meeting periodically, done by the host"""
+        self.snapshot_timer.start()
+
+    def publish_snapshot(self):
+        """Publish the board as of the last action seen in the log"""
+        if self.publishing_snapshot or self.last_seq is None or self.actions_since_snapshot < self.SNAPSHOT_MIN_ACTIONS:
+            return
+        # Everything on the board has to be in the log up to last_seq, or joiners would get it twice
+        with self.unechoed_lock:
+            if self.unechoed or len(self.outbound) or self.outbound.sending:
+                return
+
+        snapshots = []
+        item_ids = []
+        for item in notebook_items(self.scene):
+            snapshot = snapshot_item(item)
+            if snapshot is None:
+                continue
+            snapshots.append(snapshot)
+            item_ids.append(self.scene.item_id(item))
+
+        seq = self.last_seq
+        board = self.board.dump()
+        self.actions_since_snapshot = 0
+        self.publishing_snapshot = True
+
+        def publish():
+            try:
+                data = base64.b64encode(pack_records(snapshots)).decode('ascii')
+                self.transport.publish_snapshot({'seq': seq, 'data': data, 'item_ids': item_ids, 'board': board})
+            except Exception as e:
+                print(f"Error publishing snapshot: {e}")
+            finally:
+                self.publishing_snapshot = False
+
+        threading.Thread(target=publish, daemon=True).start()
+
+    def compact_log(self):
+        """Fold the meeting's log into its net effect once enough has been added to it"""
+        if self.compacting or self.actions_since_compaction < self.COMPACT_MIN_ACTIONS:
+            return
+        self.actions_since_compaction = 0
+        self.compacting = True
 
-        def action_handler(event):
-            if event.event_type == "put" and event.data and not self.local_action:
-                # Emit signal instead of directly handling the action
-                self.action_received.emit(event.data)
+        def compact():
+            try:
+                self.transport.compact()
+            except Exception as e:
+                print(f"Error compacting the action log: {e}")
+            finally:
+                self.compacting = False
 
+        threading.Thread(target=compact, daemon=True).start()
+
+    def apply_snapshot(self, snapshot: Dict[str, Any]):
+        """Add a meeting's board snapshot to the scene in one go, the transport sends later actions after it"""
         try:
-            self.actions_ref.listen(action_handler)
+            data = memoryview(base64.b64decode(snapshot['data']))
+            item_ids = snapshot.get('item_ids') or []
+            for index, entry in enumerate(read_index(data)):
+                item = decode_entry(data, entry)
+                if item is not None:
+                    self.scene.addItem(item, item_ids[index] if index < len(item_ids) else None)
+            if snapshot.get('board'):
+                self.board.load(snapshot['board'])
+            self.last_seq = snapshot['seq']
         except Exception as e:
-            print(f"Error setting up listener: {e}")
+            print(f"Error applying snapshot: {e}")
+
+    def queue_action(self, action: DrawingAction, coalesce_key=None, urgent=False):
+        """Queue an action to be sent, an unsent action with the same coalesce key is replaced"""
+        # Fields left unset fall back to their defaults on the receiving side, so they don't need to go out
+        fields = {name: value for name, value in vars(action).items() if value is not None}
+        self.outbound.put(fields, coalesce_key, urgent)
+
+    def set_streaming(self, enable):
+        """Turn streaming of strokes that are still being drawn on or off"""
+        self.streaming = enable
+        self.stream_item = None
+        self.stream_timer.stop()
+
+    def close(self, timeout=2.0):
+        """Send whatever is still queued, then stop the outbound thread and the transport"""
+        self.snapshot_timer.stop()
+        self.stream_timer.stop()
+        self.live_timer.stop()
+        self.presence.close(timeout)
+        self.outbound.flush(timeout)
+        self.outbound.close(timeout)
+        self.transport.close()
+        self.removed_items.clear()
+        # The scene and this refer to each other, left alone the garbage collector can free both on any thread
+        if getattr(self.scene, 'sync', None) is self:
+            self.scene.sync = None
 
     def replay_drawing(self, action: DrawingAction):
         """Recreate a drawing action on the local board"""
         try:
-            if not action.points:
+            points = read_points(action.point_data, action.points)
+            if not points:
+                return
+            # Someone erased it before they saw it, and nobody has brought it back since
+            if action.ops and not self.board.contains(action.item_id):
                 return
 
-            path = QPainterPath()
-            first_point = True
-
-            for point in action.points:
-                pos = QPointF(point['x'], point['y'])
-                if first_point:
-                    path.moveTo(pos)
-                    first_point = False
-                else:
-                    path.lineTo(pos)
-
-            path_item = QGraphicsPathItem()
             pen = QPen(QColor(action.color), action.size)
             pen.setCapStyle(Qt.PenCapStyle.RoundCap)
-            path_item.setPen(pen)
-            path_item.setPath(path)
+            path_item = StrokeItem(
+                points,
+                pen,
+                action.action_type == 'highlighter',
+                action.smooth
+            )
 
-            self.scene.addItem(path_item)
-            self.scene.add_item_to_undo(path_item)
+            # The finished stroke takes the place of the one streamed while it was drawn
+            provisional = self.scene.item_by_id(action.item_id)
+            if isinstance(provisional, LiveStrokeItem):
+                path_item.setZValue(provisional.zValue())
+                self.scene.removeItem(provisional)
+            self.live_strokes.pop(action.item_id, None)
+
+            self.scene.addItem(path_item, action.item_id)
         except Exception as e:
             print(f"Error replaying drawing: {e}")
 
+    def replay_stroke_chunk(self, action: DrawingAction):
+        """Extend the provisional stroke of another user who is still drawing"""
+        try:
+            points = read_points(action.point_data, action.points)
+            if not points:
+                return
+
+            live_item = self.scene.item_by_id(action.item_id)
+            if live_item is None:
+                pen = QPen(QColor(action.color), action.size)
+                pen.setCapStyle(Qt.PenCapStyle.RoundCap)
+                live_item = LiveStrokeItem(QPointF(*points[0]), pen, action.highlighter)
+                self.scene.addItem(live_item, action.item_id)
+                points = points[1:]
+            elif not isinstance(live_item, LiveStrokeItem):
+                # The finished stroke is already here
+                return
+
+            for x, y in points:
+                live_item.add_point(QPointF(x, y))
+            self.live_strokes[action.item_id] = (action.user_id, time.monotonic())
+            if not self.live_timer.isActive():
+                self.live_timer.start()
+        except Exception as e:
+            print(f"Error replaying stroke chunk: {e}")
+
+    def drop_live_stroke(self, item_id):
+        """Take another user's unfinished stroke off the board, unless its finished stroke has replaced it"""
+        self.live_strokes.pop(item_id, None)
+        live_item = self.scene.item_by_id(item_id)
+        if isinstance(live_item, LiveStrokeItem):
+            self.scene.removeItem(live_item)
+        if not self.live_strokes:
+            self.live_timer.stop()
+
+    def drop_live_strokes(self, user):
+        """Drop the unfinished strokes of a user who has left"""
+        for item_id in [item_id for item_id, (owner, _heard) in self.live_strokes.items() if owner == user]:
+            self.drop_live_stroke(item_id)
+
+    def drop_stale_live_strokes(self):
+        now = time.monotonic()
+        for item_id in [item_id for item_id, (_owner, heard) in self.live_strokes.items()
+                        if now - heard > self.LIVE_STROKE_TIMEOUT]:
+            self.drop_live_stroke(item_id)
+
     def replay_erasing(self, action: DrawingAction):
         """Recreate an erasing action on the local board"""
         try:
-            if not action.points:
+            # Removes exactly what the eraser took off the sender's board, older clients only send the path
+            if action.item_ids is not None:
+                for item_id in action.item_ids:
+                    # An add the eraser's sender hadn't seen yet wins over the erase
+                    if not (action.ops and self.board.contains(item_id)):
+                        self.retire(item_id)
+                return
+
+            points = read_points(action.point_data, action.points)
+            if not points:
                 return
 
-            for point in action.points:
-                self.scene.erase(QPointF(point['x'], point['y']))
+            for item in self.scene.erase_path([QPointF(x, y) for x, y in points]):
+                self.removed_items[self.scene.item_id(item)] = item
         except Exception as e:
             print(f"Error replaying erasing: {e}")
 
+    def replay_pixel_erasing(self, action: DrawingAction):
+        """Recreate a pixel eraser action, swapping the strokes it cut for the pieces it left"""
+        try:
+            # Cutting again here could come out differently from the sender's cut, so the action names the strokes
+            # removed and carries the pieces. Older clients only send the path
+            if action.item_ids is not None:
+                self.swap_items(action)
+                return
+
+            points = read_points(action.point_data, action.points)
+            if not points:
+                return
+
+            removed, _pieces = self.scene.cut_path([QPointF(x, y) for x, y in points])
+            for item in removed:
+                self.removed_items[self.scene.item_id(item)] = item
+        except Exception as e:
+            print(f"Error replaying pixel erasing: {e}")
+
     def handle_remote_action(self, action_data: Dict[str, Any]):
         """Process incoming actions from other users"""
         try:
+            action_data = dict(action_data)
+            seq = action_data.pop('seq', None)
+            if seq is not None:
+                self.last_seq = seq
+                self.actions_since_snapshot += 1
+                self.actions_since_compaction += 1
+
             if action_data['user_id'] == self.user_id:
-                return  # Ignore our own actions coming back from Firebase
+                # Our own action made it into the log
+                with self.unechoed_lock:
+                    self.unechoed.discard(action_data.get('timestamp'))
+                return
 
             action = DrawingAction(**action_data)
+            self.action_received.emit(action_data if seq is None else dict(action_data, seq=seq))
+            for op in action.ops or ():
+                self.board.apply(op)
 
             if action.action_type in ['pen', 'highlighter']:
                 self.replay_drawing(action)
+            elif action.action_type == 'stroke_chunk':
+                # Provisional, the finished stroke follows and is what undo works on
+                self.replay_stroke_chunk(action)
+                return
             elif action.action_type == 'eraser':
                 self.replay_erasing(action)
+            elif action.action_type == 'pixel_eraser':
+                self.replay_pixel_erasing(action)
             elif action.action_type == 'textbox_create':
                 self.replay_textbox_create(action)
             elif action.action_type == 'textbox_move':
                 self.replay_textbox_move(action)
             elif action.action_type == 'textbox_content':
                 self.replay_textbox_content(action)
+            elif action.action_type == 'textbox_edit':
+                self.replay_textbox_edit(action)
             elif action.action_type == 'undo':
                 self.replay_undo(action)
             elif action.action_type == 'redo':
                 self.replay_redo(action)
-
-            # Store action in appropriate user's undo stack
-            if action.action_type not in ['undo', 'redo']:
-                if action.user_id not in self.user_undo_stacks:
-                    self.user_undo_stacks[action.user_id] = []
-                self.user_undo_stacks[action.user_id].append(action)
         except Exception as e:
             print(f"Error handling remote action: {e}")
 
     def replay_undo(self, action: DrawingAction):
-        """Replay an undo action for all users."""
+        """Reverse another user's step, the action names the items to take off and the ones to put back"""
         try:
-            if action.action_type in ['pen', 'highlighter']:
-                self.remove_drawing(action)
-            elif action.action_type == 'textbox_create':
-                self.remove_textbox(action)
+            if action.item_ids is None:
+                # Older clients send the fields of the stroke or text box they undid
+                self.retire(action.item_id or action.text_id)
+                return
+            self.swap_items(action)
         except Exception as e:
             print(f"Error replaying undo: {e}")
 
     def replay_redo(self, action: DrawingAction):
-        """Replay a redo action for all users."""
+        """Redo another user's step"""
         try:
-            if action.action_type in ['pen', 'highlighter']:
-                self.replay_drawing(action)
-            elif action.action_type == 'textbox_create':
-                self.replay_textbox_create(action)
+            if action.item_ids is None:
+                if action.text_id is not None:
+                    self.replay_textbox_create(action)
+                elif action.item_id is not None:
+                    self.replay_drawing(action)
+                return
+            self.swap_items(action)
         except Exception as e:
             print(f"Error replaying redo: {e}")
 
-    def remove_drawing(self, action: DrawingAction):
-        """Custom method to remove drawing items."""
-        try:
-            # Find and remove the drawn path from the scene
-            for item in self.scene.items():
-                if isinstance(item, QGraphicsPathItem):
-                    if item.pen().color().name() == action.color and \
-                            item.pen().width() == action.size:
-                        self.scene.removeItem(item)
-                        break
-        except Exception as e:
-            print(f"Error removing drawing: {e}")
-
-    def remove_textbox(self, action: DrawingAction):
-        """Remove a textbox based on the action."""
-        text_box = self.text_boxes.pop(action.text_id, None)
-        if text_box:
-            self.scene.removeItem(text_box)
-
-    def reverse_textbox_action(self, action: DrawingAction):
-        """Reverse a textbox action (move or content change)."""
-        text_box = self.text_boxes.get(action.text_id)
-        if not text_box:
-            return
-        if action.action_type == 'textbox_move':
-            # Reverse the move action (restore previous position)
-            text_box.setPos(QPointF(action.text_position['x'], action.text_position['y']))
-        elif action.action_type == 'textbox_content':
-            # Reverse the content change
-            text_box.setPlainText(action.text_content)
-
-    def sync_undo(self):
-        """Sync an undo action for the current user"""
-        if self.local_action:
-            return
-
-        try:
-            self.local_action = True
-            if self.user_id in self.user_undo_stacks and self.user_undo_stacks[self.user_id]:
-                last_action = self.user_undo_stacks[self.user_id].pop()
-                if self.user_id not in self.user_redo_stacks:
-                    self.user_redo_stacks[self.user_id] = []
-                self.user_redo_stacks[self.user_id].append(last_action)
-
-                action = DrawingAction(
-                    action_type='undo',
-                    user_id=self.user_id,
-                    points=last_action.points,
-                    color=last_action.color,
-                    size=last_action.size,
-                    text_content=last_action.text_content,
-                    text_position=last_action.text_position,
-                    text_id=last_action.text_id
-                )
-                self.actions_ref.push(vars(action))
-        finally:
-            self.local_action = False
-
-    def sync_redo(self):
-        """Sync a redo action for the current user"""
-        if self.local_action:
-            return
-
-        try:
-            self.local_action = True
-            if self.user_id in self.user_redo_stacks and self.user_redo_stacks[self.user_id]:
-                last_action = self.user_redo_stacks[self.user_id].pop()
-                self.user_undo_stacks[self.user_id].append(last_action)
-
-                action = DrawingAction(
-                    action_type='redo',
-                    user_id=self.user_id,
-                    points=last_action.points,
-                    color=last_action.color,
-                    size=last_action.size,
-                    text_content=last_action.text_content,
-                    text_position=last_action.text_position,
-                    text_id=last_action.text_id
-                )
-                self.actions_ref.push(vars(action))
-        finally:
-            self.local_action = False
+    def swap_items(self, action: DrawingAction):
+        """Take the items of an undo, redo or pixel eraser off the board and put its restored ones back, by id.
+        Restored items are rebuilt from the action's item_data when it has them, the stash is for the rest"""
+        for item_id in action.item_ids:
+            # Someone put it back without having seen this yet, the add wins
+            if not (action.ops and self.board.contains(item_id)):
+                self.retire(item_id)
+        records = read_packed(base64.b64decode(action.item_data))[0] if action.item_data else {}
+        for item_id in action.restored_ids or ():
+            if action.ops and not self.board.contains(item_id):
+                continue
+            # The records are what the sender has, a stashed item of the same id may be from another version
+            item = self.removed_items.pop(item_id, None)
+            if item_id in records:
+                item = decode_packed(self.scene, item_id, records[item_id])
+            if item is not None and self.scene.item_by_id(item_id) is None:
+                self.scene.addItem(item)
+
+    def retire(self, item_id):
+        """Take an item off the board, it's kept in case an undo or redo by its owner puts it back"""
+        item = self.scene.item_by_id(item_id)
+        if item is not None:
+            self.scene.removeItem(item)
+            self.removed_items[item_id] = item
+
+    def sync_undo(self, command):
+        """Send the undo of one of this user's steps (an UndoCommand) to the other users"""
+        self.sync_history('undo', command.inverse())
+
+    def sync_redo(self, command):
+        """Send the redo of one of this user's steps to the other users"""
+        self.sync_history('redo', command)
+
+    def sync_history(self, action_type, command):
+        item_ids = list(command.removed)
+        restored_ids = list(command.added)
+        action = DrawingAction(
+            action_type=action_type,
+            user_id=self.user_id,
+            item_ids=item_ids,
+            restored_ids=restored_ids,
+            ops=[self.board.remove_item(item_id) for item_id in item_ids] +
+                [self.board.add_item(item_id) for item_id in restored_ids]
+        )
+        if restored_ids:
+            # Someone who joined from a snapshot after the items went off the board has never seen them
+            data = pack_items(command.added, whole=True)
+            if data is not None:
+                action.item_data = base64.b64encode(data).decode('ascii')
+        self.queue_action(action)
 
     def replay_textbox_create(self, action: DrawingAction):
         """Handle creation of a new textbox"""
         text_box = TextBox()
-        text_box.setPlainText(action.text_content or '')
-        text_box.setPos(QPointF(action.text_position['x'], action.text_position['y']))
-        self.text_boxes[action.text_id] = text_box
-        self.scene.addItem(text_box)
+        if action.ops:
+            # Edits that reached the board replica first are already part of its text and position
+            if not self.board.contains(action.text_id):
+                return
+            text_box.setPlainText(self.board.text(action.text_id))
+            self.format_text_box(text_box, action.text_id, 0, text_box.text_length)
+            text_box.setPos(QPointF(*self.board.position(action.text_id)))
+        else:
+            text_box.setPlainText(action.text_content or '')
+            text_box.setPos(QPointF(action.text_position['x'], action.text_position['y']))
+        self.scene.addItem(text_box, action.text_id)
+        # Anyone can keep editing the box
+        self.connect_text_box(text_box)
 
     def replay_textbox_move(self, action: DrawingAction):
         """Handle movement of an existing textbox"""
-        text_box = self.text_boxes.get(action.text_id)
+        text_box = self.scene.item_by_id(action.text_id)
         if text_box:
-            text_box.setPos(QPointF(action.text_position['x'], action.text_position['y']))
+            old_rect = text_box.sceneBoundingRect()
+            if action.ops:
+                # The newest move wins whichever order the moves arrived in
+                text_box.setPos(QPointF(*self.board.position(action.text_id)))
+            else:
+                text_box.setPos(QPointF(action.text_position['x'], action.text_position['y']))
+            self.scene.item_moved(text_box, old_rect)
+            if self.scene.journal is not None:
+                self.scene.journal.record_move(text_box)
 
     def replay_textbox_content(self, action: DrawingAction):
         """Handle content changes in an existing textbox"""
-        text_box = self.text_boxes.get(action.text_id)
+        text_box = self.scene.item_by_id(action.text_id)
+        if text_box:
+            # Concurrent typing is merged character by character instead of the last text sent winning
+            if action.ops:
+                self.update_text_box(text_box, action)
+            elif text_box.toPlainText() != action.text_content:
+                text_box.setPlainText(action.text_content)
+
+    def replay_textbox_edit(self, action: DrawingAction):
+        """Apply another user's edit of part of a textbox's text or format"""
+        text_box = self.scene.item_by_id(action.text_id)
         if text_box:
-            text_box.setPlainText(action.text_content)
+            self.update_text_box(text_box, action)
+
+    def update_text_box(self, text_box, action: DrawingAction):
+        """Bring a text box in line with the board replica, only the range that differs is touched so the rest of
+        the text, its formats and the local user's cursor stay as they are"""
+        self.local_action = True
+        try:
+            text = self.board.text(action.text_id)
+            start, old_end, new_end = changed_range(text_box.toPlainText(), text)
+            if old_end > start or new_end > start:
+                select_range(text_box.document(), start, old_end - start).insertText(text[start:new_end])
+                self.format_text_box(text_box, action.text_id, start, new_end - start)
+
+            sequence = self.board.text_sequence(action.text_id)
+            for op in action.ops:
+                if op['op'] == 'format':
+                    span = sequence.visible_span(tuple(stamp) for stamp in op['chars'])
+                    if span is not None:
+                        self.format_text_box(text_box, action.text_id, span[0], span[1] - span[0])
+        finally:
+            self.local_action = False
+
+    def format_text_box(self, text_box, text_id, index, count):
+        """Give count characters of a text box from index the formats they have in the board replica"""
+        for length, value in self.board.text_sequence(text_id).format_runs(index, count):
+            select_range(text_box.document(), index, length).setCharFormat(char_format_of(value))
+            index += length
 
     def sync_drawing(self, path_item, is_highlighter=False):
-        """Sync a drawing action to Firebase"""
+        """Sync a drawing action to the other users"""
         self.local_action = True
         try:
-            path = path_item.path()
-            points = []
-            for i in range(path.elementCount()):
-                element = path.elementAt(i)
-                points.append({'x': element.x, 'y': element.y})
+            # Strokes carry their filtered points, so curve control points never go over the wire
+            if isinstance(path_item, StrokeItem):
+                points = path_item.points
+                smooth = path_item.smooth
+            else:
+                path = path_item.path()
+                points = []
+                for i in range(path.elementCount()):
+                    element = path.elementAt(i)
+                    points.append((element.x, element.y))
+                smooth = False
 
             action = DrawingAction(
                 action_type='highlighter' if is_highlighter else 'pen',
                 user_id=self.user_id,  # Add the user_id from the class instance
-                points=points,
+                point_data=pack_points(points),
                 color=path_item.pen().color().name(),
-                size=path_item.pen().width()
+                size=path_item.pen().width(),
+                smooth=smooth,
+                item_id=self.scene.item_id(path_item)
             )
+            action.ops = [self.board.add_item(action.item_id)]
 
-            self.actions_ref.push(vars(action))
+            # A streamed stroke was already showing on the other boards, the final one shouldn't lag behind it
+            streamed = self.stream_item is not None and action.item_id == self.scene.item_id(self.stream_item)
+            self.stream_item = None
+            self.stream_timer.stop()
+            self.queue_action(action, urgent=streamed)
         finally:
             self.local_action = False
 
-    def sync_eraser(self, point: QPointF):
-        """Sync an eraser action to Firebase"""
+    def sync_stroke_points(self, live_item):
+        """Stream the new points of a stroke being drawn once enough of them are waiting or enough time has passed"""
+        if not self.streaming:
+            return
+        if live_item is not self.stream_item:
+            self.stream_item = live_item
+            self.stream_sent = 0
+            self.stream_time = 0.0
+
+        waiting = len(live_item.points) - self.stream_sent
+        since_last = (time.monotonic() - self.stream_time) * 1000
+        if waiting >= self.STREAM_POINTS or since_last >= self.STREAM_INTERVAL:
+            self.send_stroke_chunk()
+        elif not self.stream_timer.isActive():
+            self.stream_timer.start(int(self.STREAM_INTERVAL - since_last) + 1)
+
+    def send_stroke_chunk(self):
+        """Send the points of the streamed stroke added since the last chunk"""
+        live_item = self.stream_item
+        if live_item is None or len(live_item.points) <= self.stream_sent:
+            return
+        self.stream_timer.stop()
+
+        # Receivers append the points to what they already have of the stroke
+        action = DrawingAction(
+            action_type='stroke_chunk',
+            user_id=self.user_id,
+            point_data=pack_points(live_item.points[self.stream_sent:]),
+            color=live_item.pen.color().name(),
+            size=live_item.pen.width(),
+            highlighter=live_item.highlighter,
+            item_id=self.scene.item_id(live_item)
+        )
+        self.stream_sent = len(live_item.points)
+        self.stream_time = time.monotonic()
+        self.queue_action(action, urgent=True)
+
+    def sync_eraser(self, points: list, pixel=False, items=(), pieces=()):
+        """Sync a whole eraser drag as one action with the eraser's polyline, the strokes it removed and, for the
+        pixel eraser, the pieces it left in their place"""
         self.local_action = True
         try:
+            item_ids = [self.scene.item_id(item) for item in items]
             action = DrawingAction(
-                action_type='eraser',
+                action_type='pixel_eraser' if pixel else 'eraser',
                 user_id=self.user_id,  # Add the user_id here as well
-                points=[{'x': point.x(), 'y': point.y()}]
+                point_data=pack_points([(point.x(), point.y()) for point in points]),
+                item_ids=item_ids,
+                ops=[self.board.remove_item(item_id) for item_id in item_ids]
             )
-            self.actions_ref.push(vars(action))
+            if pixel:
+                # Other boards put these exact pieces in, older clients cut along the path instead
+                pieces = {self.scene.item_id(piece): piece for piece in pieces}
+                action.restored_ids = list(pieces)
+                action.item_data = base64.b64encode(pack_items(pieces, whole=True)).decode('ascii')
+                action.ops += [self.board.add_item(item_id) for item_id in pieces]
+            self.queue_action(action)
         finally:
             self.local_action = False
 
@@ -289,7 +676,7 @@ class WhiteboardSync(QObject):
 
         try:
             self.local_action = True
-            text_id = str(time.time())  # Generate unique ID
+            text_id = self.scene.item_id(text_box)
             action = DrawingAction(
                 action_type='textbox_create',
                 user_id=self.user_id,
@@ -297,8 +684,10 @@ class WhiteboardSync(QObject):
                 text_position={'x': text_box.pos().x(), 'y': text_box.pos().y()},
                 text_id=text_id
             )
-            self.text_boxes[text_id] = text_box
-            self.actions_ref.push(vars(action))
+            position = [text_box.pos().x(), text_box.pos().y()]
+            action.ops = [self.board.add_item(text_id), self.board.move_item(text_id, position)]
+            action.ops += self.board.edit_text(text_id, action.text_content)
+            self.queue_action(action)
         finally:
             self.local_action = False
 
@@ -309,34 +698,54 @@ class WhiteboardSync(QObject):
 
         try:
             self.local_action = True
-            text_id = next((k for k, v in self.text_boxes.items() if v == text_box), None)
-            if text_id:
-                action = DrawingAction(
-                    action_type='textbox_move',
-                    user_id=self.user_id,
-                    text_position={'x': text_box.pos().x(), 'y': text_box.pos().y()},
-                    text_id=text_id
-                )
-                self.actions_ref.push(vars(action))
+            text_id = self.scene.item_id(text_box)
+            action = DrawingAction(
+                action_type='textbox_move',
+                user_id=self.user_id,
+                text_position={'x': text_box.pos().x(), 'y': text_box.pos().y()},
+                text_id=text_id,
+                ops=[self.board.move_item(text_id, [text_box.pos().x(), text_box.pos().y()])]
+            )
+            # Only the latest position of a text box being dragged needs to go out
+            self.queue_action(action, ('textbox_move', text_id))
         finally:
             self.local_action = False
 
-    def sync_textbox_content(self, text_box):
-        """Sync content changes in a textbox"""
+    def connect_text_box(self, text_box):
+        """Sync the edits and moves made to a text box on this board"""
+        text_box.edited.connect(lambda *edit: self.sync_textbox_edit(text_box, *edit))
+        text_box.moved.connect(lambda: self.sync_textbox_move(text_box))
+
+    def sync_textbox_edit(self, text_box, position, removed, inserted, formats):
+        """Sync one edit of a textbox, only the characters removed and inserted go out"""
         if self.local_action:
             return
 
         try:
             self.local_action = True
-            text_id = next((k for k, v in self.text_boxes.items() if v == text_box), None)
-            if text_id:
-                action = DrawingAction(
-                    action_type='textbox_content',
-                    user_id=self.user_id,
-                    text_content=text_box.toPlainText(),
-                    text_id=text_id
-                )
-                self.actions_ref.push(vars(action))
+            text_id = self.scene.item_id(text_box)
+            if self.board.text_length(text_id) - removed + len(inserted) != text_box.text_length:
+                # The replica doesn't know this box's text yet (it was made before the meeting), so catch it up
+                ops = self.board.edit_text(text_id, text_box.toPlainText())
+            elif removed and self.board.text(text_id)[position:position + removed] == inserted:
+                # Same text, only the format changed
+                ops = [self.board.format_text(text_id, position, formats)]
+            else:
+                ops = []
+                if removed:
+                    ops.append(self.board.delete_text(text_id, position, removed))
+                if inserted:
+                    ops.append(self.board.insert_text(text_id, position, inserted, formats))
+            if not ops:
+                return
+            action = DrawingAction(
+                action_type='textbox_edit',
+                user_id=self.user_id,
+                text_id=text_id,
+                ops=ops
+            )
+            # Every edit's operations are needed to merge the text, so edits are never coalesced
+            self.queue_action(action)
         finally:
             self.local_action = False
 
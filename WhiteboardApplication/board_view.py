@@ -0,0 +1,161 @@
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from PySide6.QtCore import Qt, QTimer, QRect
+from PySide6.QtGui import QPainter, QColor, QFont
+from PySide6.QtWidgets import QGraphicsView
+
+try:
+    from PySide6.QtOpenGLWidgets import QOpenGLWidget
+except ImportError:
+    QOpenGLWidget = None
+
+
+@dataclass
+class RenderProfile:
+    name: str
+    opengl: bool = False
+    antialiasing: bool = True
+    update_mode: QGraphicsView.ViewportUpdateMode = QGraphicsView.ViewportUpdateMode.MinimalViewportUpdate
+    cache_background: bool = False
+    optimization_flags: QGraphicsView.OptimizationFlag = QGraphicsView.OptimizationFlag(0)
+    static_item_cache: bool = False  # DeviceCoordinateCache for committed strokes and images
+    tile_rendering: bool = False     # Committed ink drawn from raster tiles, see BoardScene.set_tile_rendering
+
+
+RENDER_PROFILES = {
+    'Quality': RenderProfile('Quality'),
+    'Balanced': RenderProfile(
+        'Balanced',
+        update_mode=QGraphicsView.ViewportUpdateMode.SmartViewportUpdate,
+        cache_background=True,
+        optimization_flags=QGraphicsView.OptimizationFlag.DontSavePainterState,
+        static_item_cache=True,
+    ),
+    'Fast': RenderProfile(
+        'Fast',
+        opengl=True,
+        antialiasing=False,
+        update_mode=QGraphicsView.ViewportUpdateMode.BoundingRectViewportUpdate,
+        cache_background=True,
+        optimization_flags=QGraphicsView.OptimizationFlag.DontSavePainterState |
+                           QGraphicsView.OptimizationFlag.DontAdjustForAntialiasing,
+        tile_rendering=True,
+    ),
+}
+
+
+class BoardView(QGraphicsView):
+    """The notebook canvas, with a switchable rendering profile and an optional FPS overlay"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self.render_profile = None
+        # The user's own tile cache setting, which a profile may add to but never overrides
+        self.tile_rendering = False
+
+        # Paint timestamps and durations for the FPS overlay
+        self.show_fps = False
+        self.frame_stamps = deque(maxlen=240)
+        self.frame_times = deque(maxlen=60)
+        self.fps_timer = QTimer(self)
+        self.fps_timer.setInterval(500)
+        self.fps_timer.timeout.connect(self.update_fps_overlay)
+
+    def set_render_profile(self, profile):
+        self.render_profile = profile
+
+        if profile.opengl and QOpenGLWidget is not None:
+            if not isinstance(self.viewport(), QOpenGLWidget):
+                self.setViewport(QOpenGLWidget())
+        elif QOpenGLWidget is not None and isinstance(self.viewport(), QOpenGLWidget):
+            self.setViewport(None)
+        elif profile.opengl:
+            print("OpenGL viewport is not available, using the software viewport")
+
+        self.setRenderHint(QPainter.RenderHint.Antialiasing, profile.antialiasing)
+        self.setViewportUpdateMode(profile.update_mode)
+        self.setCacheMode(QGraphicsView.CacheModeFlag.CacheBackground if profile.cache_background
+                          else QGraphicsView.CacheModeFlag.CacheNone)
+        self.setOptimizationFlags(profile.optimization_flags)
+
+        scene = self.scene()
+        if scene is not None:
+            scene.set_static_item_cache(profile.static_item_cache)
+        self.apply_tile_rendering()
+
+        self.resetCachedContent()
+        self.viewport().update()
+
+    def set_tile_rendering(self, enable):
+        self.tile_rendering = enable
+        self.apply_tile_rendering()
+
+    #Tiles are on when the user asked for them or the current profile needs them
+    def apply_tile_rendering(self):
+        scene = self.scene()
+        if scene is None:
+            return
+        profile_tiles = self.render_profile is not None and self.render_profile.tile_rendering
+        enable = self.tile_rendering or profile_tiles
+        if scene.tile_rendering != enable:
+            scene.set_tile_rendering(enable)
+
+    def set_show_fps(self, enable):
+        self.show_fps = enable
+        self.frame_stamps.clear()
+        self.frame_times.clear()
+        if enable:
+            self.fps_timer.start()
+        else:
+            self.fps_timer.stop()
+        self.viewport().update()
+
+    def fps_overlay_rect(self):
+        return QRect(0, 0, 260, 24)
+
+    def update_fps_overlay(self):
+        self.viewport().update(self.fps_overlay_rect())
+
+    def scrollContentsBy(self, dx, dy):
+        super().scrollContentsBy(dx, dy)
+        # The viewport scrolls its pixels, overlay included, so repaint both the copy and the corner
+        if self.show_fps:
+            overlay = self.fps_overlay_rect()
+            self.viewport().update(overlay)
+            self.viewport().update(overlay.translated(dx, dy))
+
+    def paintEvent(self, event):
+        start = time.perf_counter()
+        super().paintEvent(event)
+        if self.show_fps:
+            self.frame_times.append(time.perf_counter() - start)
+            self.frame_stamps.append(start)
+
+    #Frames painted in the last second and the mean paint time in ms
+    def fps_stats(self):
+        now = time.perf_counter()
+        fps = sum(1 for stamp in self.frame_stamps if now - stamp <= 1.0)
+        paint_ms = sum(self.frame_times) / len(self.frame_times) * 1000 if self.frame_times else 0.0
+        return fps, paint_ms
+
+    def drawForeground(self, painter, rect):
+        super().drawForeground(painter, rect)
+        if not self.show_fps:
+            return
+
+        fps, paint_ms = self.fps_stats()
+        name = self.render_profile.name if self.render_profile else "Default"
+        overlay = self.fps_overlay_rect()
+
+        # Drawn in viewport coordinates so it stays in the corner while scrolling
+        painter.save()
+        painter.resetTransform()
+        painter.fillRect(overlay, QColor(0, 0, 0, 160))
+        painter.setPen(Qt.GlobalColor.white)
+        painter.setFont(QFont("Arial", 9))
+        painter.drawText(overlay.adjusted(6, 0, 0, 0), Qt.AlignmentFlag.AlignVCenter,
+                         f"{name}: {fps} fps, {paint_ms:.1f} ms/paint")
+        painter.restore()
@@ -0,0 +1,102 @@
+#Deterministic simulation of several clients editing one board_crdt.BoardState at the same time
+#Each step some replicas make a random edit: draw, erase, bring an erased item back, move an item, type into,
+#format or delete from a text box. The edit's operations are sent to every other replica over a simulated network that
+#delays them by a random number of steps, so they arrive out of order, and sometimes delivers them twice. Once
+#everything has been delivered all replicas should have the same digest. The same seed always gives the same run.
+import heapq
+import random
+import time
+
+from WhiteboardApplication.board_crdt import BoardState
+
+FORMATS = ({}, {'bold': True}, {'italic': True, 'color': "#ff0000"})
+
+
+class ConvergenceSimulator:
+    """Runs replicas of the board against each other over an unreliable network"""
+
+    def __init__(self, replicas=3, seed=1, edit_rate=0.5, max_delay=20, duplicate_rate=0.05):
+        self.rng = random.Random(seed)
+        self.states = [BoardState(f"client-{number}") for number in range(replicas)]
+        self.edit_rate = edit_rate
+        self.max_delay = max_delay
+        self.duplicate_rate = duplicate_rate
+        self.time = 0
+        self.in_flight = []          # (delivery step, send order, replica index, operation)
+        self.sent = 0
+        self.applied = 0
+        self.apply_time = 0.0        # Seconds spent applying remote operations
+        self.items_made = [0] * replicas
+
+    def send(self, sender, ops):
+        for target in range(len(self.states)):
+            if target == sender:
+                continue
+            copies = 2 if self.rng.random() < self.duplicate_rate else 1
+            for _ in range(copies):
+                for op in ops:
+                    delay = self.rng.randint(1, self.max_delay)
+                    heapq.heappush(self.in_flight, (self.time + delay, self.sent, target, op))
+                    self.sent += 1
+
+    def edit(self, index):
+        state = self.states[index]
+        # Dicts keep the order operations arrived in, so the same seed picks the same items
+        present = [item_id for item_id, tags in state.tags.items() if tags]
+        gone = [item_id for item_id in state.removed if not state.contains(item_id)]
+        texts = [item_id for item_id in state.texts if state.contains(item_id)]
+        choice = self.rng.random()
+
+        if choice < 0.3 or not present:
+            self.items_made[index] += 1
+            item_id = f"{state.replica}-{self.items_made[index]}"
+            ops = [state.add_item(item_id), state.move_item(item_id, [self.rng.randint(0, 999), 0])]
+            if self.rng.random() < 0.3:
+                ops.append(state.insert_text(item_id, 0, "note"))
+            return ops
+        if choice < 0.45:
+            return [state.remove_item(self.rng.choice(present))]
+        if choice < 0.5 and gone:
+            return [state.add_item(self.rng.choice(gone))]
+        if choice < 0.65:
+            return [state.move_item(self.rng.choice(present), [self.rng.randint(0, 999), self.rng.randint(0, 999)])]
+        if not texts:
+            return []
+        item_id = self.rng.choice(texts)
+        length = len(state.text(item_id))
+        if choice < 0.82 or not length:
+            word = ''.join(self.rng.choice("abcdefgh ") for _ in range(self.rng.randint(1, 3)))
+            return [state.insert_text(item_id, self.rng.randint(0, length), word)]
+        start = self.rng.randrange(length)
+        count = self.rng.randint(1, min(3, length - start))
+        if choice < 0.91:
+            return [state.format_text(item_id, start, [[count, self.rng.choice(FORMATS)]])]
+        return [state.delete_text(item_id, start, count)]
+
+    def deliver(self, until):
+        while self.in_flight and self.in_flight[0][0] <= until:
+            _time, _order, target, op = heapq.heappop(self.in_flight)
+            start = time.perf_counter()
+            self.states[target].apply(op)
+            self.apply_time += time.perf_counter() - start
+            self.applied += 1
+
+    def step(self):
+        self.time += 1
+        for index in range(len(self.states)):
+            if self.rng.random() < self.edit_rate:
+                ops = self.edit(index)
+                if ops:
+                    self.send(index, ops)
+        self.deliver(self.time)
+
+    #Runs the edits, then lets the network drain. Returns whether every replica ended up with the same board.
+    def run(self, steps):
+        for _ in range(steps):
+            self.step()
+        self.deliver(float('inf'))
+        return self.converged()
+
+    def converged(self):
+        first = self.states[0].digest()
+        return all(state.digest() == first for state in self.states[1:])
@@ -0,0 +1,83 @@
+from PySide6.QtCore import QPointF, QRectF
+from PySide6.QtGui import QPen
+from PySide6.QtWidgets import QGraphicsItem
+
+from WhiteboardApplication.stroke_item import StrokeItem, build_stroke_path
+
+
+class LiveStrokeItem(QGraphicsItem):
+    """The stroke that is currently being drawn.
+
+    Points are appended in amortized O(1): finished runs of points are sealed into
+    cached chunk paths, the bounding rect grows with some slack so geometry changes
+    are rare, and only the rect around the newest segment is repainted.
+    """
+
+    # Number of points per cached chunk path
+    CHUNK_SIZE = 256
+    # Extra room added whenever the bounding rect has to grow
+    BOUNDS_SLACK = 64
+
+    def __init__(self, position, pen, highlighter=False):
+        super().__init__()
+
+        self.pen = QPen(pen)
+        self.highlighter = highlighter
+        self.points = [(position.x(), position.y())]
+
+        # Sealed chunks as (path, rect) and the index where the open tail starts
+        self.chunks = []
+        self.tail_start = 0
+
+        self.margin = self.pen.widthF() / 2 + 1
+        self.bounds = self.segment_rect(self.points[0], self.points[0])
+        self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemUsesExtendedStyleOption, True)
+
+    def segment_rect(self, start, end):
+        return QRectF(QPointF(*start), QPointF(*end)).normalized().adjusted(
+            -self.margin, -self.margin, self.margin, self.margin)
+
+    def add_point(self, position):
+        previous = self.points[-1]
+        current = (position.x(), position.y())
+        self.points.append(current)
+
+        dirty = self.segment_rect(previous, current)
+        if not self.bounds.contains(dirty):
+            self.prepareGeometryChange()
+            slack = self.BOUNDS_SLACK
+            self.bounds = self.bounds.united(dirty).adjusted(-slack, -slack, slack, slack)
+
+        # Seal the tail into a cached path once it gets long, the last point is shared with the next chunk
+        if len(self.points) - self.tail_start >= self.CHUNK_SIZE:
+            chunk_points = self.points[self.tail_start:]
+            path = build_stroke_path(chunk_points)
+            rect = path.boundingRect().adjusted(-self.margin, -self.margin, self.margin, self.margin)
+            self.chunks.append((path, rect))
+            self.tail_start = len(self.points) - 1
+
+        self.update(dirty)
+
+    def boundingRect(self):
+        return self.bounds
+
+    def paint(self, painter, option, widget=None):
+        painter.setPen(self.pen)
+        exposed = option.exposedRect
+
+        for path, rect in self.chunks:
+            if rect.intersects(exposed):
+                painter.drawPath(path)
+
+        tail = self.points[self.tail_start:]
+        if len(tail) > 1:
+            painter.drawPolyline([QPointF(x, y) for x, y in tail])
+        else:
+            painter.drawPoint(QPointF(*tail[0]))
+
+    #Converts the live stroke into a normal path item once the stroke is finished,
+    #optionally with the point list the release filters produced
+    def to_stroke_item(self, points=None, smooth=False):
+        stroke = StrokeItem(self.points if points is None else points, self.pen, self.highlighter, smooth)
+        stroke.setZValue(self.zValue())
+        return stroke
@@ -1,7 +1,8 @@
 import os
-import pickle
 import sys
+import json
 import random
+import uuid
 from firebase_admin import db
 from threading import Thread
 from WhiteboardApplication.board_sync import WhiteboardSync
@@ -37,7 +38,7 @@ from PySide6.QtGui import (
 )
 
 from PySide6.QtCore import (
-    Qt, QRectF, QSizeF, QPointF, QSize, QRect, QFile, QIODevice, QUrl, QTimer
+    Qt, QRectF, QSizeF, QPointF, QSize, QRect, QFile, QIODevice, QUrl, QTimer, QStandardPaths
 )
 
 from WhiteboardApplication.UI.board import Ui_MainWindow
@@ -45,6 +46,10 @@ from WhiteboardApplication.text_box import TextBox
 from WhiteboardApplication.new_notebook import NewNotebook
 
 from WhiteboardApplication.board_scene import BoardScene
+from WhiteboardApplication.board_view import RENDER_PROFILES
+from WhiteboardApplication.notebook_format import NotebookReader, NotebookFormatError
+from WhiteboardApplication.notebook_saver import NotebookSaver
+from WhiteboardApplication.notebook_journal import NotebookJournal, replay_journal
 
 from WhiteboardApplication.resize_handle_image import ResizablePixmapItem
 
@@ -72,12 +77,16 @@ from WhiteboardApplication.Collab_Functionality.client import Client
 
 class MainWindow(QMainWindow, Ui_MainWindow):
 
-    def __init__(self):
+    #autosave_directory defaults to the app data location, tests pass their own
+    def __init__(self, autosave_directory=None):
         super().__init__()
         self.setupUi(self)
 
         self.user_email = None
 
+        # "sync_relay": "host:port" in config.json syncs meetings through a relay_server instead of Firebase
+        self.sync_relay = self.load_sync_relay()
+
         if hasattr(self, 'tb_actionImages'):
             print("actionImages is initialized.")
         else:
@@ -88,7 +97,13 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.actionLoad.triggered.connect(self.load)
         self.actionNew.triggered.connect(self.new_tab)
         self.actionDocument.triggered.connect(self.display_help_doc)
-        self.actionClose.triggered.connect(sys.exit)
+        self.actionClose.triggered.connect(self.close)
+
+        # Notebooks are written on a worker thread, progress is shown in the status bar
+        self.saver = NotebookSaver(self)
+        self.saver.progress.connect(self.save_progress)
+        self.saver.saved.connect(self.save_finished)
+        self.saver.failed.connect(self.save_failed)
 
         ############################################################################################################
         # Ensure all buttons behave properly when clicked
@@ -114,14 +129,38 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         menu.addAction("Pen Eraser", self.penEraser_action)
         self.tb_actionEraser.setMenu(menu)
 
-        self.eraser_color = QColor("#F3F3F3")
-
         self.current_color = QColor("#000000")
 
         ############################################################################################################
 
         self.actionClear.triggered.connect(self.clear_canvas)
 
+        # Stroke input settings, applied to every notebook tab
+        self.stroke_tolerance = 0.75
+        self.actionStrokeTolerance = self.menuOptions.addAction("Stroke Tolerance...")
+        self.actionStrokeTolerance.triggered.connect(self.change_stroke_tolerance)
+        self.actionSmoothStrokes = self.menuOptions.addAction("Smooth Strokes")
+        self.actionSmoothStrokes.setCheckable(True)
+        self.actionSmoothStrokes.toggled.connect(self.smooth_strokes)
+
+        # Sends strokes to the meeting while they are drawn, not only once the pen is lifted
+        self.actionStreamStrokes = self.menuOptions.addAction("Stream Strokes Live")
+        self.actionStreamStrokes.setCheckable(True)
+        self.actionStreamStrokes.toggled.connect(self.stream_strokes)
+
+        # Draws committed ink from cached raster tiles, faster to scroll on full notebooks
+        self.actionTileRendering = self.menuOptions.addAction("Tile Cached Ink")
+        self.actionTileRendering.setCheckable(True)
+        self.actionTileRendering.toggled.connect(self.tile_rendering)
+
+        # Rendering profile of the current notebook tab, weaker machines can pick a faster one
+        self.menuRenderProfile = self.menuOptions.addMenu("Rendering Profile")
+        for profile_name in RENDER_PROFILES:
+            self.menuRenderProfile.addAction(profile_name, lambda checked=False, name=profile_name: self.change_render_profile(name))
+        self.actionShowFps = self.menuOptions.addAction("Show FPS")
+        self.actionShowFps.setCheckable(True)
+        self.actionShowFps.toggled.connect(self.show_fps)
+
         # Define what the tool buttons do
         ###########################################################################################################
         self.current_color = QColor("#000000")
@@ -137,18 +176,61 @@ class MainWindow(QMainWindow, Ui_MainWindow):
 
         self.redo_list = []
 
-        self.new_tab()
+        # Every notebook tab keeps an autosave journal here, notebooks left over from a session that crashed are
+        # reopened
+        if autosave_directory is None:
+            autosave_directory = os.path.join(
+                QStandardPaths.writableLocation(QStandardPaths.StandardLocation.AppDataLocation), "autosave")
+        self.autosave_directory = autosave_directory
+        os.makedirs(self.autosave_directory, exist_ok=True)
+        if not self.restore_autosaves():
+            self.new_tab()
 
         self.tb_actionPen.setChecked(True)
         self.tabWidget.currentWidget().findChild(QGraphicsView, 'gv_Canvas').scene().set_active_tool("pen")
 
         ## closes the tab/notebook when clicking the close button
-        self.tabWidget.tabCloseRequested.connect(self.tabWidget.removeTab)
+        self.tabWidget.tabCloseRequested.connect(self.close_tab)
 
     def set_user_email(self, email):
         self.user_email = email
         print(f"Username set in MainWindow: {self.user_email}")
 
+    def load_sync_relay(self):
+        config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'config.json')
+        try:
+            with open(config_path, 'r') as f:
+                relay = json.load(f).get('sync_relay')
+        except (OSError, ValueError):
+            return None
+        if not relay:
+            return None
+        host, _, port = relay.rpartition(':')
+        return host, int(port)
+
+    #The transport WhiteboardSync uses for a meeting, None keeps the Firebase default
+    def sync_transport(self, meeting_id):
+        if self.sync_relay is None:
+            return None
+        host, port = self.sync_relay
+        return Client(host, port, meeting_id)
+
+    def start_sync(self, meeting_id, host=False):
+        current_scene = self.tabWidget.currentWidget().findChild(QGraphicsView, 'gv_Canvas').scene()
+        if current_scene.sync is not None:
+            current_scene.sync.close()
+        current_scene.sync = WhiteboardSync(current_scene, meeting_id, self.user_email, self.sync_transport(meeting_id))
+        current_scene.sync.set_streaming(self.actionStreamStrokes.isChecked())
+        current_scene.sync.presence.participants_changed.connect(self.participants_changed)
+        # The host's board is the one late joiners start from
+        if host:
+            current_scene.sync.start_snapshots()
+
+    #Presence tells who else is in the meeting, whichever transport carries it
+    def participants_changed(self, users):
+        names = ", ".join(user.split('@')[0] for user in users)
+        self.statusbar.showMessage(f"In the meeting: {names}" if users else "No one else is in the meeting", 5000)
+
     def generate_meeting_id(self):
         """Generate a random numeric meeting ID."""
         return str(random.randint(100000, 999999))  # Example: 6-digit numeric ID
@@ -164,22 +246,22 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         msg.setText(f"Your meeting ID is: {meeting_id}")
         msg.exec()
 
-        # Create the meeting in the database
-        meeting_ref = db.reference(f"meetings/{meeting_id}")
-        meeting_ref.set({
-            "participants": {
-                "Host": {
-                    "name": self.user_email
+        # Create the meeting in the database, a relay has no participant list to keep
+        if self.sync_relay is None:
+            meeting_ref = db.reference(f"meetings/{meeting_id}")
+            meeting_ref.set({
+                "participants": {
+                    "Host": {
+                        "name": self.user_email
+                    }
                 }
-            }
-        })
+            })
 
-        # Start listening for participant updates
-        self.notify_participants(meeting_id)
+            # Start listening for participant updates
+            self.notify_participants(meeting_id)
 
         print(f"Meeting {meeting_id} created successfully.")
-        current_scene = self.tabWidget.currentWidget().findChild(QGraphicsView, 'gv_Canvas').scene()
-        current_scene.sync = WhiteboardSync(current_scene, meeting_id, self.user_email)
+        self.start_sync(meeting_id, host=True)
 
     def join_meeting(self, user_id):
         # Prompt the user for the meeting ID
@@ -190,12 +272,13 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         meeting_id = meeting_id.strip()
 
         # Join the meeting in the database
-        meeting_ref = db.reference(f"meetings/{meeting_id}/participants")
-        meeting_ref.update({
-            "Guest": {
-                "name": self.user_email
-            }
-        })
+        if self.sync_relay is None:
+            meeting_ref = db.reference(f"meetings/{meeting_id}/participants")
+            meeting_ref.update({
+                "Guest": {
+                    "name": self.user_email
+                }
+            })
 
         # Confirm to the user
         msg = QMessageBox()
@@ -205,11 +288,11 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         msg.exec()
 
         # Start listening for participant updates
-        self.notify_participants(meeting_id)
+        if self.sync_relay is None:
+            self.notify_participants(meeting_id)
 
         print(f"User {self.user_email} joined meeting {meeting_id}.")
-        current_scene = self.tabWidget.currentWidget().findChild(QGraphicsView, 'gv_Canvas').scene()
-        current_scene.sync = WhiteboardSync(current_scene, meeting_id, self.user_email)
+        self.start_sync(meeting_id)
 
     def notify_participants(self, meeting_id):
         """Set up a listener to notify participants when someone joins."""
@@ -275,7 +358,38 @@ class MainWindow(QMainWindow, Ui_MainWindow):
     #     self.tabWidget.currentWidget().findChild(QGraphicsView, 'gv_Canvas').scene().shapes_menu()
 
     def clear_canvas(self):
-        self.tabWidget.currentWidget().findChild(QGraphicsView, 'gv_Canvas').scene().clear()
+        self.tabWidget.currentWidget().findChild(QGraphicsView, 'gv_Canvas').scene().clear_board()
+
+    #Lets the user choose how far (in scene units) a stroke may drift from the raw input when points are dropped
+    def change_stroke_tolerance(self):
+        tolerance, ok = QInputDialog.getDouble(self, "Stroke Tolerance", "Error tolerance (0 keeps every point):",
+                                               self.stroke_tolerance, 0, 10, 2)
+        if not ok:
+            return
+
+        self.stroke_tolerance = tolerance
+        for index in range(self.tabWidget.count()):
+            self.tabWidget.widget(index).findChild(QGraphicsView, 'gv_Canvas').scene().set_stroke_tolerance(tolerance)
+
+    def smooth_strokes(self, enable):
+        for index in range(self.tabWidget.count()):
+            self.tabWidget.widget(index).findChild(QGraphicsView, 'gv_Canvas').scene().set_stroke_smoothing(enable)
+
+    def stream_strokes(self, enable):
+        for index in range(self.tabWidget.count()):
+            sync = self.tabWidget.widget(index).findChild(QGraphicsView, 'gv_Canvas').scene().sync
+            if sync is not None:
+                sync.set_streaming(enable)
+
+    def tile_rendering(self, enable):
+        for index in range(self.tabWidget.count()):
+            self.tabWidget.widget(index).findChild(QGraphicsView, 'gv_Canvas').set_tile_rendering(enable)
+
+    def change_render_profile(self, profile_name):
+        self.tabWidget.currentWidget().findChild(QGraphicsView, 'gv_Canvas').set_render_profile(RENDER_PROFILES[profile_name])
+
+    def show_fps(self, enable):
+        self.tabWidget.currentWidget().findChild(QGraphicsView, 'gv_Canvas').set_show_fps(enable)
 
     def color_changed(self, color):
          self.tabWidget.currentWidget().findChild(QGraphicsView, 'gv_Canvas').scene().change_color(color)
@@ -288,14 +402,13 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.tb_actionPen.setChecked(False)  # Ensure pen is not active
         self.tb_actionCursor.setChecked(False)
 
+    #Pixel eraser that cuts strokes apart instead of painting over them
     def penEraser_action(self):
         print("Pen Eraser action")
-            # Enable pen mode, disable eraser
-        print("Pen activated")  # Debugging print
-        self.color_changed(self.eraser_color)
-        self.tabWidget.currentWidget().findChild(QGraphicsView, 'gv_Canvas').scene().set_active_tool("pen")
-        self.tb_actionEraser.setChecked(False)  # Ensure eraser is not active
+        self.tabWidget.currentWidget().findChild(QGraphicsView, 'gv_Canvas').scene().set_active_tool("pixel_eraser")
+        self.tb_actionPen.setChecked(False)  # Ensure pen is not active
         self.tb_actionCursor.setChecked(False)
+        self.tb_actionHighlighter.setChecked(False)
 
     # Depending on which button is clicked, sets the appropriate flag so that operations
     # don't overlap
@@ -389,203 +502,106 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         QDesktopServices.openUrl(QUrl.fromLocalFile(path))
 
     def save(self):
-        directory, _filter = QFileDialog.getSaveFileName(self, "Save as Pickle", '', "Pickle (*.pkl)")
+        directory, _filter = QFileDialog.getSaveFileName(self, "Save Notebook", '', "BestNotes Notebook (*.bnote)")
 
         if directory == "":
             return
 
-        with open(directory, 'wb') as file:
-            # noinspection PyTypeChecker
-            pickle.dump(self.serialize_items(), file, protocol=pickle.HIGHEST_PROTOCOL)
+        scene = self.tabWidget.currentWidget().findChild(QGraphicsView, 'gv_Canvas').scene()
+        # A notebook that is still loading has items only on disk, and its file may be the one being overwritten
+        scene.finish_loading()
+        self.saver.save(directory, scene)
+        self.statusbar.showMessage(f"Saving {os.path.basename(directory)}...")
+
+    def save_progress(self, path, done, total):
+        self.statusbar.showMessage(f"Saving {os.path.basename(path)}... {done * 100 // max(total, 1)}%")
+
+    def save_finished(self, path):
+        self.statusbar.showMessage(f"Saved {os.path.basename(path)}", 5000)
+
+    def save_failed(self, path, error):
+        self.statusbar.clearMessage()
+        QMessageBox.warning(self, "Save Notebook", f"Could not save {path}: {error}")
 
     def load(self):
-        self.tabWidget.currentWidget().findChild(QGraphicsView, 'gv_Canvas').scene().clear()
-        directory, _filter = QFileDialog.getOpenFileName()
-        with open(directory, 'rb') as file:
-            items_data = pickle.load(file)
-            self.deserialize_items(items_data)
-
-    def serialize_items(self):
-        items_data = []
-        for item in self.tabWidget.currentWidget().findChild(QGraphicsView, 'gv_Canvas').scene().items():
-            if isinstance(item, TextBox):
-                items_data.append({
-                    'type': 'TextBox',
-                    'text': item.toPlainText(),
-                    'font': self.serialize_font(item.font()),
-                    'color': self.serialize_color(item.defaultTextColor()),
-                    'rotation': item.rotation(),
-                    'transform': self.serialize_transform(item.transform()),
-                    'x': item.pos().x(),
-                    'y': item.pos().y(),
-                    'name': item.toolTip(),
-                })
-
-            elif isinstance(item, QGraphicsPathItem):
-                path_data = {
-                    'type': 'QGraphicsPathItem',
-                    'pen': self.serialize_pen(item.pen()),
-                    'brush': self.serialize_brush(item.brush()),
-                    'rotation': item.rotation(),
-                    'transform': self.serialize_transform(item.transform()),
-                    'x': item.pos().x(),
-                    'y': item.pos().y(),
-                    'name': item.toolTip(),
-                    'elements': self.serialize_path(item.path()),
-                }
-                items_data.append(path_data)
-
-        return items_data
-
-    def serialize_color(self, color: QColor):
-        return {
-            'red': color.red(),
-            'green': color.green(),
-            'blue': color.blue(),
-            'alpha': color.alpha(),
-        }
-
-    def serialize_pen(self, pen: QPen):
-        return {
-            'width': pen.width(),
-            'color': self.serialize_color(pen.color()),
-            'style': pen.style(),
-            'capstyle': pen.capStyle(),
-            'joinstyle': pen.joinStyle()
-        }
-
-    def serialize_brush(self, brush: QBrush):
-        return {
-            'color': self.serialize_color(brush.color()),
-            'style': brush.style()
-        }
-
-    def serialize_font(self, font: QFont):
-        return {
-            'family': font.family(),
-            'pointsize': font.pixelSize(),
-            'letterspacing': font.letterSpacing(),
-            'bold': font.bold(),
-            'italic': font.italic(),
-            'underline': font.underline(),
-        }
-
-    def serialize_transform(self, transform: QTransform):
-        return {
-            'm11': transform.m11(),
-            'm12': transform.m12(),
-            'm13': transform.m13(),
-            'm21': transform.m21(),
-            'm22': transform.m22(),
-            'm23': transform.m23(),
-            'm31': transform.m31(),
-            'm32': transform.m32(),
-            'm33': transform.m33()
-        }
-
-    def serialize_path(self, path: QPainterPath):
-        elements = []
-        for i in range(path.elementCount()):
-            element = path.elementAt(i)
-            if element.isMoveTo():
-                elements.append({'type': 'moveTo', 'x': element.x, 'y': element.y})
-            elif element.isLineTo():
-                elements.append({'type': 'lineTo', 'x': element.x, 'y': element.y})
-            elif element.isCurveTo():
-                elements.append({'type': 'curveTo', 'x': element.x, 'y': element.y})
-        return elements
-
-    def deserialize_items(self, items_data):
-        for item_data in items_data:
-            if item_data['type'] == 'TextBox':
-                item = self.deserialize_text_item(item_data)
-            elif item_data['type'] == 'QGraphicsPathItem':
-                item = self.deserialize_path_item(item_data)
-
-            # Add item
-            self.tabWidget.currentWidget().findChild(QGraphicsView, 'gv_Canvas').scene().addItem(item)
-
-    def deserialize_color(self, color):
-        return QColor(color['red'], color['green'], color['blue'], color['alpha'])
-
-    def deserialize_pen(self, data):
-        pen = QPen()
-        pen.setWidth(data['width'])
-        pen.setColor(self.deserialize_color(data['color']))
-        pen.setStyle(data['style'])
-        pen.setCapStyle(data['capstyle'])
-        pen.setJoinStyle(data['joinstyle'])
-        return pen
-
-    def deserialize_brush(self, data):
-        brush = QBrush()
-        brush.setColor(self.deserialize_color(data['color']))
-        brush.setStyle(data['style'])
-        return brush
-
-    def deserialize_font(self, data):
-        font = QFont()
-        font.setFamily(data['family'])
-        font.setPixelSize(data['pointsize'])
-        font.setLetterSpacing(QFont.AbsoluteSpacing, data['letterspacing'])
-        font.setBold(data['bold'])
-        font.setItalic(data['italic'])
-        font.setUnderline(data['underline'])
-        return font
-
-    def deserialize_transform(self, data):
-        transform = QTransform(
-            data['m11'], data['m12'], data['m13'],
-            data['m21'], data['m22'], data['m23'],
-            data['m31'], data['m32'], data['m33']
-        )
-        return transform
-
-    def deserialize_text_item(self, data):
-        text_item = TextBox()
-        text_item.setFont(self.deserialize_font(data['font']))
-        text_item.setDefaultTextColor(self.deserialize_color(data['color']))
-        text_item.setRotation(data['rotation'])
-        text_item.setTransform(self.deserialize_transform(data['transform']))
-        text_item.setPos(data['x'], data['y'])
-        text_item.setToolTip(data['name'])
-        text_item.setPlainText(data['text'])
-        return text_item
-
-    def deserialize_path_item(self, data):
-        sub_path = QPainterPath()
-        for element in data['elements']:
-            if element['type'] == 'moveTo':
-                sub_path.moveTo(element['x'], element['y'])
-            elif element['type'] == 'lineTo':
-                sub_path.lineTo(element['x'], element['y'])
-            elif element['type'] == 'curveTo':
-                sub_path.cubicTo(element['x'],
-                                 element['y'],
-                                 element['x'],
-                                 element['y'],
-                                 element['x'],
-                                 element['y'])
-
-        path_item = QGraphicsPathItem(sub_path)
-        path_item.setPen(self.deserialize_pen(data['pen']))
-        path_item.setBrush(self.deserialize_brush(data['brush']))
-        path_item.setRotation(data['rotation'])
-        path_item.setTransform(self.deserialize_transform(data['transform']))
-        path_item.setPos(data['x'], data['y'])
-        path_item.setToolTip(data['name'])
-
-        return path_item
+        directory, _filter = QFileDialog.getOpenFileName(self, "Open Notebook", '', "BestNotes Notebook (*.bnote)")
+
+        if directory == "":
+            return
+
+        try:
+            reader = NotebookReader(directory)
+        except (OSError, NotebookFormatError) as e:
+            QMessageBox.warning(self, "Load Notebook", f"Could not open {directory}: {e}")
+            return
+
+        # A save still copying this board has to finish before the board is replaced
+        self.saver.finish_snapshots()
+        view = self.tabWidget.currentWidget().findChild(QGraphicsView, 'gv_Canvas')
+        view.scene().start_lazy_load(reader, view)
 
     def new_tab(self):
+        self.add_notebook_tab()
+
+    #Reopens the notebooks whose journals are still in the autosave directory, returns how many were restored
+    def restore_autosaves(self):
+        restored = 0
+        for name in sorted(os.listdir(self.autosave_directory)):
+            path = os.path.join(self.autosave_directory, name)
+            if name.endswith(".tmp"):
+                # Left behind by a compaction that never finished, the journal it was replacing is still complete
+                os.remove(path)
+                continue
+            if not name.endswith(".journal"):
+                continue
+            try:
+                items, next_id = replay_journal(path)
+            except (OSError, NotebookFormatError) as e:
+                print(f"Could not restore {path}: {e}")
+                continue
+            if not items:
+                os.remove(path)
+                continue
+            self.add_notebook_tab(path, items, next_id)
+            restored += 1
+        return restored
+
+    def close_tab(self, index):
+        scene = self.tabWidget.widget(index).findChild(QGraphicsView, 'gv_Canvas').scene()
+        if scene.journal is not None:
+            scene.journal.close(remove=True)
+        self.tabWidget.removeTab(index)
+
+    #A clean quit drops the journals like closing each tab does, they are only there to recover from a crash
+    def closeEvent(self, event):
+        for index in range(self.tabWidget.count()):
+            scene = self.tabWidget.widget(index).findChild(QGraphicsView, 'gv_Canvas').scene()
+            if scene.journal is not None:
+                scene.journal.close(remove=True)
+                scene.set_journal(None)
+        super().closeEvent(event)
+
+    def add_notebook_tab(self, journal_path=None, items=None, next_id=0):
         #adds a new tab that contains the widget canvas
         self.tabWidget.addTab(NewNotebook.add_new_notebook(NewNotebook), "Notebook %d" % (self.tabWidget.count()+1))
 
         # attaches a new instance of scene to the new tab's canvas
         self.scene = BoardScene()
+        self.scene.set_stroke_tolerance(self.stroke_tolerance)
+        self.scene.set_stroke_smoothing(self.actionSmoothStrokes.isChecked())
         NewNotebook.get_canvas(NewNotebook).setScene(self.scene)
-        NewNotebook.get_canvas(NewNotebook).setRenderHint(QPainter.RenderHint.Antialiasing, True)
-        
+        # The view doesn't own its scene and self.scene moves on to the next tab, so the canvas keeps it alive
+        self.scene.setParent(NewNotebook.get_canvas(NewNotebook))
+        NewNotebook.get_canvas(NewNotebook).set_tile_rendering(self.actionTileRendering.isChecked())
+        NewNotebook.get_canvas(NewNotebook).set_render_profile(RENDER_PROFILES['Quality'])
+
+        # Restored items are added before the journal is attached since they are in it already
+        for item in (items or {}).values():
+            self.scene.addItem(item)
+        if journal_path is None:
+            journal_path = os.path.join(self.autosave_directory, f"{uuid.uuid4().hex}.journal")
+        self.scene.set_journal(NotebookJournal(journal_path, self.scene, items, next_id))
+
 if __name__ == '__main__':
     app = QApplication(sys.argv)
 
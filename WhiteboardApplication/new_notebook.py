@@ -3,6 +3,8 @@ from PySide6.QtGui import QCursor
 from PySide6.QtWidgets import QAbstractScrollArea, QSizePolicy, QGraphicsView, QHBoxLayout, QWidget, QScrollArea, \
     QGridLayout
 
+from WhiteboardApplication.board_view import BoardView
+
 
 class NewNotebook:
     def add_new_notebook(self):
@@ -39,7 +41,7 @@ class NewNotebook:
 
         self.scrollAreaWidgetContents_3.setLayout(self.horizontalLayout_2)
 
-        self.gv_Canvas = QGraphicsView()
+        self.gv_Canvas = BoardView()
         self.gv_Canvas.setObjectName(u"gv_Canvas")
         sizePolicy1 = QSizePolicy(QSizePolicy.Policy.Minimum, QSizePolicy.Policy.Expanding)
         sizePolicy1.setHorizontalStretch(0)
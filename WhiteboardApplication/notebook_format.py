@@ -0,0 +1,472 @@
+#Binary notebook file format
+#A file starts with a header (magic, format version, record count) followed by one record per item.
+#Every record is a type byte and a payload length, so readers can skip record types they don't know.
+#Stroke points are stored as packed float32 pairs.
+#From version 2 an item index follows the header with each record's offset, length, type and scene
+#bounding rect, so a reader can memory-map the file and decode only the items it needs.
+#Saving is split in two: snapshot_items copies what each item needs into plain Python values on the GUI
+#thread, then pack_records turns the snapshot into file bytes and can run on any thread.
+import mmap
+import os
+import struct
+from array import array
+from functools import lru_cache
+
+from PySide6.QtCore import QByteArray, QBuffer, QIODevice, QPointF, Qt
+from PySide6.QtGui import QColor, QFont, QImage, QPainterPath, QPen, QPixmap, QTransform
+from PySide6.QtWidgets import QGraphicsPathItem
+
+from WhiteboardApplication.resize_handle_image import ResizablePixmapItem
+from WhiteboardApplication.stroke_item import StrokeItem
+from WhiteboardApplication.text_box import TextBox
+
+MAGIC = b"BNNB"
+VERSION = 2
+
+RECORD_STROKE = 1
+RECORD_PATH = 2
+RECORD_TEXT = 3
+RECORD_IMAGE = 4
+
+FILE_HEADER = struct.Struct('<4sHI')       # magic, version, record count
+RECORD_HEADER = struct.Struct('<BI')       # record type, payload length
+ITEM_HEADER = struct.Struct('<4d9d')       # x, y, rotation, z, transform m11..m33
+PEN = struct.Struct('<f7B')                # width, rgba, style, cap, join
+STROKE_HEADER = struct.Struct('<BI')       # flags, point count
+PATH_HEADER = struct.Struct('<I')          # element count
+TEXT_HEADER = struct.Struct('<4BfifBff')   # rgba, point size, pixel size, letter spacing, style flags, width, height
+IMAGE_HEADER = struct.Struct('<IIII')      # width, height, source width, source height
+STRING_LENGTH = struct.Struct('<I')
+INDEX_ENTRY = struct.Struct('<QIB4f')      # payload offset, payload length, record type, left, top, right, bottom
+
+STROKE_HIGHLIGHTER = 1
+STROKE_SMOOTH = 2
+
+TEXT_BOLD = 1
+TEXT_ITALIC = 2
+TEXT_UNDERLINE = 4
+
+# Path element types as stored in QPainterPath
+PATH_MOVE_TO = 0
+PATH_LINE_TO = 1
+PATH_CURVE_TO = 2
+PATH_CURVE_TO_DATA = 3
+
+
+class NotebookFormatError(Exception):
+    pass
+
+
+def pack_float32(values):
+    data = array('f', values)
+    if data.itemsize != 4:
+        raise NotebookFormatError("float32 arrays are not supported on this platform")
+    if struct.pack('=H', 1) != struct.pack('<H', 1):
+        data.byteswap()
+    return data.tobytes()
+
+
+def unpack_float32(data):
+    values = array('f')
+    values.frombytes(data)
+    if struct.pack('=H', 1) != struct.pack('<H', 1):
+        values.byteswap()
+    return values
+
+
+def pack_string(text):
+    data = text.encode('utf-8')
+    return STRING_LENGTH.pack(len(data)) + data
+
+
+def unpack_string(data, offset):
+    (length,) = STRING_LENGTH.unpack_from(data, offset)
+    offset += STRING_LENGTH.size
+    return bytes(data[offset:offset + length]).decode('utf-8'), offset + length
+
+
+def item_header(item):
+    t = item.transform()
+    return (item.pos().x(), item.pos().y(), item.rotation(), item.zValue(),
+            t.m11(), t.m12(), t.m13(), t.m21(), t.m22(), t.m23(), t.m31(), t.m32(), t.m33())
+
+
+def unpack_item_header(data, offset):
+    return ITEM_HEADER.unpack_from(data, offset), offset + ITEM_HEADER.size
+
+
+def apply_item_header(item, header):
+    x, y, rotation, z, *matrix = header
+    item.setTransform(QTransform(*matrix))
+    item.setRotation(rotation)
+    item.setZValue(z)
+    item.setPos(x, y)
+
+
+def pen_values(pen):
+    color = pen.color()
+    return (pen.widthF(), color.red(), color.green(), color.blue(), color.alpha(),
+            pen.style().value, pen.capStyle().value, pen.joinStyle().value)
+
+
+#Notebooks reuse a handful of pens, so each distinct pen record is only built once
+@lru_cache(maxsize=256)
+def pen_from_record(record):
+    width, red, green, blue, alpha, style, cap, join = PEN.unpack(record)
+    pen = QPen(QColor(red, green, blue, alpha), width)
+    pen.setStyle(Qt.PenStyle(style))
+    pen.setCapStyle(Qt.PenCapStyle(cap))
+    pen.setJoinStyle(Qt.PenJoinStyle(join))
+    return pen
+
+
+def unpack_pen(data, offset):
+    return QPen(pen_from_record(bytes(data[offset:offset + PEN.size]))), offset + PEN.size
+
+
+def snapshot_stroke(item):
+    flags = (STROKE_HIGHLIGHTER if item.highlighter else 0) | (STROKE_SMOOTH if item.smooth else 0)
+    return item_header(item), pen_values(item.pen()), flags, tuple(item.points)
+
+
+def pack_stroke(snapshot):
+    header, pen, flags, points = snapshot
+    coordinates = [value for point in points for value in point]
+    return b"".join((ITEM_HEADER.pack(*header), PEN.pack(*pen),
+                     STROKE_HEADER.pack(flags, len(points)), pack_float32(coordinates)))
+
+
+def decode_stroke(data):
+    header, offset = unpack_item_header(data, 0)
+    pen, offset = unpack_pen(data, offset)
+    flags, count = STROKE_HEADER.unpack_from(data, offset)
+    offset += STROKE_HEADER.size
+
+    coordinates = unpack_float32(data[offset:offset + count * 8])
+    item = StrokeItem(list(zip(coordinates[0::2], coordinates[1::2])), pen, bool(flags & STROKE_HIGHLIGHTER),
+                      bool(flags & STROKE_SMOOTH))
+    apply_item_header(item, header)
+    return item
+
+
+#Points in scene coordinates and pen width of a stroke record, without building the item
+def stroke_geometry(data):
+    (x, y, *_header), offset = unpack_item_header(data, 0)
+    (width, *_pen) = PEN.unpack_from(data, offset)
+    offset += PEN.size
+    _flags, count = STROKE_HEADER.unpack_from(data, offset)
+    offset += STROKE_HEADER.size
+    coordinates = unpack_float32(data[offset:offset + count * 8])
+    return [(px + x, py + y) for px, py in zip(coordinates[0::2], coordinates[1::2])], width
+
+
+#Path items that aren't strokes keep their element types so curves survive
+def snapshot_path(item):
+    path = item.path()
+    types = bytearray()
+    coordinates = []
+    for i in range(path.elementCount()):
+        element = path.elementAt(i)
+        types.append(element.type.value)
+        coordinates.extend((element.x, element.y))
+    return item_header(item), pen_values(item.pen()), bytes(types), tuple(coordinates)
+
+
+def pack_path(snapshot):
+    header, pen, types, coordinates = snapshot
+    return b"".join((ITEM_HEADER.pack(*header), PEN.pack(*pen),
+                     PATH_HEADER.pack(len(types)), types, pack_float32(coordinates)))
+
+
+def decode_path(data):
+    header, offset = unpack_item_header(data, 0)
+    pen, offset = unpack_pen(data, offset)
+    (count,) = PATH_HEADER.unpack_from(data, offset)
+    offset += PATH_HEADER.size
+    types = data[offset:offset + count]
+    coordinates = unpack_float32(data[offset + count:offset + count + count * 8])
+
+    path = QPainterPath()
+    curve = []
+    for i, element_type in enumerate(types):
+        point = QPointF(coordinates[2 * i], coordinates[2 * i + 1])
+        if element_type == PATH_MOVE_TO:
+            path.moveTo(point)
+        elif element_type == PATH_LINE_TO:
+            path.lineTo(point)
+        else:
+            curve.append(point)
+            if len(curve) == 3:
+                path.cubicTo(*curve)
+                curve = []
+
+    item = QGraphicsPathItem(path)
+    item.setPen(pen)
+    apply_item_header(item, header)
+    return item
+
+
+def snapshot_text(item):
+    color = item.defaultTextColor()
+    font = item.font()
+    flags = (TEXT_BOLD if font.bold() else 0) | (TEXT_ITALIC if font.italic() else 0) | \
+            (TEXT_UNDERLINE if font.underline() else 0)
+    rect = item.background.rect()
+    values = (color.red(), color.green(), color.blue(), color.alpha(),
+              font.pointSizeF(), font.pixelSize(), font.letterSpacing(), flags, rect.width(), rect.height())
+    return item_header(item), values, font.family(), item.toolTip(), item.toHtml()
+
+
+def pack_text(snapshot):
+    header, values, family, tooltip, html = snapshot
+    return b"".join((ITEM_HEADER.pack(*header), TEXT_HEADER.pack(*values),
+                     pack_string(family), pack_string(tooltip), pack_string(html)))
+
+
+def decode_text(data):
+    header, offset = unpack_item_header(data, 0)
+    red, green, blue, alpha, point_size, pixel_size, letter_spacing, flags, width, height = \
+        TEXT_HEADER.unpack_from(data, offset)
+    offset += TEXT_HEADER.size
+    family, offset = unpack_string(data, offset)
+    tooltip, offset = unpack_string(data, offset)
+    html, offset = unpack_string(data, offset)
+
+    font = QFont(family)
+    if pixel_size > 0:
+        font.setPixelSize(pixel_size)
+    elif point_size > 0:
+        font.setPointSizeF(point_size)
+    font.setLetterSpacing(QFont.AbsoluteSpacing, letter_spacing)
+    font.setBold(bool(flags & TEXT_BOLD))
+    font.setItalic(bool(flags & TEXT_ITALIC))
+    font.setUnderline(bool(flags & TEXT_UNDERLINE))
+
+    item = TextBox()
+    apply_item_header(item, header)
+    item.setFont(font)
+    item.setDefaultTextColor(QColor(red, green, blue, alpha))
+    item.setHtml(html)
+    item.setToolTip(tooltip)
+    item.resize(width, height)
+    return item
+
+
+#QPixmap can only be used on the GUI thread, so the snapshot keeps the raw ARGB32 pixels and PNG
+#compression happens in pack_image through a QImage, which is safe on other threads
+def snapshot_image(item):
+    image = item.original_pixmap.toImage().convertToFormat(QImage.Format.Format_ARGB32)
+    pixmap = item.pixmap()
+    sizes = (pixmap.width(), pixmap.height(), image.width(), image.height())
+    return item_header(item), sizes, image.bytesPerLine(), bytes(image.constBits())
+
+
+def pack_image(snapshot):
+    header, sizes, bytes_per_line, pixels = snapshot
+    _width, _height, source_width, source_height = sizes
+    image = QImage(pixels, source_width, source_height, bytes_per_line, QImage.Format.Format_ARGB32)
+
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+    image.save(buffer, "PNG")
+    buffer.close()
+
+    return b"".join((ITEM_HEADER.pack(*header), IMAGE_HEADER.pack(*sizes), STRING_LENGTH.pack(data.size()), data.data()))
+
+
+def decode_image(data):
+    header, offset = unpack_item_header(data, 0)
+    width, height, _source_width, _source_height = IMAGE_HEADER.unpack_from(data, offset)
+    offset += IMAGE_HEADER.size
+    (length,) = STRING_LENGTH.unpack_from(data, offset)
+    offset += STRING_LENGTH.size
+
+    original = QPixmap()
+    original.loadFromData(bytes(data[offset:offset + length]), "PNG")
+    item = ResizablePixmapItem(original)
+    apply_item_header(item, header)
+    if (width, height) != (original.width(), original.height()):
+        item.setPixmap(original.scaled(width, height, Qt.AspectRatioMode.KeepAspectRatio))
+        item.update_handles()
+    return item
+
+
+SNAPSHOTS = (
+    (StrokeItem, RECORD_STROKE, snapshot_stroke),
+    (QGraphicsPathItem, RECORD_PATH, snapshot_path),
+    (TextBox, RECORD_TEXT, snapshot_text),
+    (ResizablePixmapItem, RECORD_IMAGE, snapshot_image),
+)
+
+PACKERS = {
+    RECORD_STROKE: pack_stroke,
+    RECORD_PATH: pack_path,
+    RECORD_TEXT: pack_text,
+    RECORD_IMAGE: pack_image,
+}
+
+DECODERS = {
+    RECORD_STROKE: decode_stroke,
+    RECORD_PATH: decode_path,
+    RECORD_TEXT: decode_text,
+    RECORD_IMAGE: decode_image,
+}
+
+
+#Returns (record type, (left, top, right, bottom), snapshot) for an item, or None if the item isn't saved
+def snapshot_item(item):
+    for item_type, record_type, snapshot in SNAPSHOTS:
+        if isinstance(item, item_type):
+            rect = item.sceneBoundingRect()
+            return record_type, (rect.left(), rect.top(), rect.right(), rect.bottom()), snapshot(item)
+    return None
+
+
+def snapshot_items(items):
+    snapshots = (snapshot_item(item) for item in items)
+    return [snapshot for snapshot in snapshots if snapshot is not None]
+
+
+#Returns (record type, payload) for an item, or None if the item isn't saved
+def encode_item(item):
+    snapshot = snapshot_item(item)
+    if snapshot is None:
+        return None
+    record_type, _bounds, values = snapshot
+    return record_type, PACKERS[record_type](values)
+
+
+#Top level items that belong in a notebook file, bottom of the stack first so loading keeps the stacking order
+def notebook_items(scene):
+    return [item for item in scene.items(Qt.SortOrder.AscendingOrder) if item.parentItem() is None]
+
+
+#Builds the file bytes from snapshot_items output without touching any Qt item, so it can run on a worker
+#thread. progress is called with (records packed, total) every PROGRESS_STEP records and at the end.
+PROGRESS_STEP = 1000
+
+
+def pack_records(snapshots, progress=None):
+    # Payload offsets are known up front because the index has a fixed size per record
+    offset = FILE_HEADER.size + INDEX_ENTRY.size * len(snapshots)
+    index = []
+    body = []
+    for count, (record_type, bounds, values) in enumerate(snapshots, 1):
+        payload = PACKERS[record_type](values)
+        offset += RECORD_HEADER.size
+        index.append(INDEX_ENTRY.pack(offset, len(payload), record_type, *bounds))
+        body.append(RECORD_HEADER.pack(record_type, len(payload)))
+        body.append(payload)
+        offset += len(payload)
+        if progress is not None and count % PROGRESS_STEP == 0:
+            progress(count, len(snapshots))
+
+    if progress is not None:
+        progress(len(snapshots), len(snapshots))
+    return FILE_HEADER.pack(MAGIC, VERSION, len(snapshots)) + b"".join(index) + b"".join(body)
+
+
+def encode_items(items):
+    return pack_records(snapshot_items(items))
+
+
+#Writes to a temporary file next to path and renames it over path, so a crash or a full disk
+#part way through never leaves a truncated notebook behind
+def write_atomic(path, data):
+    temporary = path + ".tmp"
+    try:
+        with open(temporary, 'wb') as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+#Returns (offset, length, record type, bounds) for every record, bounds are (left, top, right, bottom)
+#or None for version 1 files, which have no index and are scanned record by record
+def read_index(data):
+    if len(data) < FILE_HEADER.size:
+        raise NotebookFormatError("File is too short to be a notebook")
+    magic, version, count = FILE_HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise NotebookFormatError("Not a BestNotes notebook file")
+    if version > VERSION:
+        raise NotebookFormatError(f"Notebook format version {version} is newer than this version of BestNotes")
+
+    if version >= 2:
+        index_end = FILE_HEADER.size + INDEX_ENTRY.size * count
+        return [(offset, length, record_type, tuple(bounds))
+                for offset, length, record_type, *bounds
+                in INDEX_ENTRY.iter_unpack(data[FILE_HEADER.size:index_end])]
+
+    entries = []
+    offset = FILE_HEADER.size
+    for _ in range(count):
+        record_type, length = RECORD_HEADER.unpack_from(data, offset)
+        offset += RECORD_HEADER.size
+        entries.append((offset, length, record_type, None))
+        offset += length
+    return entries
+
+
+#Decodes one record, returns None for record types this version doesn't know
+def decode_entry(data, entry):
+    offset, length, record_type, _bounds = entry
+    decoder = DECODERS.get(record_type)
+    if decoder is None:
+        return None
+    return decoder(data[offset:offset + length])
+
+
+def decode_items(data):
+    data = memoryview(data)
+    items = (decode_entry(data, entry) for entry in read_index(data))
+    return [item for item in items if item is not None]
+
+
+class NotebookReader:
+    """Memory-maps a notebook file and decodes records on demand through its index"""
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.file.close()
+            raise NotebookFormatError("File is empty")
+        self.data = memoryview(self.map)
+
+        try:
+            self.entries = read_index(self.data)
+        except (NotebookFormatError, struct.error) as e:
+            self.close()
+            raise NotebookFormatError(str(e))
+
+    def decode(self, entry):
+        return decode_entry(self.data, entry)
+
+    def close(self):
+        if self.file is None:
+            return
+        self.data.release()
+        self.map.close()
+        self.file.close()
+        self.file = None
+
+
+def save_notebook(path, scene):
+    write_atomic(path, encode_items(notebook_items(scene)))
+
+
+def load_notebook(path):
+    reader = NotebookReader(path)
+    try:
+        items = (reader.decode(entry) for entry in reader.entries)
+        return [item for item in items if item is not None]
+    finally:
+        reader.close()
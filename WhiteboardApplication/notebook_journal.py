@@ -0,0 +1,263 @@
+#Append-only change journal used for autosave
+#A journal file is a header followed by one entry per scene change: an operation byte, the journal id of the
+#item it applies to, the payload length and a CRC32 of the payload. Added items carry the same record payload
+#as the notebook file format, so an autosave costs the size of the change rather than the whole notebook.
+#Replaying stops at the first incomplete or corrupt entry, which is where a crash cut the journal off.
+#Compaction rewrites the journal as one add entry per item currently in the scene.
+import os
+import struct
+import threading
+import zlib
+
+from PySide6.QtCore import QObject, QTimer, Signal
+
+from WhiteboardApplication.notebook_format import (ITEM_HEADER, PACKERS, DECODERS, NotebookFormatError,
+                                                   notebook_items, snapshot_item, item_header, apply_item_header)
+from WhiteboardApplication.text_box import TextBox
+
+JOURNAL_MAGIC = b"BNJL"
+JOURNAL_VERSION = 1
+
+JOURNAL_HEADER = struct.Struct('<4sH')     # magic, version
+ENTRY_HEADER = struct.Struct('<BIII')      # operation, item id, payload length, payload crc32
+
+OP_ADD = 1        # payload: record type byte + notebook record payload
+OP_REMOVE = 2     # no payload
+OP_MOVE = 3       # payload: ITEM_HEADER
+OP_UPDATE = 4     # payload: like OP_ADD, replaces the item with the same id
+OP_CLEAR = 5      # no payload, removes every item
+
+
+def pack_entry(operation, item_id, payload=b""):
+    return ENTRY_HEADER.pack(operation, item_id, len(payload), zlib.crc32(payload)) + payload
+
+
+def pack_record(record_type, values):
+    return bytes((record_type,)) + PACKERS[record_type](values)
+
+
+def decode_record(payload):
+    decoder = DECODERS.get(payload[0])
+    if decoder is None:
+        return None
+    return decoder(memoryview(payload)[1:])
+
+
+#Rebuilds the items a journal describes, returns ({journal id: item} in stacking order, next free id)
+def replay_journal(path):
+    with open(path, 'rb') as file:
+        data = file.read()
+    if len(data) < JOURNAL_HEADER.size:
+        raise NotebookFormatError("Journal is too short")
+    magic, version = JOURNAL_HEADER.unpack_from(data, 0)
+    if magic != JOURNAL_MAGIC:
+        raise NotebookFormatError("Not a BestNotes journal")
+    if version > JOURNAL_VERSION:
+        raise NotebookFormatError(f"Journal version {version} is newer than this version of BestNotes")
+
+    items = {}
+    next_id = 0
+    offset = JOURNAL_HEADER.size
+    while offset + ENTRY_HEADER.size <= len(data):
+        operation, item_id, length, crc = ENTRY_HEADER.unpack_from(data, offset)
+        payload = data[offset + ENTRY_HEADER.size:offset + ENTRY_HEADER.size + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            break
+        offset += ENTRY_HEADER.size + length
+        next_id = max(next_id, item_id + 1)
+
+        if operation == OP_ADD:
+            item = decode_record(payload)
+            if item is not None:
+                items[item_id] = item
+        elif operation == OP_UPDATE:
+            item = decode_record(payload)
+            if item is not None and item_id in items:
+                items[item_id] = item
+        elif operation == OP_REMOVE:
+            items.pop(item_id, None)
+        elif operation == OP_MOVE and item_id in items:
+            apply_item_header(items[item_id], ITEM_HEADER.unpack(payload))
+        elif operation == OP_CLEAR:
+            items.clear()
+    return items, next_id
+
+
+class NotebookJournal(QObject):
+    """Records a scene's changes to an append-only journal file, flushed to disk a few times a second"""
+
+    compacted = Signal(str)      # path
+
+    FLUSH_INTERVAL = 250                 # ms, the most work a crash can lose
+    COMPACT_BYTES = 4 * 1024 * 1024      # Journal size that triggers a compaction
+
+    #items and next_id continue a journal that was replayed with replay_journal
+    def __init__(self, path, scene, items=None, next_id=0):
+        super().__init__()
+
+        self.path = path
+        self.scene = scene
+        self.ids = {}
+        self.headers = {}
+        self.watched = set()
+        self.next_id = next_id
+        for item_id, item in (items or {}).items():
+            self.ids[item] = item_id
+            self.headers[item_id] = item_header(item)
+            self.watch(item)
+
+        self.file = open(path, 'ab')
+        if self.file.tell() == 0:
+            self.file.write(JOURNAL_HEADER.pack(JOURNAL_MAGIC, JOURNAL_VERSION))
+            self.file.flush()
+        self.size = self.file.tell()
+        self.base_size = self.size
+
+        # Entries not yet handed to the OS, and entries made while a compaction is being written
+        self.buffer = []
+        self.compacting = None
+
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setInterval(self.FLUSH_INTERVAL)
+        self.flush_timer.timeout.connect(self.flush)
+        self.flush_timer.start()
+        self.compacted.connect(self.finish_compaction)
+
+    def append(self, entry):
+        self.buffer.append(entry)
+        if self.compacting is not None:
+            self.compacting.append(entry)
+
+    def record_add(self, item):
+        snapshot = snapshot_item(item)
+        if snapshot is None:
+            return
+        record_type, _bounds, values = snapshot
+        item_id = self.next_id
+        self.next_id += 1
+        self.ids[item] = item_id
+        self.headers[item_id] = values[0]
+        self.append(pack_entry(OP_ADD, item_id, pack_record(record_type, values)))
+        self.watch(item)
+
+    #Text edits don't go through the scene, so text boxes report them directly
+    def watch(self, item):
+        if isinstance(item, TextBox) and item not in self.watched:
+            self.watched.add(item)
+            item.contentChanged.connect(lambda: self.record_update(item))
+
+    def record_update(self, item):
+        item_id = self.ids.get(item)
+        snapshot = snapshot_item(item)
+        if item_id is None or snapshot is None:
+            return
+        record_type, _bounds, values = snapshot
+        self.headers[item_id] = values[0]
+        self.append(pack_entry(OP_UPDATE, item_id, pack_record(record_type, values)))
+
+    def record_remove(self, item):
+        item_id = self.ids.pop(item, None)
+        if item_id is not None:
+            self.headers.pop(item_id, None)
+            self.append(pack_entry(OP_REMOVE, item_id))
+
+    #Only writes an entry when the position or transform actually changed
+    def record_move(self, item):
+        item_id = self.ids.get(item)
+        if item_id is None:
+            return
+        header = item_header(item)
+        if header != self.headers.get(item_id):
+            self.headers[item_id] = header
+            self.append(pack_entry(OP_MOVE, item_id, ITEM_HEADER.pack(*header)))
+
+    def record_clear(self):
+        self.ids.clear()
+        self.headers.clear()
+        self.append(pack_entry(OP_CLEAR, 0))
+
+    def write_buffer(self):
+        if self.buffer:
+            data = b"".join(self.buffer)
+            self.buffer = []
+            self.file.write(data)
+            self.file.flush()
+            self.size += len(data)
+
+    def flush(self):
+        self.write_buffer()
+        if self.compacting is None and self.size > max(self.COMPACT_BYTES, 2 * self.base_size):
+            self.compact()
+
+    #Snapshots the scene on the GUI thread and writes the compacted journal next to the current one on a worker
+    #thread. Entries made in the meantime keep going to the current journal and are replayed onto the new one
+    #before it replaces the current file, so a crash at any point leaves one complete journal.
+    def compact(self):
+        if self.compacting is not None:
+            return
+        self.write_buffer()
+
+        snapshots = []
+        ids = {}
+        for item in notebook_items(self.scene):
+            snapshot = snapshot_item(item)
+            if snapshot is None:
+                continue
+            item_id = self.ids.get(item)
+            if item_id is None:
+                item_id = self.next_id
+                self.next_id += 1
+                self.watch(item)
+            ids[item] = item_id
+            snapshots.append((item_id, snapshot))
+        self.ids = ids
+        self.headers = {item_id: snapshot[2][0] for item_id, snapshot in snapshots}
+        self.compacting = []
+
+        threading.Thread(target=self.write_compacted, args=(snapshots,), daemon=True).start()
+
+    def write_compacted(self, snapshots):
+        temporary = self.path + ".tmp"
+        try:
+            with open(temporary, 'wb') as file:
+                file.write(JOURNAL_HEADER.pack(JOURNAL_MAGIC, JOURNAL_VERSION))
+                for item_id, (record_type, _bounds, values) in snapshots:
+                    file.write(pack_entry(OP_ADD, item_id, pack_record(record_type, values)))
+                file.flush()
+                os.fsync(file.fileno())
+        except OSError as e:
+            print("Journal compaction failed:", e)
+            temporary = ""
+        self.compacted.emit(temporary)
+
+    def finish_compaction(self, temporary):
+        pending = self.compacting
+        self.compacting = None
+        if not temporary:
+            return
+        if self.file is None:
+            os.remove(temporary)
+            return
+
+        with open(temporary, 'ab') as file:
+            file.write(b"".join(pending))
+            file.flush()
+            self.base_size = file.tell()
+
+        # Whatever is still buffered is already in pending, so it belongs to the new file only
+        self.buffer = []
+        self.file.close()
+        os.replace(temporary, self.path)
+        self.file = open(self.path, 'ab')
+        self.size = self.file.tell()
+
+    #Closes the journal, remove deletes the file for a notebook that no longer needs recovering
+    def close(self, remove=False):
+        if self.file is None:
+            return
+        self.flush_timer.stop()
+        self.write_buffer()
+        self.file.close()
+        self.file = None
+        if remove:
+            os.remove(self.path)
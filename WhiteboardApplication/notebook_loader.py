@@ -0,0 +1,167 @@
+import time
+from bisect import bisect
+
+from PySide6.QtCore import QObject, QRectF, QTimer, Signal
+
+
+class LazyNotebookLoader(QObject):
+    """Adds a memory-mapped notebook's items to a scene, the visible ones first and the rest a batch per event loop pass"""
+
+    finished = Signal()
+
+    FRAME_BUDGET = 0.008    # Seconds of decoding per timer tick so scrolling and drawing stay responsive
+    BAND_HEIGHT = 512       # Scene units per vertical band in the lookup used when the view scrolls
+
+    def __init__(self, scene, reader, view=None):
+        super().__init__()
+
+        self.scene = scene
+        self.reader = reader
+        self.view = view
+
+        # Record index -> entry for everything not yet in the scene
+        self.pending = {}
+        self.bands = {}
+        self.unbounded = []
+        bounds = QRectF()
+        for index, entry in enumerate(reader.entries):
+            self.pending[index] = entry
+            rect = self.entry_rect(entry)
+            if rect is None:
+                self.unbounded.append(index)
+                continue
+            bounds = bounds.united(rect)
+            for band in range(int(rect.top() // self.BAND_HEIGHT), int(rect.bottom() // self.BAND_HEIGHT) + 1):
+                self.bands.setdefault(band, []).append(index)
+        self.bounds = bounds
+        self.queue = []
+        # Record indices already in the scene, sorted, and their items, for restacking later arrivals
+        self.loaded = []
+        self.loaded_items = {}
+        self.watching = False
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(0)
+        self.timer.timeout.connect(self.load_next_batch)
+
+    @staticmethod
+    def entry_rect(entry):
+        bounds = entry[3]
+        if bounds is None:
+            return None
+        left, top, right, bottom = bounds
+        return QRectF(left, top, right - left, bottom - top)
+
+    def __len__(self):
+        return len(self.pending)
+
+    def start(self):
+        if not self.bounds.isNull():
+            self.scene.setSceneRect(self.scene.sceneRect().united(self.bounds))
+
+        # Files without an index (version 1) have no bounds to prioritise by, so they load up front
+        self.load_indices(self.unbounded)
+
+        visible = self.visible_rect()
+        self.load_rect(visible)
+        self.queue = self.sorted_by_distance(visible)
+
+        if self.view is not None:
+            self.view.horizontalScrollBar().valueChanged.connect(self.load_visible)
+            self.view.verticalScrollBar().valueChanged.connect(self.load_visible)
+            self.watching = True
+
+        if self.pending:
+            self.timer.start()
+        else:
+            self.done()
+
+    def visible_rect(self):
+        if self.view is None:
+            return QRectF()
+        return self.view.mapToScene(self.view.viewport().rect()).boundingRect()
+
+    def indices_in(self, rect):
+        found = set()
+        if rect.isEmpty():
+            return found
+        for band in range(int(rect.top() // self.BAND_HEIGHT), int(rect.bottom() // self.BAND_HEIGHT) + 1):
+            for index in self.bands.get(band, ()):
+                if index in self.pending and self.entry_rect(self.pending[index]).intersects(rect):
+                    found.add(index)
+        return found
+
+    #Furthest first so the queue can be consumed with pop()
+    def sorted_by_distance(self, rect):
+        center = rect.center()
+
+        def distance(index):
+            entry_center = self.entry_rect(self.pending[index]).center()
+            dx = entry_center.x() - center.x()
+            dy = entry_center.y() - center.y()
+            return dx * dx + dy * dy
+
+        return sorted(self.pending, key=distance, reverse=True)
+
+    #Items arrive in whatever order the view asks for them, so each one is stacked under the
+    #first item after it in the file that is already in, which keeps the saved stacking
+    def load_indices(self, indices):
+        for index in sorted(indices):
+            entry = self.pending.pop(index, None)
+            if entry is None:
+                continue
+            item = self.reader.decode(entry)
+            if item is None:
+                continue
+            self.scene.addItem(item)
+            position = bisect(self.loaded, index)
+            for later in self.loaded[position:]:
+                above = self.loaded_items[later]
+                # Skips items erased since they were loaded
+                if above.scene() is self.scene:
+                    item.stackBefore(above)
+                    break
+            self.loaded.insert(position, index)
+            self.loaded_items[index] = item
+
+    def load_rect(self, rect):
+        self.load_indices(self.indices_in(rect))
+
+    def load_visible(self):
+        self.load_rect(self.visible_rect())
+        if not self.pending:
+            self.done()
+
+    def load_next_batch(self):
+        deadline = time.perf_counter() + self.FRAME_BUDGET
+        while self.queue and time.perf_counter() < deadline:
+            self.load_indices((self.queue.pop(),))
+        if not self.pending:
+            self.done()
+
+    #Loads whatever is left straight away, used before saving
+    def finish(self):
+        self.load_indices(list(self.pending))
+        self.done()
+
+    def cancel(self):
+        self.pending.clear()
+        self.stop()
+
+    def stop(self):
+        self.timer.stop()
+        self.queue = []
+        self.loaded = []
+        self.loaded_items = {}
+        if self.watching:
+            self.view.horizontalScrollBar().valueChanged.disconnect(self.load_visible)
+            self.view.verticalScrollBar().valueChanged.disconnect(self.load_visible)
+            self.watching = False
+        self.view = None
+        self.reader.close()
+
+    def done(self):
+        if self.reader.file is None:
+            return
+        self.stop()
+        self.finished.emit()
@@ -0,0 +1,123 @@
+import threading
+import time
+
+from PySide6.QtCore import Qt, QObject, QTimer, Signal
+
+from WhiteboardApplication.notebook_format import snapshot_item, pack_records, write_atomic
+
+
+class SnapshotJob:
+    """A save whose scene is being copied into plain values a few items per event loop pass"""
+
+    def __init__(self, path, scene):
+        self.path = path
+        self.scene = scene
+        # Every top level item, in no particular order. They stay referenced until the job is done so
+        # their ids can't be reused by items added meanwhile.
+        self.items = list(scene.items_by_id.values())
+        self.next = 0
+        self.snapshots = {}
+
+    #Snapshots items until the deadline, returns True once every item has been looked at
+    def advance(self, deadline):
+        while self.next < len(self.items):
+            if time.perf_counter() >= deadline:
+                return False
+            item = self.items[self.next]
+            self.next += 1
+            try:
+                if item.scene() is not self.scene:
+                    continue
+            except RuntimeError:
+                # Deleted by a clear() of the scene
+                continue
+            self.snapshots[id(item)] = snapshot_item(item)
+        return True
+
+    #The board as it is now, in stacking order. Items added while the job ran are snapshotted here and
+    #items removed meanwhile are left out, edits made to an item after its turn are not picked up.
+    def result(self):
+        snapshots = []
+        for item in self.scene.items(Qt.SortOrder.AscendingOrder):
+            key = id(item)
+            if key in self.snapshots:
+                snapshot = self.snapshots[key]
+            elif item.parentItem() is None:
+                snapshot = snapshot_item(item)
+            else:
+                continue
+            if snapshot is not None:
+                snapshots.append(snapshot)
+        return snapshots
+
+
+class NotebookSaver(QObject):
+    """Saves notebooks on a worker thread, the GUI thread only copies the scene into plain values in short slices"""
+
+    # Emitted from the worker thread, connections to GUI objects are queued by Qt
+    progress = Signal(str, int, int)    # path, records packed, total records
+    saved = Signal(str)                 # path
+    failed = Signal(str, str)           # path, error message
+
+    FRAME_BUDGET = 0.008    # Seconds of snapshotting per timer tick so drawing stays responsive
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        # Saves run one at a time in the order they were requested so an older snapshot never
+        # overwrites a newer one
+        self.write_lock = threading.Lock()
+        self.active = 0
+        self.active_lock = threading.Lock()
+
+        self.jobs = []
+        self.timer = QTimer(self)
+        self.timer.setInterval(0)
+        self.timer.timeout.connect(self.snapshot_next_batch)
+
+    def is_saving(self):
+        with self.active_lock:
+            return self.active > 0
+
+    def save(self, path, scene):
+        with self.active_lock:
+            self.active += 1
+        self.jobs.append(SnapshotJob(path, scene))
+        self.timer.start()
+
+    def snapshot_next_batch(self):
+        deadline = time.perf_counter() + self.FRAME_BUDGET
+        while self.jobs and self.jobs[0].advance(deadline):
+            self.start_writing(self.jobs.pop(0))
+        if not self.jobs:
+            self.timer.stop()
+
+    #Completes the pending snapshots straight away, used before a scene is cleared or replaced
+    def finish_snapshots(self):
+        while self.jobs:
+            job = self.jobs.pop(0)
+            job.advance(float('inf'))
+            self.start_writing(job)
+        self.timer.stop()
+
+    def start_writing(self, job):
+        snapshot = job.result()
+        thread = threading.Thread(target=self.write, args=(job.path, snapshot), daemon=True)
+        thread.start()
+        return thread
+
+    def write(self, path, snapshot):
+        error = None
+        try:
+            with self.write_lock:
+                data = pack_records(snapshot, lambda done, total: self.progress.emit(path, done, total))
+                write_atomic(path, data)
+        except Exception as e:
+            error = str(e)
+
+        with self.active_lock:
+            self.active -= 1
+        if error is None:
+            self.saved.emit(path)
+        else:
+            self.failed.emit(path, error)
@@ -0,0 +1,80 @@
+#Compact encoding for the points of synced strokes and eraser paths
+#Coordinates are rounded to 1/POINT_SCALE of a scene unit and each point is stored as the difference from the one
+#before it, x then y, as zigzag varints. Neighbouring points are only a few units apart, so most coordinates take
+#a byte or two instead of the 15 or so characters of a JSON float. The scale is written first so it can change
+#without breaking older payloads, and base64 turns the bytes into a string the JSON transports can carry.
+import base64
+from itertools import accumulate
+
+POINT_SCALE = 16      # Steps per scene unit, 1/16 of a pixel at 100% zoom
+
+
+def write_varint(out, value):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def encode_points(points, scale=POINT_SCALE):
+    """Encode a list of (x, y) tuples"""
+    out = bytearray()
+    write_varint(out, scale)
+    last_x = last_y = 0
+    for x, y in points:
+        x = round(x * scale)
+        y = round(y * scale)
+        for delta in (x - last_x, y - last_y):
+            write_varint(out, delta << 1 if delta >= 0 else (-delta << 1) - 1)
+        last_x, last_y = x, y
+    return bytes(out)
+
+
+#Most values take one or two bytes, so a value's continuation bytes are read in an inner loop rather than
+#carrying the shift through every byte
+def read_varints(data):
+    values = []
+    append = values.append
+    remaining = iter(data)
+    for byte in remaining:
+        if byte < 0x80:
+            append(byte)
+            continue
+        value = byte & 0x7F
+        shift = 7
+        for byte in remaining:
+            if byte < 0x80:
+                value |= byte << shift
+                break
+            value |= (byte & 0x7F) << shift
+            shift += 7
+        append(value)
+    return values
+
+
+def decode_points(data):
+    """Decode bytes from encode_points back into a list of (x, y) tuples"""
+    values = read_varints(data)
+    if not values:
+        return []
+
+    scale = values[0]
+    # Zigzag back to signed deltas, then running sums of the x and the y deltas give the coordinates
+    deltas = [(value >> 1) ^ -(value & 1) for value in values[1:len(values) - (len(values) - 1) % 2]]
+    return [(x / scale, y / scale) for x, y in zip(accumulate(deltas[0::2]), accumulate(deltas[1::2]))]
+
+
+def pack_points(points):
+    """Encode a list of (x, y) tuples as a base64 string"""
+    return base64.b64encode(encode_points(points)).decode('ascii')
+
+
+def unpack_points(text):
+    return decode_points(base64.b64decode(text))
+
+
+#Points of an action that carries either packed point_data or the older list of {'x': ..., 'y': ...} dicts
+def read_points(point_data, points):
+    if point_data:
+        return unpack_points(point_data)
+    return [(point['x'], point['y']) for point in points or ()]
@@ -0,0 +1,242 @@
+import time
+
+from PySide6.QtCore import QObject, QPointF, QRectF, QTimer, Qt, Signal
+from PySide6.QtGui import QColor, QFont, QFontMetrics, QPolygonF
+
+from WhiteboardApplication.sync_queue import SyncQueue
+
+# Outline of the cursor arrow in device pixels, the tip is at the cursor position
+ARROW = QPolygonF([QPointF(0, 0), QPointF(0, 16), QPointF(4, 12), QPointF(7, 19), QPointF(10, 18),
+                   QPointF(7, 11), QPointF(12, 11)])
+LABEL_FONT = QFont("Arial", 8)
+LABEL_OFFSET = QPointF(12, 16)
+CURSOR_EXTENT = (200, 40)    # Device pixels that cover the arrow and its label
+
+
+class RemoteCursor:
+    """Where another user's pointer is shown, moving smoothly from where it was towards their latest update"""
+
+    def __init__(self, user, position, now):
+        self.user = user
+        self.label = user.split('@')[0]
+        self.tool = None
+        self.color = QColor("#000000")
+        self.start = position
+        self.target = position
+        self.moved_at = now
+        self.heard_at = now
+
+    #Position at time now, linearly interpolated over duration seconds after the last update arrived
+    def position(self, now, duration):
+        progress = min(1.0, (now - self.moved_at) / duration) if duration > 0 else 1.0
+        return self.start + (self.target - self.start) * progress
+
+    def moving(self, now, duration):
+        return self.start != self.target and now - self.moved_at < duration
+
+
+class PresenceChannel(QObject):
+    """Other users' cursors, tools and colours, sent outside the action log so they never reach its replay
+
+    Local pointer moves are throttled to one update every SEND_INTERVAL ms, only the newest waiting update is sent.
+    Remote cursors glide to each update over INTERPOLATION ms on the GUI thread, so 15 updates a second look smooth,
+    and disappear when their user leaves or hasn't been heard from for STALE_AFTER seconds.
+    """
+
+    participants_changed = Signal(list)    # User ids currently in the meeting besides this one
+    presence_received = Signal(dict)       # Carries updates from the transport's thread to the GUI thread
+    user_left = Signal(str)                # User id of someone who left or hasn't been heard from for STALE_AFTER
+
+    SEND_INTERVAL = 66         # ms between updates sent, about 15 a second
+    HEARTBEAT = 3000           # ms between updates sent while nothing changes, so others know we're still here
+    STALE_AFTER = 10.0         # Seconds without an update before a remote cursor is dropped
+    INTERPOLATION = 100        # ms a remote cursor takes to glide to its latest position
+    FRAME_INTERVAL = 16        # ms between frames while a remote cursor is gliding
+
+    def __init__(self, scene, user_id, transport):
+        super().__init__()
+        self.scene = scene
+        self.user_id = user_id
+        self.transport = transport
+
+        # What we last told the others and what we'll tell them next
+        self.local = {'user': user_id}
+        self.closed = False
+        self.last_sent = None
+        self.last_send_time = 0.0
+        self.send_timer = QTimer(self)
+        self.send_timer.setSingleShot(True)
+        self.send_timer.timeout.connect(self.send_update)
+        self.heartbeat_timer = QTimer(self)
+        self.heartbeat_timer.setInterval(self.HEARTBEAT)
+        self.heartbeat_timer.timeout.connect(self.send_heartbeat)
+        # Only the newest update is ever waiting, the queue's worker thread keeps sends off the GUI thread.
+        # The sender holds the transport rather than self, so this QObject is never released on the worker thread.
+        send_presence = transport.send_presence
+        self.outbound = SyncQueue(lambda updates: send_presence(updates[-1]))
+
+        self.cursors = {}
+        self.frame_timer = QTimer(self)
+        self.frame_timer.setInterval(self.FRAME_INTERVAL)
+        self.frame_timer.timeout.connect(self.animate)
+        self.stale_timer = QTimer(self)
+        self.stale_timer.setInterval(1000)
+        self.stale_timer.timeout.connect(self.drop_stale)
+        self.presence_received.connect(self.apply_update)
+
+    def start(self):
+        """Start listening for other users' presence and announce ours"""
+        if self.closed:
+            return
+        self.transport.listen_presence(self.presence_received.emit)
+        self.heartbeat_timer.start()
+        self.stale_timer.start()
+        self.send_heartbeat()
+
+    #Records a change to the local pointer (x, y), tool or color, it goes out with the next throttled update
+    def update(self, **fields):
+        self.local.update(fields)
+        if self.closed or self.local == self.last_sent or self.send_timer.isActive():
+            return
+        wait = self.SEND_INTERVAL - (time.monotonic() - self.last_send_time) * 1000
+        if wait <= 0:
+            self.send_update()
+        else:
+            self.send_timer.start(int(wait))
+
+    def move_cursor(self, position):
+        self.update(x=round(position.x(), 1), y=round(position.y(), 1))
+
+    def send_update(self):
+        if self.local == self.last_sent:
+            return
+        self.send_heartbeat()
+
+    def send_heartbeat(self):
+        self.last_sent = dict(self.local)
+        self.last_send_time = time.monotonic()
+        self.outbound.put(self.last_sent, 'presence', urgent=True)
+
+    def close(self, timeout=2.0):
+        """Tell the others we're gone and stop sending"""
+        self.closed = True
+        for timer in (self.send_timer, self.heartbeat_timer, self.frame_timer, self.stale_timer):
+            timer.stop()
+        self.outbound.put({'user': self.user_id, 'gone': True}, 'presence', urgent=True)
+        self.outbound.flush(timeout)
+        self.outbound.close(timeout)
+        self.clear()
+
+    def apply_update(self, presence):
+        """Move, restyle or remove the cursor of the user an update came from, runs on the GUI thread"""
+        user = presence.get('user')
+        if not user or user == self.user_id:
+            return
+        now = time.monotonic()
+        cursor = self.cursors.get(user)
+        if presence.get('gone'):
+            if cursor is not None:
+                self.remove_cursor(user)
+            self.user_left.emit(user)
+            return
+
+        joined = cursor is None
+        if 'x' in presence and 'y' in presence:
+            target = QPointF(presence['x'], presence['y'])
+            if joined:
+                cursor = RemoteCursor(user, target, now)
+            elif cursor.target is None:
+                cursor.start = cursor.target = target
+            else:
+                self.repaint(cursor, now)
+                cursor.start = cursor.position(now, self.INTERPOLATION / 1000)
+                cursor.target = target
+                cursor.moved_at = now
+                if not self.frame_timer.isActive():
+                    self.frame_timer.start()
+        elif joined:
+            # Someone who hasn't moved their pointer over the board yet
+            cursor = RemoteCursor(user, None, now)
+        cursor.heard_at = now
+        cursor.tool = presence.get('tool', cursor.tool)
+        if presence.get('color'):
+            cursor.color = QColor(presence['color'])
+        self.cursors[user] = cursor
+        self.repaint(cursor, now)
+        if joined:
+            self.participants_changed.emit(self.participants())
+
+    def participants(self):
+        return sorted(self.cursors)
+
+    def remove_cursor(self, user):
+        cursor = self.cursors.pop(user)
+        self.repaint(cursor, time.monotonic())
+        self.participants_changed.emit(self.participants())
+
+    def drop_stale(self):
+        now = time.monotonic()
+        for user in [user for user, cursor in self.cursors.items() if now - cursor.heard_at > self.STALE_AFTER]:
+            self.remove_cursor(user)
+            self.user_left.emit(user)
+
+    def clear(self):
+        for user in list(self.cursors):
+            self.remove_cursor(user)
+
+    def animate(self):
+        now = time.monotonic()
+        duration = self.INTERPOLATION / 1000
+        moving = False
+        for cursor in self.cursors.values():
+            if cursor.target is not None and cursor.start != cursor.target:
+                # The frame before the cursor stops has to be cleared too
+                self.repaint(cursor, now - self.FRAME_INTERVAL / 1000)
+                self.repaint(cursor, now)
+                if cursor.moving(now, duration):
+                    moving = True
+                else:
+                    cursor.start = cursor.target
+        if not moving:
+            self.frame_timer.stop()
+
+    #Scene rect a cursor covers at time now, the cursor is drawn at a fixed size on screen so it depends on the zoom
+    def cursor_rect(self, cursor, now):
+        position = cursor.position(now, self.INTERPOLATION / 1000)
+        scale = min((view.transform().m11() for view in self.scene.views()), default=1.0) or 1.0
+        width, height = CURSOR_EXTENT
+        return QRectF(position.x() - 2 / scale, position.y() - 2 / scale, width / scale, height / scale)
+
+    def repaint(self, cursor, now):
+        if cursor.target is not None:
+            self.scene.update(self.cursor_rect(cursor, now))
+
+    def paint(self, painter, rect):
+        """Draw the remote cursors, called from the scene's drawForeground"""
+        if not self.cursors:
+            return
+        now = time.monotonic()
+        duration = self.INTERPOLATION / 1000
+        transform = painter.transform()
+        painter.save()
+        # Drawn in device pixels so cursors keep their size at any zoom
+        painter.resetTransform()
+        painter.setFont(LABEL_FONT)
+        metrics = QFontMetrics(LABEL_FONT)
+        for cursor in self.cursors.values():
+            if cursor.target is None:
+                continue
+            if not rect.intersects(self.cursor_rect(cursor, now)):
+                continue
+            tip = transform.map(cursor.position(now, duration))
+            painter.setPen(Qt.GlobalColor.white)
+            painter.setBrush(cursor.color)
+            painter.drawPolygon(ARROW.translated(tip))
+
+            label = cursor.label if not cursor.tool else f"{cursor.label} ({cursor.tool})"
+            box = QRectF(tip + LABEL_OFFSET, metrics.size(0, label)).adjusted(-3, -1, 3, 1)
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.drawRoundedRect(box, 3, 3)
+            painter.setPen(Qt.GlobalColor.white if cursor.color.lightness() < 160 else Qt.GlobalColor.black)
+            painter.drawText(box, Qt.AlignmentFlag.AlignCenter, label)
+        painter.restore()
@@ -0,0 +1,133 @@
+import math
+
+
+class RadialFilter:
+    """Cheap filter used while drawing, drops points closer than the tolerance to the last kept point"""
+
+    def __init__(self, tolerance):
+        self.tolerance = tolerance
+        self.last_point = None
+
+    def reset(self, point):
+        self.last_point = point
+
+    def accept(self, point):
+        if self.last_point is not None and \
+                math.hypot(point[0] - self.last_point[0], point[1] - self.last_point[1]) < self.tolerance:
+            return False
+        self.last_point = point
+        return True
+
+
+class DouglasPeuckerFilter:
+    """Filter used on release, removes points that stay within the tolerance of the simplified polyline.
+
+    This also takes care of nearly collinear runs of points, which is what an angle threshold would catch.
+    """
+
+    def __init__(self, tolerance):
+        self.tolerance = tolerance
+
+    def apply(self, points):
+        return simplify_rdp(points, self.tolerance)
+
+
+#Distance from a point to the segment start -> end
+def segment_distance(point, start, end):
+    dx = end[0] - start[0]
+    dy = end[1] - start[1]
+    length_squared = dx * dx + dy * dy
+    if length_squared == 0:
+        return math.hypot(point[0] - start[0], point[1] - start[1])
+
+    t = ((point[0] - start[0]) * dx + (point[1] - start[1]) * dy) / length_squared
+    t = max(0.0, min(1.0, t))
+    return math.hypot(point[0] - (start[0] + t * dx), point[1] - (start[1] + t * dy))
+
+
+#Ramer-Douglas-Peucker simplification, uses a stack instead of recursion so long strokes can't hit the recursion limit
+def simplify_rdp(points, epsilon):
+    if len(points) < 3 or epsilon <= 0:
+        return list(points)
+
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+
+    while stack:
+        first, last = stack.pop()
+        max_distance = 0.0
+        index = first
+        for i in range(first + 1, last):
+            distance = segment_distance(points[i], points[first], points[last])
+            if distance > max_distance:
+                max_distance = distance
+                index = i
+
+        if max_distance > epsilon:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+
+    return [point for point, kept in zip(points, keep) if kept]
+
+
+#Fits a Catmull-Rom spline through the points and returns it as cubic bezier segments (control1, control2, end)
+def catmull_rom_segments(points):
+    segments = []
+    for i in range(len(points) - 1):
+        p0 = points[i - 1] if i > 0 else points[i]
+        p1 = points[i]
+        p2 = points[i + 1]
+        p3 = points[i + 2] if i + 2 < len(points) else p2
+
+        control1 = (p1[0] + (p2[0] - p0[0]) / 6, p1[1] + (p2[1] - p0[1]) / 6)
+        control2 = (p2[0] - (p3[0] - p1[0]) / 6, p2[1] - (p3[1] - p1[1]) / 6)
+        segments.append((control1, control2, p2))
+    return segments
+
+
+class StrokeFilterPipeline:
+    """Sits between the mouse events and the stroke path.
+
+    Live filters need reset(point) and accept(point) and run on every mouse move,
+    release filters need apply(points) and run once on the finished stroke.
+    Points are (x, y) tuples. Extra stages can be appended to either list.
+    """
+
+    def __init__(self, tolerance=0.75, smoothing=False):
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.live_filters = [RadialFilter(tolerance)]
+        self.release_filters = [DouglasPeuckerFilter(tolerance)]
+
+        # Last point a live filter dropped, kept so the stroke still ends where the mouse was released
+        self.pending_point = None
+
+    def set_tolerance(self, tolerance):
+        self.tolerance = tolerance
+        for stage in self.live_filters + self.release_filters:
+            if hasattr(stage, 'tolerance'):
+                stage.tolerance = tolerance
+
+    def begin(self, point):
+        self.pending_point = None
+        for stage in self.live_filters:
+            stage.reset(point)
+
+    def accept(self, point):
+        if all(stage.accept(point) for stage in self.live_filters):
+            self.pending_point = None
+            return True
+        self.pending_point = point
+        return False
+
+    def finish(self, points):
+        points = list(points)
+        if self.pending_point is not None:
+            points.append(self.pending_point)
+            self.pending_point = None
+
+        for stage in self.release_filters:
+            points = stage.apply(points)
+        return points
@@ -0,0 +1,172 @@
+import math
+
+from WhiteboardApplication.stroke_filters import segment_distance
+from WhiteboardApplication.stroke_item import StrokeItem
+
+# Segments closer than this to the edge of the eraser's reach don't count as hit. The pieces a cut leaves end on
+# the edge of the circle, without it every later sample along that edge would hit them again
+EDGE_TOLERANCE = 1e-6
+
+
+#Returns the polylines of a path item in scene coordinates as lists of (x, y) tuples
+def item_polylines(item):
+    if isinstance(item, StrokeItem):
+        polylines = [item.points]
+    else:
+        polylines = [[(point.x(), point.y()) for point in polygon] for polygon in item.path().toSubpathPolygons()]
+
+    transform = item.sceneTransform()
+    if transform.isIdentity():
+        return polylines
+    return [[transform.map(x, y) for x, y in polyline] for polyline in polylines]
+
+
+#Orientation of the triangle a, b, c, positive when counter-clockwise
+def cross(a, b, c):
+    return (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])
+
+
+#Shortest distance between the segments a -> b and c -> d
+def segments_distance(a, b, c, d):
+    d1, d2 = cross(c, d, a), cross(c, d, b)
+    d3, d4 = cross(a, b, c), cross(a, b, d)
+    if ((d1 > 0 > d2) or (d1 < 0 < d2)) and ((d3 > 0 > d4) or (d3 < 0 < d4)):
+        return 0.0
+    return min(segment_distance(a, c, d), segment_distance(b, c, d),
+               segment_distance(c, a, b), segment_distance(d, a, b))
+
+
+#Parameter range [t0, t1] of the segment a -> b that lies inside the circle, or None if it misses
+def circle_interval(a, b, center, radius):
+    dx, dy = b[0] - a[0], b[1] - a[1]
+    fx, fy = a[0] - center[0], a[1] - center[1]
+    qa = dx * dx + dy * dy
+    qc = fx * fx + fy * fy - radius * radius
+    if qa == 0:
+        return (0.0, 1.0) if qc < 0 else None
+
+    qb = 2 * (fx * dx + fy * dy)
+    discriminant = qb * qb - 4 * qa * qc
+    if discriminant <= 0:
+        return None
+
+    root = math.sqrt(discriminant)
+    t0 = (-qb - root) / (2 * qa)
+    t1 = (-qb + root) / (2 * qa)
+    if t1 <= 0 or t0 >= 1:
+        return None
+    return max(t0, 0.0), min(t1, 1.0)
+
+
+#Cuts the circle out of a polyline and returns the pieces left outside it
+def split_polyline(points, center, radius):
+    def lerp(a, b, t):
+        return a[0] + (b[0] - a[0]) * t, a[1] + (b[1] - a[1]) * t
+
+    if len(points) == 1:
+        return [] if circle_interval(points[0], points[0], center, radius) else [list(points)]
+
+    pieces = []
+    current = [points[0]]
+    for a, b in zip(points, points[1:]):
+        interval = circle_interval(a, b, center, radius)
+        if interval is None:
+            current.append(b)
+            continue
+
+        t0, t1 = interval
+        if t0 > 0:
+            current.append(lerp(a, b, t0))
+        if len(current) > 1:
+            pieces.append(current)
+        current = [lerp(a, b, t1), b] if t1 < 1 else []
+
+    if len(current) > 1:
+        pieces.append(current)
+    return pieces
+
+
+class StrokeIndex:
+    """Uniform grid over stroke segments used for eraser hit-testing.
+
+    Each cell maps an item to the segments of that item passing through the cell,
+    so a query only measures the segments near the eraser instead of whole strokes.
+    """
+
+    def __init__(self, cell_size=64):
+        self.cell_size = cell_size
+        self.cells = {}          # (column, row) -> {item: [segment index, ...]}
+        self.item_cells = {}     # item -> set of cells it is stored in
+        self.item_segments = {}  # item -> [(start, end), ...]
+        self.item_widths = {}    # item -> half of the pen width
+
+    def __len__(self):
+        return len(self.item_segments)
+
+    def __contains__(self, item):
+        return item in self.item_segments
+
+    def cell_range(self, left, top, right, bottom):
+        size = self.cell_size
+        for column in range(math.floor(left / size), math.floor(right / size) + 1):
+            for row in range(math.floor(top / size), math.floor(bottom / size) + 1):
+                yield column, row
+
+    def insert(self, item, polylines, width=0):
+        if item in self.item_segments:
+            self.remove(item)
+
+        half_width = width / 2
+        segments = []
+        for polyline in polylines:
+            if len(polyline) == 1:
+                segments.append((polyline[0], polyline[0]))
+            segments.extend(zip(polyline, polyline[1:]))
+
+        cells = set()
+        for index, (start, end) in enumerate(segments):
+            for cell in self.cell_range(min(start[0], end[0]) - half_width, min(start[1], end[1]) - half_width,
+                                        max(start[0], end[0]) + half_width, max(start[1], end[1]) + half_width):
+                self.cells.setdefault(cell, {}).setdefault(item, []).append(index)
+                cells.add(cell)
+
+        self.item_cells[item] = cells
+        self.item_segments[item] = segments
+        self.item_widths[item] = half_width
+
+    def remove(self, item):
+        for cell in self.item_cells.pop(item, ()):
+            bucket = self.cells[cell]
+            del bucket[item]
+            if not bucket:
+                del self.cells[cell]
+        self.item_segments.pop(item, None)
+        self.item_widths.pop(item, None)
+
+    def clear(self):
+        self.cells.clear()
+        self.item_cells.clear()
+        self.item_segments.clear()
+        self.item_widths.clear()
+
+    #Returns the items with a segment within radius of the point, counting the pen width
+    def query(self, point, radius):
+        return self.query_segment(point, point, radius)
+
+    #Returns the items with a segment within radius of the segment start -> end, used for dragging the eraser.
+    #A segment only touching the edge of the reach is not a hit
+    def query_segment(self, start, end, radius):
+        hits = []
+        checked = set()
+        for cell in self.cell_range(min(start[0], end[0]) - radius, min(start[1], end[1]) - radius,
+                                    max(start[0], end[0]) + radius, max(start[1], end[1]) + radius):
+            for item, segment_indexes in self.cells.get(cell, {}).items():
+                if item in checked:
+                    continue
+
+                segments = self.item_segments[item]
+                reach = radius + self.item_widths[item] - EDGE_TOLERANCE
+                if any(segments_distance(start, end, *segments[index]) < reach for index in segment_indexes):
+                    hits.append(item)
+                    checked.add(item)
+        return hits
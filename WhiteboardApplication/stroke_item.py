@@ -0,0 +1,44 @@
+from PySide6.QtCore import QPointF
+from PySide6.QtGui import QPainterPath
+from PySide6.QtWidgets import QGraphicsPathItem
+
+from WhiteboardApplication.stroke_filters import catmull_rom_segments
+
+
+#Builds a path from a list of (x, y) tuples, either as a polyline or as a smooth curve through the points
+def build_stroke_path(points, smooth=False):
+    path = QPainterPath()
+    if not points:
+        return path
+
+    path.moveTo(QPointF(*points[0]))
+    if smooth and len(points) > 2:
+        for control1, control2, end in catmull_rom_segments(points):
+            path.cubicTo(QPointF(*control1), QPointF(*control2), QPointF(*end))
+    else:
+        for x, y in points[1:]:
+            path.lineTo(x, y)
+    return path
+
+
+class StrokeItem(QGraphicsPathItem):
+    """A committed pen or highlighter stroke that remembers the points it was drawn from"""
+
+    #A path already built from the points can be passed in to skip rebuilding it
+    def __init__(self, points=None, pen=None, highlighter=False, smooth=False, path=None):
+        super().__init__()
+
+        self.points = list(points) if points else []
+        self.highlighter = highlighter
+        self.smooth = smooth
+        # Set by the scene when this stroke is drawn from its raster tiles instead of as a vector item
+        self.tile_cached = False
+
+        if pen is not None:
+            self.setPen(pen)
+        self.setPath(build_stroke_path(self.points, smooth) if path is None else path)
+
+    def paint(self, painter, option, widget=None):
+        if self.tile_cached and not self.isSelected():
+            return
+        super().paint(painter, option, widget)
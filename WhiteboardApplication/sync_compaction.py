@@ -0,0 +1,336 @@
+#Folds a meeting's action log into its net effect, used by the host client and the relay to keep the log short
+#Replaying the compacted log gives the same board as replaying the original one, but:
+#  - strokes that were erased or undone are dropped, along with erasers that only touched dropped strokes
+#  - text box moves and content edits are folded into the text box's create action, or only the latest is kept.
+#    Actions carrying board_crdt operations (and textbox_edit, which only has operations) keep every text operation
+#    and the move with the highest stamp.
+#  - undo/redo pairs that cancel out are dropped, an undo that takes back out whole strokes or text boxes created in
+#    the log drops them along with it
+#  - chunks streamed while a stroke was drawn are dropped once the finished stroke is in the log
+#Actions are dicts as sent by WhiteboardSync, any extra keys (like 'seq') are passed through untouched.
+#Erasers that list the ids of the strokes they removed (and, for the pixel eraser, carry the pieces it left) are
+#followed exactly, otherwise hits are worked out with the same StrokeIndex and cutting code the scene uses, including
+#how it names the pieces of a cut stroke.
+import base64
+import itertools
+import math
+
+from WhiteboardApplication.board_crdt import stamp_of
+from WhiteboardApplication.notebook_format import RECORD_STROKE, stroke_geometry
+from WhiteboardApplication.point_codec import read_points
+from WhiteboardApplication.stroke_index import StrokeIndex, split_polyline
+from WhiteboardApplication.undo_history import read_packed
+
+ERASER_RADIUS = 10      # BoardScene.eraser_radius
+KEEP_RECENT = 500       # Newest actions left as they are, so a client reconnecting after a short drop still
+                        # finds the actions it missed
+
+STROKE_TYPES = ('pen', 'highlighter')
+UNDO_FIELDS = ('points', 'point_data', 'color', 'size', 'text_content', 'text_position', 'text_id', 'item_id')
+
+
+def points_of(action):
+    return read_points(action.get('point_data'), action.get('points'))
+
+
+#What identifies an undo and the redo that cancels it: the ids it takes off and puts back, for older clients the
+#fields of the action undone
+def undo_payload(action):
+    if action.get('item_ids') is not None:
+        return tuple(action['item_ids']), tuple(action.get('restored_ids') or ())
+    return tuple(action.get(name) for name in UNDO_FIELDS)
+
+
+def redo_payload(action):
+    if action.get('item_ids') is not None:
+        return tuple(action.get('restored_ids') or ()), tuple(action['item_ids'])
+    return undo_payload(action)
+
+
+#board_crdt operations of two actions as one list, of the moves only the one that wins is needed
+def merge_ops(ops, later):
+    merged = [op for op in (ops or []) + later if op['op'] != 'move']
+    moves = [op for op in (ops or []) + later if op['op'] == 'move']
+    if moves:
+        merged.append(max(moves, key=lambda op: stamp_of(op['stamp'])))
+    return merged
+
+
+def move_stamp(action):
+    return max((stamp_of(op['stamp']) for op in action.get('ops') or () if op['op'] == 'move'), default=None)
+
+
+class LogFolder:
+    """Replays actions onto a model of the board just detailed enough to tell which actions still matter"""
+
+    def __init__(self, eraser_radius=ERASER_RADIUS):
+        self.eraser_radius = eraser_radius
+        self.out = []                 # Kept actions in log order, None once dropped
+        self.index = StrokeIndex()
+        self.piece_keys = itertools.count()
+        self.pieces = {}              # piece key -> (position of the stroke it came from, points, pen width, id)
+        self.piece_ids = {}           # scene id -> piece key
+        self.families = {}            # stroke position -> keys of its pieces still on the board
+        self.touched = {}             # eraser position -> stroke positions it erased or cut
+        self.creates = {}             # text id -> position of its create action
+        self.edits = {}               # (type, text id) -> position of the latest edit of a text box not created here
+        self.chunks = {}              # stroke id -> positions of the chunks streamed while it was drawn
+        self.undone = {}              # user id -> stack of ('dropped', action dropped, payload) or
+                                      # ('kept', undo position, payload)
+
+    def add(self, action):
+        position = len(self.out)
+        self.out.append(action)
+        return position
+
+    def add_piece(self, family, points, width, item_id):
+        key = next(self.piece_keys)
+        self.pieces[key] = (family, points, width, item_id)
+        if item_id is not None:
+            self.piece_ids[item_id] = key
+        self.families[family].add(key)
+        self.index.insert(key, [points], width)
+
+    def remove_piece(self, key):
+        family, _points, _width, item_id = self.pieces.pop(key)
+        if item_id is not None and self.piece_ids.get(item_id) == key:
+            del self.piece_ids[item_id]
+        self.families[family].discard(key)
+        self.index.remove(key)
+        return family
+
+    def fold(self, action):
+        action_type = action.get('action_type')
+        if action_type in STROKE_TYPES:
+            self.draw(action)
+        elif action_type == 'stroke_chunk':
+            self.chunks.setdefault(action.get('item_id'), []).append(self.add(action))
+        elif action_type == 'eraser':
+            self.erase(action)
+        elif action_type == 'pixel_eraser':
+            self.cut(action)
+        elif action_type == 'textbox_create':
+            self.creates[action.get('text_id')] = self.add(action)
+        elif action_type in ('textbox_move', 'textbox_content', 'textbox_edit'):
+            self.edit(action)
+        elif action_type == 'undo':
+            self.undo(action)
+        elif action_type == 'redo':
+            self.redo(action)
+        else:
+            self.add(action)
+
+    def draw(self, action):
+        for position in self.chunks.pop(action.get('item_id'), ()):
+            self.out[position] = None
+        points = points_of(action)
+        if not points:
+            return
+        position = self.add(action)
+        self.families[position] = set()
+        self.add_piece(position, points, action.get('size') or 0, action.get('item_id'))
+
+    #Same segments as BoardScene.erase_path
+    def erase(self, action):
+        touched = set()
+        if action.get('item_ids') is not None:
+            for item_id in action['item_ids']:
+                key = self.piece_ids.get(item_id)
+                if key is not None:
+                    touched.add(self.remove_piece(key))
+        else:
+            points = points_of(action)
+            segments = [(points[0], points[0])] if len(points) == 1 else list(zip(points, points[1:]))
+            for start, end in segments:
+                for key in self.index.query_segment(start, end, self.eraser_radius):
+                    touched.add(self.remove_piece(key))
+        if touched:
+            self.touched[self.add(action)] = touched
+
+    #Swaps the strokes a pixel eraser names for the pieces it carries, for older clients' actions the same sampling
+    #and cutting as BoardScene.cut_path
+    def cut(self, action):
+        if action.get('item_ids') is not None:
+            self.cut_by_id(action)
+            return
+
+        points = points_of(action)
+        segments = [(points[0], points[0])] if len(points) == 1 else list(zip(points, points[1:]))
+        touched = set()
+        for start, end in segments:
+            length = math.hypot(end[0] - start[0], end[1] - start[1])
+            steps = max(1, math.ceil(length / (self.eraser_radius / 2)))
+            for step in range(steps + 1):
+                t = step / steps
+                center = (start[0] + (end[0] - start[0]) * t, start[1] + (end[1] - start[1]) * t)
+                for key in self.index.query(center, self.eraser_radius):
+                    _family, piece, width, item_id = self.pieces[key]
+                    split = split_polyline(piece, center, self.eraser_radius + width / 2)
+                    if split == [list(piece)]:
+                        continue
+                    family = self.remove_piece(key)
+                    touched.add(family)
+                    for number, remaining in enumerate(split):
+                        self.add_piece(family, remaining, width, None if item_id is None else f"{item_id}.{number}")
+        if touched:
+            self.touched[self.add(action)] = touched
+
+    #A piece belongs to the family of the cut strokes that share the start of its id, see BoardScene.cut_item
+    def cut_by_id(self, action):
+        families = {}
+        for item_id in action['item_ids']:
+            key = self.piece_ids.get(item_id)
+            if key is not None:
+                families[item_id] = self.remove_piece(key)
+
+        records = read_packed(base64.b64decode(action['item_data']))[0] if action.get('item_data') else {}
+        for item_id in action.get('restored_ids') or ():
+            root = item_id.split(".")[0]
+            family = next((family for cut_id, family in families.items() if cut_id.split(".")[0] == root), None)
+            record_type, payload = records.get(item_id, (None, None))
+            if family is not None and record_type == RECORD_STROKE:
+                points, width = stroke_geometry(payload)
+                self.add_piece(family, points, width, item_id)
+        if families:
+            self.touched[self.add(action)] = set(families.values())
+
+    #An edit of a text box created in this log is folded into its create action, otherwise the latest edit of each
+    #kind replaces the earlier ones since every edit carries the whole position or text
+    def edit(self, action):
+        text_id = action.get('text_id')
+        ops = action.get('ops')
+        create = self.creates.get(text_id)
+        if create is not None:
+            field = 'text_position' if action['action_type'] == 'textbox_move' else 'text_content'
+            folded = self.out[create]
+            if ops is None:
+                self.out[create] = dict(folded, **{field: action.get(field)})
+                return
+            folded = dict(folded, ops=merge_ops(folded.get('ops'), ops))
+            if action['action_type'] == 'textbox_content':
+                folded['text_content'] = action.get('text_content')
+            elif action['action_type'] == 'textbox_move':
+                # A move with a newer stamp may have come first
+                x, y = next(op['position'] for op in folded['ops'] if op['op'] == 'move')
+                folded['text_position'] = {'x': x, 'y': y}
+            self.out[create] = folded
+            return
+
+        key = (action['action_type'], text_id)
+        previous = self.edits.get(key)
+        if previous is not None:
+            if ops is not None:
+                earlier = self.out[previous]
+                stamp, earlier_stamp = move_stamp(action), move_stamp(earlier)
+                if stamp is not None and earlier_stamp is not None and stamp < earlier_stamp:
+                    return
+                action = dict(action, ops=merge_ops(earlier.get('ops'), ops))
+            self.out[previous] = None
+        self.edits[key] = self.add(action)
+
+    #Undoing strokes that are still whole or text boxes created in this log drops the undo and what it undid,
+    #anything else is kept as it is
+    def undo(self, action):
+        stack = self.undone.setdefault(action.get('user_id'), [])
+        target = self.find_undo_target(action)
+        if target is None:
+            stack.append(('kept', self.add(action), undo_payload(action)))
+            return
+
+        undone = self.out[target]
+        if undone['action_type'] in STROKE_TYPES:
+            for key in list(self.families[target]):
+                self.remove_piece(key)
+        else:
+            del self.creates[undone['text_id']]
+            self.out[target] = None
+        stack.append(('dropped', undone, undo_payload(action)))
+
+    #Position of the action an undo takes back out, or None if it can't be folded
+    def find_undo_target(self, action):
+        if action.get('item_ids') is None:
+            return self.find_fields_target(action)
+        # Putting back what an erase took off can't be folded, the erased items may be gone from the log. The
+        # action undone comes back in a matching redo's place under the redo's seq, so only one is folded.
+        if action.get('restored_ids') or len(action['item_ids']) != 1:
+            return None
+        item_id = action['item_ids'][0]
+        position = self.creates.get(item_id)
+        if position is None:
+            key = self.piece_ids.get(item_id)
+            if key is None:
+                return None
+            position = self.pieces[key][0]
+            # A stroke the eraser already cut can't be taken back out whole
+            if self.families[position] != {key} or self.out[position].get('item_id') != item_id:
+                return None
+        if self.out[position].get('user_id') != action.get('user_id'):
+            return None
+        return position
+
+    #Older clients' undo actions carry the fields of the action they undo
+    def find_fields_target(self, action):
+        user_id = action.get('user_id')
+        text_id = action.get('text_id')
+        if text_id is not None:
+            # Only a create carries both the text and the position
+            if action.get('text_content') is None or action.get('text_position') is None:
+                return None
+            position = self.creates.get(text_id)
+            if position is not None and self.out[position].get('user_id') == user_id:
+                return position
+            return None
+
+        item_id = action.get('item_id')
+        points = points_of(action)
+        if not points:
+            return None
+        for position in range(len(self.out) - 1, -1, -1):
+            candidate = self.out[position]
+            if candidate is None or candidate.get('action_type') not in STROKE_TYPES:
+                continue
+            if item_id is not None:
+                matches = candidate.get('item_id') == item_id
+            else:
+                matches = candidate.get('user_id') == user_id and candidate.get('color') == action.get('color') and \
+                    candidate.get('size') == action.get('size') and points_of(candidate) == points
+            if matches:
+                # A stroke the eraser already cut can't be taken back out whole
+                family = self.families[position]
+                if len(family) == 1 and self.pieces[next(iter(family))][1] == points:
+                    return position
+        return None
+
+    #A redo matching the user's last undo cancels it, a dropped action comes back in the redo's place
+    def redo(self, action):
+        stack = self.undone.get(action.get('user_id'))
+        if not stack or stack[-1][2] != redo_payload(action):
+            self.add(action)
+            return
+
+        kind, value, _payload = stack.pop()
+        if kind == 'kept':
+            self.out[value] = None
+        elif 'seq' in action:
+            self.fold(dict(value, seq=action['seq']))
+        else:
+            self.fold(value)
+
+    def result(self):
+        for position, keys in self.families.items():
+            if not keys:
+                self.out[position] = None
+        for position, families in self.touched.items():
+            if all(self.out[family] is None for family in families):
+                self.out[position] = None
+        return [action for action in self.out if action is not None]
+
+
+#Returns the compacted list of actions, the newest keep_recent are appended unchanged
+def compact_actions(actions, keep_recent=0, eraser_radius=ERASER_RADIUS):
+    actions = list(actions)
+    split = max(0, len(actions) - keep_recent)
+    folder = LogFolder(eraser_radius)
+    for action in actions[:split]:
+        folder.fold(action)
+    return folder.result() + actions[split:]
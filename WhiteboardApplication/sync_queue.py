@@ -0,0 +1,102 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict
+
+
+class SyncQueue:
+    """Outbound queue for sync actions, sent in batches from a worker thread so the GUI never waits on the network"""
+
+    BATCH_INTERVAL = 0.05     # Seconds to gather actions after the first one arrives before sending
+    MAX_BATCH = 200           # Actions per send
+    RETRY_DELAY = 1.0         # Seconds before a failed batch is sent again
+
+    #send is called on the worker thread with a list of action dicts, oldest first
+    def __init__(self, send):
+        self.send = send
+
+        # Key -> action, actions that supersede each other share a coalesce key and only the latest is kept
+        self.pending = OrderedDict()
+        self.unique_keys = itertools.count()
+        self.condition = threading.Condition()
+        self.sending = False
+        self.closed = False
+        self.urgent = False
+
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def __len__(self):
+        with self.condition:
+            return len(self.pending)
+
+    #Queues an action, an action with the same coalesce key still waiting to be sent is dropped and the new one
+    #goes to the back of the queue. An urgent action is sent without waiting for the rest of a batch to gather.
+    def put(self, action, coalesce_key=None, urgent=False):
+        with self.condition:
+            key = coalesce_key if coalesce_key is not None else next(self.unique_keys)
+            self.pending.pop(key, None)
+            self.pending[key] = action
+            self.urgent = self.urgent or urgent
+            self.condition.notify_all()
+
+    def take_batch(self):
+        batch = []
+        while self.pending and len(batch) < self.MAX_BATCH:
+            batch.append(self.pending.popitem(last=False))
+        return batch
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.closed:
+                    self.condition.wait()
+                if self.closed and not self.pending:
+                    return
+                # Gives quick bursts (typing, dragging) time to coalesce and share one request
+                deadline = time.monotonic() + self.BATCH_INTERVAL
+                while not self.closed and not self.urgent and time.monotonic() < deadline:
+                    self.condition.wait(deadline - time.monotonic())
+                batch = self.take_batch()
+                self.urgent = False
+                self.sending = True
+
+            try:
+                self.send([action for _key, action in batch])
+            except Exception as e:
+                if self.closed:
+                    print(f"Error sending sync actions, dropping {len(batch)} on close: {e}")
+                    continue
+                print(f"Error sending sync actions, retrying: {e}")
+                with self.condition:
+                    # Newer actions for the same coalesce key win over the failed ones
+                    for key, action in reversed(batch):
+                        if key not in self.pending:
+                            self.pending[key] = action
+                            self.pending.move_to_end(key, last=False)
+                time.sleep(self.RETRY_DELAY)
+            finally:
+                with self.condition:
+                    self.sending = False
+                    self.condition.notify_all()
+
+    #Blocks until everything queued so far has been sent, or timeout seconds have passed
+    def flush(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            while self.pending or self.sending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+        return True
+
+    def close(self, timeout=None):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join(timeout)
+        # send is usually a bound method of the queue's owner, dropping it breaks the reference cycle so the owner
+        # and its Qt objects are freed right away on this thread rather than by the garbage collector on any thread
+        if not self.thread.is_alive():
+            self.send = None
@@ -0,0 +1,199 @@
+import random
+import re
+import threading
+import time
+
+from WhiteboardApplication.sync_compaction import compact_actions, KEEP_RECENT
+
+PUSH_CHARS = '-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz'
+
+
+class SyncTransport:
+    """Carries sync actions between the clients of a meeting, WhiteboardSync talks to this instead of a backend
+
+    Every action a client receives has a 'seq' key added, its position in the meeting's log. A meeting can also
+    have a board snapshot, a dict with the 'seq' of the last action it includes. A listener is given the latest
+    snapshot first and then only the actions after it, so joining costs the size of the board rather than the
+    length of the meeting.
+
+    Presence (where each user's pointer is, their tool and colour, see presence.py) is a separate channel. It is
+    never logged or numbered and an update that can't be delivered is dropped, the next one replaces it anyway.
+    A transport without presence support leaves the two presence methods as they are.
+    """
+
+    #Sends a batch of action dicts, called on the outbound queue's worker thread and raises on failure so it's retried
+    def send(self, actions):
+        raise NotImplementedError
+
+    #Calls snapshot_callback with the meeting's snapshot if there is one, then callback with each action in the log
+    #after it and every action sent from then on, including this client's own. Both are called from any thread.
+    def listen(self, callback, snapshot_callback=None):
+        raise NotImplementedError
+
+    #Replaces the meeting's snapshot, called off the GUI thread
+    def publish_snapshot(self, snapshot):
+        raise NotImplementedError
+
+    #Folds the meeting's log into its net effect (see sync_compaction.py), called off the GUI thread by the host
+    def compact(self):
+        raise NotImplementedError
+
+    #Sends this client's presence dict to the others in the meeting, called off the GUI thread
+    def send_presence(self, presence):
+        pass
+
+    #Calls callback from any thread with every other client's presence updates, {'user': ..., 'gone': True} when
+    #one leaves
+    def listen_presence(self, callback):
+        pass
+
+    def close(self):
+        pass
+
+
+class PushKeys:
+    """Generates Firebase style push keys locally, so a batch of actions can be written with one update"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.last_time = 0
+        self.last_random = [0] * 12
+
+    # 8 characters of millisecond timestamp then 12 random ones, incremented within the same millisecond so
+    # keys sort in the order they were made
+    def next(self):
+        with self.lock:
+            now = int(time.time() * 1000)
+            if now == self.last_time:
+                for i in range(11, -1, -1):
+                    if self.last_random[i] < 63:
+                        self.last_random[i] += 1
+                        break
+                    self.last_random[i] = 0
+            else:
+                self.last_time = now
+                self.last_random = [random.randrange(64) for _ in range(12)]
+
+            time_chars = []
+            for _ in range(8):
+                time_chars.append(PUSH_CHARS[now % 64])
+                now //= 64
+            return "".join(reversed(time_chars)) + "".join(PUSH_CHARS[i] for i in self.last_random)
+
+
+class FirebaseTransport(SyncTransport):
+    """Actions stored under meetings/<id>/actions in the Firebase realtime database
+
+    The push key of an action is its 'seq'. Snapshots also carry 'keys', every push key they include.
+    """
+
+    def __init__(self, meeting_id):
+        # Imported here so the relay transport works without firebase_admin installed
+        from firebase_admin import db
+
+        self.actions_ref = db.reference(f"meetings/{meeting_id}/actions")
+        self.snapshot_ref = db.reference(f"meetings/{meeting_id}/snapshot")
+        self.presence_ref = db.reference(f"meetings/{meeting_id}/presence")
+        self.push_keys = PushKeys()
+        # Push keys of the actions already handed to the listener, in the order they were handed over
+        self.delivered = {}
+        self.delivered_lock = threading.Lock()
+        self.registration = None
+        self.presence_registration = None
+
+    def send(self, actions):
+        self.actions_ref.update({self.push_keys.next(): action for action in actions})
+
+    #Push keys come from the writer's clock, so an action from a slow clock or a slow connection can arrive after
+    #actions with newer keys. Each key is delivered once in whatever order it arrives, never skipped for being old.
+    def listen(self, callback, snapshot_callback=None):
+        # Compaction rewrites and deletes keys already delivered, those changes are only for later joiners
+        def deliver(actions):
+            for key in sorted(actions):
+                if actions[key] is None:
+                    continue
+                with self.delivered_lock:
+                    if key in self.delivered:
+                        continue
+                    self.delivered[key] = None
+                callback(dict(actions[key], seq=key))
+
+        def start():
+            snapshot = self.snapshot_ref.get()
+            if snapshot and snapshot_callback is not None:
+                snapshot_callback(snapshot)
+                # The first event holds the whole log, only the actions the snapshot doesn't include are replayed
+                with self.delivered_lock:
+                    self.delivered.update(dict.fromkeys(snapshot.get('keys') or ()))
+
+            def action_handler(event):
+                if not event.data:
+                    return
+                if event.event_type == "put" and event.path == "/":
+                    deliver(event.data)
+                elif event.event_type == "put":
+                    deliver({event.path.strip("/"): event.data})
+                elif event.event_type == "patch":
+                    # A batched update arrives as one patch with an action per push key
+                    deliver(event.data)
+
+            self.registration = self.actions_ref.listen(action_handler)
+
+        # Fetching the snapshot and opening the stream are blocking requests
+        threading.Thread(target=start, daemon=True).start()
+
+    #Keys don't arrive in key order, so the snapshot lists every key it includes rather than just the last one:
+    #the keys this client had delivered up to and including snapshot['seq'].
+    def publish_snapshot(self, snapshot):
+        with self.delivered_lock:
+            if snapshot['seq'] not in self.delivered:
+                return
+            keys = []
+            for key in self.delivered:
+                keys.append(key)
+                if key == snapshot['seq']:
+                    break
+        self.snapshot_ref.set(dict(snapshot, keys=keys))
+
+    #Each user has one presence node that every update overwrites, leaving overwrites it with the 'gone' update
+    def send_presence(self, presence):
+        self.presence_ref.child(re.sub(r'[.$#\[\]/]', '_', presence['user'])).set(presence)
+
+    def listen_presence(self, callback):
+        def presence_handler(event):
+            if event.path == "/":
+                # The first event holds every user's node, later ones a single node
+                for presence in (event.data or {}).values():
+                    callback(presence)
+            elif isinstance(event.data, dict) and 'user' in event.data:
+                callback(event.data)
+
+        def start():
+            self.presence_registration = self.presence_ref.listen(presence_handler)
+
+        threading.Thread(target=start, daemon=True).start()
+
+    #Folded actions keep their push keys, so one multi-path update deletes the dropped ones and rewrites the changed
+    #ones. Actions written meanwhile have newer keys and aren't touched.
+    def compact(self):
+        actions = self.actions_ref.get() or {}
+        keys = sorted(actions)
+        folded = keys[:max(0, len(keys) - KEEP_RECENT)]
+        changes = {key: None for key in folded}
+        for action in compact_actions(dict(actions[key], seq=key) for key in folded):
+            key = action.pop('seq')
+            if action == actions[key]:
+                del changes[key]
+            else:
+                changes[key] = action
+        if changes:
+            self.actions_ref.update(changes)
+        print(f"Compacted {len(folded)} logged actions to {len(folded) - list(changes.values()).count(None)}")
+
+    def close(self):
+        if self.registration is not None:
+            self.registration.close()
+            self.registration = None
+        if self.presence_registration is not None:
+            self.presence_registration.close()
+            self.presence_registration = None
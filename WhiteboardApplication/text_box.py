@@ -1,13 +1,51 @@
 from PySide6.QtWidgets import (
     QGraphicsTextItem, QGraphicsRectItem, QGraphicsItem, QColorDialog, QFontDialog, QMenu, QGraphicsItemGroup, QGraphicsEllipseItem
 )
-from PySide6.QtGui import QFont, QPen, QColor, QBrush
+from PySide6.QtGui import QFont, QPen, QColor, QBrush, QTextCursor, QTextCharFormat
 from PySide6.QtCore import Qt, QPointF, QRectF, Signal
 from WhiteboardApplication.resize_handles import ResizeHandle
 
+
+#The parts of a character's format the text box lets users change, as a dict that can be synced. The default
+#format is an empty dict.
+def format_of(char_format):
+    value = {}
+    if char_format.fontWeight() >= QFont.Bold:
+        value['bold'] = True
+    if char_format.fontItalic():
+        value['italic'] = True
+    if char_format.fontUnderline():
+        value['underline'] = True
+    if char_format.hasProperty(QTextCharFormat.ForegroundBrush):
+        value['color'] = char_format.foreground().color().name()
+    return value
+
+
+def char_format_of(value):
+    char_format = QTextCharFormat()
+    char_format.setFontWeight(QFont.Bold if value.get('bold') else QFont.Normal)
+    char_format.setFontItalic(bool(value.get('italic')))
+    char_format.setFontUnderline(bool(value.get('underline')))
+    if 'color' in value:
+        char_format.setForeground(QColor(value['color']))
+    return char_format
+
+
+#Selects count characters of the document from position, positions count paragraph breaks as one character like
+#toPlainText does
+def select_range(document, position, count):
+    cursor = QTextCursor(document)
+    cursor.setPosition(position)
+    cursor.setPosition(position + count, QTextCursor.KeepAnchor)
+    return cursor
+
+
 class TextBox(QGraphicsTextItem):
     contentChanged = Signal()
     moved = Signal()
+    # position, number of characters removed, text inserted, [length, format] runs of the inserted text.
+    # A format change alone shows up as the same text removed and inserted again.
+    edited = Signal(int, int, str, list)
 
     def __init__(self):
         super().__init__()
@@ -25,6 +63,8 @@ class TextBox(QGraphicsTextItem):
         # Allow text editing within the box
         self.setTextInteractionFlags(Qt.TextEditorInteraction)
         self.document().contentsChanged.connect(self.contentChanged.emit)
+        self.text_length = len(self.toPlainText())
+        self.document().contentsChange.connect(self.document_changed)
 
         # Create background rectangle
         self.background = QGraphicsRectItem(self)
@@ -64,6 +104,27 @@ class TextBox(QGraphicsTextItem):
         #Variable to track if drawing is disabled
         self.drawing_disabled = False
 
+    #Turns QTextDocument's contentsChange into an edited signal that only carries the changed part of the text
+    def document_changed(self, position, removed, added):
+        length = self.document().characterCount() - 1
+        # Replacing the whole document also counts the paragraph break every document ends with
+        removed = max(0, min(removed, self.text_length - position))
+        added = length - self.text_length + removed
+        self.text_length = length
+
+        cursor = select_range(self.document(), position, added)
+        inserted = cursor.selectedText().replace('\u2029', '\n').replace('\u00a0', ' ')
+        runs = []
+        for offset in range(1, added + 1):
+            # A cursor's format is the one of the character before it
+            cursor.setPosition(position + offset)
+            value = format_of(cursor.charFormat())
+            if runs and runs[-1][1] == value:
+                runs[-1][0] += 1
+            else:
+                runs.append([1, value])
+        self.edited.emit(position, removed, inserted, runs)
+
     def resize(self, width, height):
         # Update the text document size
         self.setTextWidth(width)
@@ -189,8 +250,8 @@ class TextBox(QGraphicsTextItem):
     def delete(self):
         scene = self.scene()
         if scene:
-            scene.removeItem(self)
-            self.deleteLater()
+            # Kept for undo, the scene's history lets go of it
+            scene.remove_items([self])
 
     def updateHandlesVisibility(self):
         # Show or hide handles based on the selection state
@@ -0,0 +1,79 @@
+import math
+from collections import OrderedDict
+
+from PySide6.QtCore import QRectF, Qt
+from PySide6.QtGui import QPixmap, QPainter
+
+from WhiteboardApplication.stroke_item import StrokeItem
+
+
+class TileCache:
+    """Raster tiles of committed ink, keyed by (zoom, column, row).
+
+    Tiles are TILE_SIZE device pixels square, so at zoom s a tile covers TILE_SIZE / s scene units.
+    Least recently used tiles are dropped once there are more than max_tiles.
+    """
+
+    TILE_SIZE = 256
+
+    def __init__(self, max_tiles=512):
+        self.max_tiles = max_tiles
+        self.tiles = OrderedDict()
+
+    def __len__(self):
+        return len(self.tiles)
+
+    def scene_size(self, zoom):
+        return self.TILE_SIZE / zoom
+
+    def tile_rect(self, zoom, column, row):
+        size = self.scene_size(zoom)
+        return QRectF(column * size, row * size, size, size)
+
+    #Keys of the tiles covering a scene rect at the given zoom
+    def tile_keys(self, zoom, rect):
+        size = self.scene_size(zoom)
+        for row in range(math.floor(rect.top() / size), math.floor(rect.bottom() / size) + 1):
+            for column in range(math.floor(rect.left() / size), math.floor(rect.right() / size) + 1):
+                yield zoom, column, row
+
+    #Drops every tile, at every zoom, that overlaps the scene rect
+    def invalidate(self, rect):
+        stale = [key for key in self.tiles if self.tile_rect(*key).intersects(rect)]
+        for key in stale:
+            del self.tiles[key]
+
+    def clear(self):
+        self.tiles.clear()
+
+    def tile(self, scene, key):
+        pixmap = self.tiles.get(key)
+        if pixmap is None:
+            pixmap = self.render_tile(scene, *key)
+            self.tiles[key] = pixmap
+            if len(self.tiles) > self.max_tiles:
+                self.tiles.popitem(last=False)
+        else:
+            self.tiles.move_to_end(key)
+        return pixmap
+
+    def render_tile(self, scene, zoom, column, row):
+        rect = self.tile_rect(zoom, column, row)
+        pixmap = QPixmap(self.TILE_SIZE, self.TILE_SIZE)
+        pixmap.fill(Qt.GlobalColor.transparent)
+
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing, True)
+        painter.scale(zoom, zoom)
+        painter.translate(-rect.x(), -rect.y())
+        base = painter.transform()
+
+        for item in scene.items(rect, Qt.ItemSelectionMode.IntersectsItemBoundingRect, Qt.SortOrder.AscendingOrder):
+            if isinstance(item, StrokeItem) and item.tile_cached and item.isVisible() and not item.isSelected():
+                painter.setTransform(item.sceneTransform() * base)
+                painter.setPen(item.pen())
+                painter.setBrush(item.brush())
+                painter.drawPath(item.path())
+
+        painter.end()
+        return pixmap
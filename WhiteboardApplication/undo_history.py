@@ -0,0 +1,474 @@
+#Undo history kept within limits on steps, memory and disk
+#Every step holds the items it put on the board and the items it took off. Items that are off the board only
+#live in the history, so those are what it measures against its memory limit. Once over the limit the oldest
+#steps are spilled to a temporary file: items that are off the board as their notebook file record, items still
+#on the board as just their id. Undoing back to a spilled step reads it back and rebuilds its items.
+#A spilled step is one item count followed per item by its id, a record type (ON_BOARD for an id only) and
+#the record payload, once for the items added and once for the items removed.
+import itertools
+import struct
+import tempfile
+
+from PySide6.QtWidgets import QGraphicsPathItem
+
+from WhiteboardApplication.notebook_format import DECODERS, encode_item, pack_string, unpack_string
+from WhiteboardApplication.resize_handle_image import ResizablePixmapItem
+from WhiteboardApplication.stroke_item import StrokeItem
+from WhiteboardApplication.text_box import TextBox
+
+ITEM_COUNT = struct.Struct('<I')
+SPILL_ITEM = struct.Struct('<BI')    # record type, payload length
+
+ON_BOARD = 0
+
+# Rough memory cost of items, in bytes, for the memory limits. A stroke point is a tuple of two floats in
+# StrokeItem.points plus its element in the painter path
+ITEM_OVERHEAD = 512
+POINT_BYTES = 136
+PATH_ELEMENT_BYTES = 40
+
+
+#Roughly how many bytes an item takes up in memory
+def item_size(item):
+    if isinstance(item, StrokeItem):
+        return ITEM_OVERHEAD + len(item.points) * POINT_BYTES
+    if isinstance(item, QGraphicsPathItem):
+        return ITEM_OVERHEAD + item.path().elementCount() * PATH_ELEMENT_BYTES
+    if isinstance(item, TextBox):
+        return ITEM_OVERHEAD + len(item.toPlainText()) * 16
+    if isinstance(item, ResizablePixmapItem):
+        original, scaled = item.original_pixmap, item.pixmap()
+        return ITEM_OVERHEAD + (original.width() * original.height() + scaled.width() * scaled.height()) * 4
+    return ITEM_OVERHEAD
+
+
+#Packs {id: item}, items on the board are stored by id only unless whole is set, like for sending them to another
+#board. Returns None if an item that has to be stored can't be put in a notebook record
+def pack_items(items, whole=False):
+    parts = [ITEM_COUNT.pack(len(items))]
+    for item_id, item in items.items():
+        record_type, payload = ON_BOARD, b""
+        if item is not None and (whole or item.scene() is None):
+            record = encode_item(item)
+            if record is None:
+                return None
+            record_type, payload = record
+        parts += [pack_string(item_id), SPILL_ITEM.pack(record_type, len(payload)), payload]
+    return b"".join(parts)
+
+
+#Reads what pack_items stored without rebuilding anything, returns ({id: (record type, payload)}, offset after it)
+def read_packed(data, offset=0):
+    data = memoryview(data)
+    (count,) = ITEM_COUNT.unpack_from(data, offset)
+    offset += ITEM_COUNT.size
+    records = {}
+    for _ in range(count):
+        item_id, offset = unpack_string(data, offset)
+        record_type, length = SPILL_ITEM.unpack_from(data, offset)
+        offset += SPILL_ITEM.size
+        records[item_id] = record_type, data[offset:offset + length]
+        offset += length
+    return records, offset
+
+
+#Rebuilds an item from its read_packed record under its id, None for an item stored by id only
+def decode_packed(scene, item_id, record):
+    record_type, payload = record
+    if record_type == ON_BOARD:
+        return None
+    item = DECODERS[record_type](payload)
+    scene.restore_item(item, item_id)
+    return item
+
+
+#Rebuilds what pack_items stored, returns ({id: item}, offset after it). Items on the scene are taken from it,
+#items stored by id only are None if they have left it since
+def unpack_items(scene, data, offset=0):
+    records, offset = read_packed(data, offset)
+    items = {}
+    for item_id, record in records.items():
+        if scene.item_by_id(item_id) is not None:
+            # A step that's still in memory may have put the item back since
+            items[item_id] = scene.item_by_id(item_id)
+        else:
+            items[item_id] = decode_packed(scene, item_id, record)
+    return items, offset
+
+
+class HistorySpill:
+    """Temporary file that steps and items pushed out of memory are kept in until they're read back
+
+    The file is deleted by the OS once it's closed, also when the app crashes. Reading an entry back leaves a
+    hole, the file is rewritten without the holes once they take up more than the entries still in it.
+    """
+
+    COMPACT_BYTES = 1024 * 1024      # Holes smaller than this are never worth a rewrite
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self.file = None
+        self.entries = {}
+        self.keys = itertools.count()
+        self.size = 0
+        self.live = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    #Appends data, returns the key to read it back with
+    def write(self, data):
+        if self.file is None:
+            self.file = tempfile.TemporaryFile(prefix="bestnotes-undo-", dir=self.directory)
+        key = next(self.keys)
+        self.file.seek(self.size)
+        self.file.write(data)
+        self.entries[key] = (self.size, len(data))
+        self.size += len(data)
+        self.live += len(data)
+        return key
+
+    #Returns the data written under key and forgets it
+    def read(self, key):
+        offset, length = self.entries[key]
+        self.file.seek(offset)
+        data = self.file.read(length)
+        self.discard(key)
+        return data
+
+    def discard(self, key):
+        _offset, length = self.entries.pop(key)
+        self.live -= length
+        if not self.entries:
+            self.file.truncate(0)
+            self.size = 0
+        elif self.size - self.live > max(self.live, self.COMPACT_BYTES):
+            self.compact()
+
+    def compact(self):
+        compacted = tempfile.TemporaryFile(prefix="bestnotes-undo-", dir=self.directory)
+        entries = {}
+        for key, (offset, length) in self.entries.items():
+            self.file.seek(offset)
+            entries[key] = (compacted.tell(), length)
+            compacted.write(self.file.read(length))
+        self.file.close()
+        self.file = compacted
+        self.entries = entries
+        self.size = self.live
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        self.entries.clear()
+        self.size = self.live = 0
+
+
+class UndoCommand:
+    """One step of a user's undo history: the items the step put on the board and the items it took off
+
+    Items are kept by their scene id (BoardScene.item_id), which every client knows them by, so undoing or redoing
+    the step anywhere takes exactly these items off and puts exactly these back, without searching the board.
+    """
+
+    def __init__(self, scene, added=(), removed=()):
+        self.added = {scene.item_id(item): item for item in added}
+        self.removed = {scene.item_id(item): item for item in removed}
+
+    def __len__(self):
+        return len(self.added) + len(self.removed)
+
+    def __repr__(self):
+        return f"UndoCommand(added={list(self.added)}, removed={list(self.removed)})"
+
+    #A step from {id: item} dicts, items that couldn't be found again are None
+    @staticmethod
+    def from_items(added, removed):
+        command = UndoCommand.__new__(UndoCommand)
+        command.added = added
+        command.removed = removed
+        return command
+
+    #Folds a later step into this one so they're undone as one. An item the later step takes off that this one put
+    #on, like a cut piece cut again, was never on the board before either step, and the other way round
+    def merge(self, other):
+        for item_id, item in other.removed.items():
+            if item_id in self.added:
+                del self.added[item_id]
+            else:
+                self.removed[item_id] = item
+        for item_id, item in other.added.items():
+            if item_id in self.removed:
+                del self.removed[item_id]
+            else:
+                self.added[item_id] = item
+
+    #The same step the other way round, what undoing this one does
+    def inverse(self):
+        return UndoCommand.from_items(self.removed, self.added)
+
+    #Bytes held by the step's items that are off the board, the ones on it belong to the board
+    def size(self):
+        items = itertools.chain(self.added.values(), self.removed.values())
+        return sum(item_size(item) for item in items if item is not None and item.scene() is None)
+
+    def apply(self, scene):
+        scene.swap_items([item for item in self.removed.values() if item is not None],
+                         [item for item in self.added.values() if item is not None])
+
+    def undo(self, scene):
+        self.inverse().apply(scene)
+
+    def redo(self, scene):
+        self.apply(scene)
+
+
+class SpilledCommand:
+    """A step that was moved to the spill file, only the ids of its items stay in memory"""
+
+    def __init__(self, key, command):
+        self.key = key
+        self.added = list(command.added)
+        self.removed = list(command.removed)
+
+    def __len__(self):
+        return len(self.added) + len(self.removed)
+
+    def __repr__(self):
+        return f"SpilledCommand(added={self.added}, removed={self.removed})"
+
+
+class UndoHistory:
+    """A scene's undo and redo stacks, kept to at most max_steps steps and max_bytes of items in memory
+
+    Steps over max_steps are dropped, oldest first. Once the items off the board that the steps in memory hold on
+    to take up more than max_bytes, steps are spilled to disk, oldest first, and spilled steps over max_spill_bytes
+    are dropped. A limit of None turns it off. The scene is passed in rather than kept, a reference back to it
+    would leave the scene to the garbage collector, which can run on any thread.
+    """
+
+    MAX_STEPS = 1000
+    MAX_BYTES = 64 * 1024 * 1024
+    MAX_SPILL_BYTES = 512 * 1024 * 1024
+
+    def __init__(self, max_steps=MAX_STEPS, max_bytes=MAX_BYTES, max_spill_bytes=MAX_SPILL_BYTES, directory=None):
+        self.max_steps = max_steps
+        self.max_bytes = max_bytes
+        self.max_spill_bytes = max_spill_bytes
+        self.undo_list = []
+        self.redo_list = []
+        self.spill = HistorySpill(directory)
+        # {id: [item, number of steps in memory that hold it]}, an item can be in several steps, like the one
+        # that drew a stroke and the one that erased it
+        self.held = {}
+        self.dropped = 0
+
+    #Adds a step that was just done and clears the redo stack
+    def add(self, command):
+        for step in self.redo_list:
+            self.forget(step)
+        self.redo_list.clear()
+        self.push(self.undo_list, command)
+
+    #Pops the last step, undoes it and keeps it for redo. Returns it, or None if there's nothing to undo
+    def undo(self, scene):
+        if not self.undo_list:
+            return None
+        command = self.load(scene, self.undo_list.pop())
+        command.undo(scene)
+        self.redo_list.append(command)
+        self.enforce_limits()
+        return command
+
+    def redo(self, scene):
+        if not self.redo_list:
+            return None
+        command = self.load(scene, self.redo_list.pop())
+        command.redo(scene)
+        self.undo_list.append(command)
+        self.enforce_limits()
+        return command
+
+    def clear(self):
+        self.undo_list.clear()
+        self.redo_list.clear()
+        self.held.clear()
+        self.spill.close()
+
+    def push(self, stack, command):
+        self.hold(command)
+        stack.append(command)
+        self.enforce_limits()
+
+    def hold(self, command):
+        for item_id, item in itertools.chain(command.added.items(), command.removed.items()):
+            if item is not None:
+                self.held.setdefault(item_id, [item, 0])[1] += 1
+
+    #Lets go of a step's items, returns the bytes that frees
+    def release(self, command):
+        freed = 0
+        for item_id, item in itertools.chain(command.added.items(), command.removed.items()):
+            if item is None:
+                continue
+            held = self.held[item_id]
+            held[1] -= 1
+            if not held[1]:
+                del self.held[item_id]
+                if item.scene() is None:
+                    freed += item_size(item)
+        return freed
+
+    #Returns a step popped off a stack as an UndoCommand, reading it back from disk if it was spilled
+    def load(self, scene, step):
+        if isinstance(step, SpilledCommand):
+            data = self.spill.read(step.key)
+            added, offset = unpack_items(scene, data)
+            removed, _offset = unpack_items(scene, data, offset)
+            step = UndoCommand.from_items(added, removed)
+            self.hold(step)
+        return step
+
+    #Lets go of a step that's leaving the history
+    def forget(self, step):
+        if isinstance(step, SpilledCommand):
+            self.spill.discard(step.key)
+        else:
+            self.release(step)
+
+    #Bytes of the items off the board that the steps in memory hold on to, the ones on it belong to the board
+    def memory_bytes(self):
+        return sum(item_size(item) for item, _count in self.held.values() if item.scene() is None)
+
+    #Steps in the order they're let go of: the oldest undo steps, then the redo steps furthest from being redone
+    def steps(self):
+        return itertools.chain(((self.undo_list, step) for step in self.undo_list),
+                               ((self.redo_list, step) for step in self.redo_list))
+
+    def drop_oldest(self, spilled_only=False):
+        for stack, step in self.steps():
+            if not spilled_only or isinstance(step, SpilledCommand):
+                stack.remove(step)
+                self.forget(step)
+                self.dropped += 1
+                return True
+        return False
+
+    #Moves the oldest step that holds items off the board to disk, returns the bytes that frees or None if no
+    #step can be spilled
+    def spill_oldest(self):
+        for stack, step in self.steps():
+            if isinstance(step, SpilledCommand) or not step.size():
+                continue
+            added, removed = pack_items(step.added), pack_items(step.removed)
+            if added is None or removed is None:
+                continue
+            stack[stack.index(step)] = SpilledCommand(self.spill.write(added + removed), step)
+            return self.release(step)
+        return None
+
+    def enforce_limits(self):
+        while self.max_steps is not None and len(self.undo_list) + len(self.redo_list) > self.max_steps:
+            self.drop_oldest()
+        if self.max_bytes is not None:
+            memory_bytes = self.memory_bytes()
+            while memory_bytes > self.max_bytes:
+                freed = self.spill_oldest()
+                if freed is None:
+                    break
+                memory_bytes -= freed
+        while self.max_spill_bytes is not None and self.spill.live > self.max_spill_bytes and \
+                self.drop_oldest(spilled_only=True):
+            pass
+
+    def usage(self):
+        """How much the history holds: steps, bytes of items in memory and bytes spilled to disk"""
+        return {
+            'undo_steps': len(self.undo_list),
+            'redo_steps': len(self.redo_list),
+            'spilled_steps': len(self.spill),
+            'dropped_steps': self.dropped,
+            'memory_bytes': self.memory_bytes(),
+            'spilled_bytes': self.spill.live,
+            'spill_file_bytes': self.spill.size,
+        }
+
+
+class ItemStash:
+    """Items kept by id while they're off the board in case something puts them back, like another user's undo
+
+    Holds at most max_items, the oldest are dropped, and the oldest are spilled to disk once the ones in memory
+    take up more than max_bytes.
+    """
+
+    MAX_ITEMS = 10000
+    MAX_BYTES = 32 * 1024 * 1024
+
+    def __init__(self, scene, max_items=MAX_ITEMS, max_bytes=MAX_BYTES, directory=None):
+        self.scene = scene
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        # {id: (item, bytes)} in memory and {id: spill key} on disk, oldest first
+        self.items = {}
+        self.spilled = {}
+        self.spill = HistorySpill(directory)
+        self.memory_bytes = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self.items) + len(self.spilled)
+
+    def __contains__(self, item_id):
+        return item_id in self.items or item_id in self.spilled
+
+    def __setitem__(self, item_id, item):
+        self.pop(item_id)
+        size = item_size(item)
+        self.items[item_id] = (item, size)
+        self.memory_bytes += size
+        self.enforce_limits()
+
+    #Takes an item out of the stash, reading it back from disk if it was spilled
+    def pop(self, item_id, default=None):
+        if item_id in self.items:
+            item, size = self.items.pop(item_id)
+            self.memory_bytes -= size
+            return item
+        if item_id in self.spilled:
+            items, _offset = unpack_items(self.scene, self.spill.read(self.spilled.pop(item_id)))
+            return items[item_id]
+        return default
+
+    def clear(self):
+        self.items.clear()
+        self.spilled.clear()
+        self.memory_bytes = 0
+        self.spill.close()
+
+    def enforce_limits(self):
+        while self.max_items is not None and len(self) > self.max_items:
+            if self.spilled:
+                self.spill.discard(self.spilled.pop(next(iter(self.spilled))))
+            else:
+                self.pop(next(iter(self.items)))
+            self.dropped += 1
+        while self.max_bytes is not None and self.memory_bytes > self.max_bytes:
+            item_id = next(iter(self.items))
+            item = self.pop(item_id)
+            data = pack_items({item_id: item})
+            if data is None:
+                self.dropped += 1
+            else:
+                self.spilled[item_id] = self.spill.write(data)
+
+    def usage(self):
+        """How many items the stash holds and the bytes they take up in memory and on disk"""
+        return {
+            'items': len(self.items),
+            'spilled_items': len(self.spilled),
+            'dropped_items': self.dropped,
+            'memory_bytes': self.memory_bytes,
+            'spilled_bytes': self.spill.live,
+            'spill_file_bytes': self.spill.size,
+        }